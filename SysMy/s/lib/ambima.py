@@ -1,9 +1,14 @@
 from datetime import datetime, timedelta
+import numpy as np
 from ambima_feriados import FERIADOS  # Importa a lista de feriados do módulo ambima_feriados
 
+# Calendário de dias úteis do NumPy montado uma vez com os feriados ANBIMA
+_CALENDARIO = np.busdaycalendar(holidays=sorted(FERIADOS))
+
 def dias_uteis(data_inicial: datetime, data_final: datetime) -> int:
     """
     Calcula o número de dias úteis entre duas datas, considerando feriados nacionais.
+    Aceita também arrays de datas (conta todos os pares de uma vez).
     
     :param data_inicial: Data inicial (inclusive). Passar somente data e não data com hora. Ex.: datetime(2023, 1, 1).date()
     :param data_final: Data final (exclusive). Passar somente data e não data com hora. Ex.: datetime(2024, 1, 1).date()
@@ -11,18 +16,12 @@ def dias_uteis(data_inicial: datetime, data_final: datetime) -> int:
     """
     #print(f"Datas recebidas pelo dias_uteis para calculo: {data_inicial} e {data_final}")
 
-    if data_inicial > data_final:
-        data_inicial, data_final = data_final, data_inicial
-
-    delta = timedelta(days=1)
-    dias_uteis_contagem = 0
-
-    while data_inicial < data_final:
-        if data_inicial.weekday() < 5 and data_inicial not in FERIADOS:
-            dias_uteis_contagem += 1
-        data_inicial += delta
+    inicio = np.asarray(data_inicial, dtype='datetime64[D]')
+    fim = np.asarray(data_final, dtype='datetime64[D]')
 
-    return dias_uteis_contagem
+    # Datas invertidas são trocadas, como na versão original
+    contagem = np.busday_count(np.minimum(inicio, fim), np.maximum(inicio, fim), busdaycal=_CALENDARIO)
+    return int(contagem) if contagem.ndim == 0 else contagem
 
 def dias_uteis_no_ano(ano: int) -> int:
     """
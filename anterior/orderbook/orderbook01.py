@@ -1,6 +1,15 @@
-import MetaTrader5 as mt5
+import os
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent / 'server' / 'lib'))
+# MT5_FAKE=1 usa o feed simulado (server/lib/MT5Fake.py) no lugar do terminal;
+# MT5_FAKE_DATA aponta para as gravações (ex.: esta pasta) para reproduzi-las
+if os.environ.get('MT5_FAKE'):
+    import MT5Fake as mt5
+else:
+    import MetaTrader5 as mt5
 import time
-import csv
+from TickStore import TickStore, book_records, tick_records
 from datetime import datetime, timedelta
 
 
@@ -59,25 +68,15 @@ orderType[mt5.BOOK_TYPE_BUY] = "buy"
 orderType[mt5.BOOK_TYPE_SELL_MARKET] = "sell by mkt"
 orderType[mt5.BOOK_TYPE_BUY_MARKET] = "buy by mkt"
 
-# Abre os arquivos CSV para gravar os dados
-orderbook_filename = f"orderbook_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-tick_filename = f"tick_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-
-orderbook_file = open(orderbook_filename, mode='w', newline='')
-tick_file = open(tick_filename, mode='w', newline='')
-
-orderbook_writer = csv.writer(orderbook_file)
-tick_writer = csv.writer(tick_file)
-
-# Escreve os cabeçalhos nos arquivos CSV
-orderbook_writer.writerow(['Timestamp', 'Type', 'Price', 'Volume'])
-tick_writer.writerow(['Timestamp', 'Last', 'Bid', 'Ask', 'Volume', 'Flags'])
+# Grava ticks e book em formato binário compacto (server/lib/TickStore.py), em
+# ./ticks/<símbolo>/; os CSVs antigos podem ser convertidos com TickStore.import_csv
+store = TickStore('./ticks/')
 
 try:
     while True:
         ###############
         # Captura dados
-        timestamp = datetime.now()
+        timestamp = time.time_ns()
         # Captura o Depth of Market novamente
         book = mt5.market_book_get(symbol)
         # Captura o tick atual (cotação) do ativo
@@ -89,7 +88,7 @@ try:
         if book is None:
             print(f"Sem dados do Book de Ofertas para {symbol}")
         else:
-            print(f'Capturado book em:{timestamp}');
+            print(f'Capturado book em:{datetime.now()}');
             bookETicket += 1
 
         if tick is None:
@@ -101,12 +100,9 @@ try:
         ###############
         # Grava somente se os dois dados foram capturados
         #if bookETicket == 2:
-            # Grava book em um arquivo CSV
-            for entry in book:
-                orderbook_writer.writerow([timestamp, entry.type, entry.price, entry.volume])
-            
-            # Grava tick em um arquivo CSV
-            tick_writer.writerow([timestamp, tick.last, tick.bid, tick.ask, tick.volume, tick.flags])
+            # Grava os níveis do book e o tick com o mesmo timestamp de captura
+            store.append(symbol, 'book', book_records(book, timestamp))
+            store.append(symbol, 'tick', tick_records(tick, timestamp))
             print_flag_description(tick.flags)
 
         # Aguarda o próximo intervalo
@@ -116,9 +112,8 @@ except KeyboardInterrupt:
     print("Interrompendo captura de dados... (teclado)")
 finally:
     print("Encerrando a captura de dados...")
-    print("Fechando arquivos.")
-    orderbook_file.close()
-    tick_file.close()
+    print("Gravando o que está em memória.")
+    store.close()
     print('Liberando MT5')
     mt5.market_book_release(symbol)    
     mt5.shutdown()
@@ -49,13 +49,10 @@ export default function DIPage() {
   useEffect(() => {
     if (!isInitialDataLoaded) return;
 
-    async function fetchRealtimeData() {
+    function handleTick(event: MessageEvent) {
       try {
-        const response = await fetch(
-          `${API_BASE}/last-ticker-data?tickerName=${TICKER_NAME}`
-        );
-        const data = await response.json();
-        const price = Number(data[TICKER_NAME].last);
+        const data = JSON.parse(event.data);
+        const price = Number(data.last);
         
         // Convert to milliseconds for compatibility
         const currentTime = new Date().getTime();
@@ -96,8 +93,12 @@ export default function DIPage() {
       }
     }
 
-    const intervalId = setInterval(fetchRealtimeData, 2000); // Atualização mais frequente
-    return () => clearInterval(intervalId);
+    // Servidor envia os ticks por SSE somente quando mudam (sem polling)
+    const source = new EventSource(
+      `${API_BASE}/stream?tickerName=${encodeURIComponent(TICKER_NAME)}`
+    );
+    source.addEventListener('tick', handleTick);
+    return () => source.close();
   }, [isInitialDataLoaded]);
 
   return (
@@ -1,76 +1,431 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from datetime import datetime
 import time
+import json
+import re
 import sys
+import threading
 sys.path.append('./lib')
-import di  
 import MT5
 
-from OptionsAnalysis.analysis import OptionsAnalysis
+from B3.Calendario import DolarOption
 import os
 import glob
+import numpy as np
 
 api = Blueprint('api', __name__)
 
+# Módulos de análise (pandas, QuantLib em di) são importados na primeira requisição que
+# os usa, não na inicialização do servidor
+_options = None
+_options_lock = threading.Lock()
+
+def _options_state():
+    """(cache, histórico) das opções sobre a OptionsStore, criados na primeira chamada."""
+    global _options
+    with _options_lock:
+        if _options is None:
+            from OptionsAnalysis.store import OptionsStore
+            from OptionsAnalysis.cache import OptionsCache
+            from OptionsAnalysis.history import OptionsHistory
+            store = OptionsStore()
+            _options = (OptionsCache(store), OptionsHistory(store))
+        return _options
+
+def options_cache():
+    return _options_state()[0]
+
+def options_history():
+    return _options_state()[1]
+
+STREAM_HEARTBEAT = 15  # segundos entre keep-alives do /api/stream
+DOLLAR_POINTS = 1000  # futuro de dólar cotado em R$ por US$ 1.000; strikes em R$/US$
+
+# Exposição ao vivo do dia mais recente, por (source, vol): carregada uma vez e reprecificada a cada tick
+_live_exposures = {}
+_live_lock = threading.Lock()
+
+TICKER_DATES = {
+    "DI1N24": datetime(2024, 7, 1).date(),
+    "DI1F25": datetime(2025, 1, 2).date(),
+    "DI1N25": datetime(2025, 7, 1).date(),
+    "DI1F26": datetime(2026, 1, 2).date(),
+    "DI1N26": datetime(2026, 7, 1).date(),
+    "DI1F27": datetime(2027, 1, 4).date(),
+    "DI1F28": datetime(2028, 1, 3).date(),
+    "DI1F29": datetime(2029, 1, 2).date(),
+    "DI1F30": datetime(2030, 1, 2).date(),
+    "DI1F31": datetime(2031, 1, 2).date()
+}
+
+def get_di1_expiry(ticker):
+    # Vencimentos conhecidos; demais contratos DI1 têm o vencimento calculado pelo código
+    import di
+    return TICKER_DATES.get(ticker) or di.di1_expiry(ticker)
+
 @api.route('/api/last-ticker-data', methods=['GET'])
 def get_ticker_data():
     ticker_names = request.args.getlist('tickerName')
-    updates = {}
-    for ticker in ticker_names:
-        if ticker == "CDI":
-            updates[ticker] = {
-                'time': int(time.time()),
-                'bid': 12.25,
-                'ask': 12.25,
-                'last': 12.25,
-                'volume': 0
-            }
-        else:
-            update = MT5.get_real_time_tick2(ticker)
-            if update:
-                updates[ticker] = update
+    # Os ticks vêm do snapshot mantido pelo poller do MT5 (sem chamada ao terminal por requisição)
+    updates = MT5.get_cached_ticks([t for t in ticker_names if t != "CDI"])
+    if "CDI" in ticker_names:
+        updates["CDI"] = {
+            'time': int(time.time()),
+            'bid': 12.25,
+            'ask': 12.25,
+            'last': 12.25,
+            'volume': 0
+        }
     return jsonify(updates)
 
+@api.route('/api/stream', methods=['GET'])
+def get_stream():
+    """
+    Server-Sent Events com os ticks e as barras M5 fechadas dos símbolos pedidos.
+    Só envia quando o valor muda no snapshot do MT5 (eventos 'tick' e 'bar');
+    sem mudanças, manda um comentário de keep-alive a cada STREAM_HEARTBEAT segundos.
+    Símbolo recusado pelo terminal após a reconexão: evento 'error' e ele sai do stream,
+    que termina quando não sobra nenhum.
+    """
+    ticker_names = [t for t in request.args.getlist('tickerName') if t != "CDI"]
+    if not ticker_names:
+        return jsonify({'error': 'tickerName is required'}), 400
+    rejected = MT5.subscribe_ticks(ticker_names)
+    if rejected:
+        return jsonify({'error': f"Unknown symbol or subscription limit reached: {', '.join(rejected)}"}), 400
+
+    def events():
+        seen = {}
+        while ticker_names:
+            changes = MT5.wait_for_changes(ticker_names, seen, STREAM_HEARTBEAT)
+            if not changes:
+                yield ': keep-alive\n\n'
+                continue
+            for kind, ticker, data in changes:
+                data['ticker'] = ticker
+                yield f'event: {kind}\ndata: {json.dumps(data)}\n\n'
+                if kind == 'error':
+                    ticker_names.remove(ticker)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/api/mt5-status', methods=['GET'])
+def get_mt5_status():
+    """
+    Sessão com o terminal MT5: estado, tentativas, reconexões, tempo desconectado,
+    símbolos selecionados e, por função, chamadas, erros e latência (média, p50, p95, máx.).
+    """
+    return jsonify(MT5.connection_status())
+
 @api.route('/api/historical-ticker-data', methods=['GET'])
 def get_historical_ticker_data():
     ticker = request.args.get('tickerName')
     minutes = request.args.get('minutes', default=60, type=int)
+    bars = request.args.get('bars', default=500, type=int)
     
     if not ticker:
         return jsonify({'error': 'tickerName is required'}), 400
+    if bars < 1:
+        return jsonify({'error': 'bars must be at least 1'}), 400
         
     if ticker == "CDI":
         return jsonify({'error': 'Historical data not available for CDI'}), 400
     
-    historical_data = MT5.get_historical_data(ticker) 
+    historical_data = MT5.get_historical_data(ticker, bars)
     if historical_data is None:
         return jsonify({'error': f'No historical data found for {ticker}'}), 404
         
     return jsonify(historical_data)
 
+def _front_series(series, reference_date):
+    """Série de vencimento mais próxima ainda não vencida na data de referência."""
+    expiries = {}
+    for s in series:
+        expiration = DolarOption(s).get_expiration_date()
+        if expiration != "Série não encontrada":
+            expiries[s] = datetime.strptime(expiration, "%d/%m/%Y").date().isoformat()
+    pending = [s for s in expiries if expiries[s] >= reference_date]
+    return min(pending, key=expiries.get) if pending else None
+
+def _options_payload(df, reference_date, modified, spot=None, vol='implied'):
+    from OptionsAnalysis.analysis import OptionsAnalysis
+    columns = ['Contrato', 'Strike', 'OI', 'Tipo']
+    if spot is not None:
+        analyzer = OptionsAnalysis.from_frame(spot, df)
+        if vol == 'implied':
+            analyzer.use_implied_vol(reference_date)
+        df = analyzer.calculate_gamma_exposure(as_of=reference_date)
+        df['IV'] = analyzer._volatility()
+        columns += ['IV', 'Gamma_Exposure']
+    return json.dumps({
+        'date': reference_date,
+        'series': sorted(df['Contrato'].astype(str).unique().tolist()),
+        'spot': spot,
+        'options': df[columns].astype({'Contrato': str, 'Tipo': str}).to_dict(orient='records'),
+        'timestamp': int(modified)  # data de gravação do boletim (estável para o ETag)
+    })
+
 @api.route('/api/dolar-options', methods=['GET'])
 def get_dolar_options():
+    """
+    Opções de DOL de um dia. Parâmetros:
+        series  série(s) de vencimento, repetido ou separado por vírgula (?series=H25&series=J25);
+                padrão: vencimento mais próximo na data; 404 se nenhuma existir no dia
+        date    dia de referência AAAA-MM-DD (padrão: o mais recente)
+        spot    preço do dólar; se informado, inclui IV e Gamma_Exposure por opção
+        vol     'implied' (smile de cada série, padrão) ou 'flat' (DEFAULT_VOLATILITY)
+    """
+    reference_date = request.args.get('date')
+    spot = request.args.get('spot', type=float)
+    vol = request.args.get('vol', default='implied')
+    if vol not in ('implied', 'flat'):
+        return jsonify({'error': "vol must be 'implied' or 'flat'"}), 400
+    series = [s.strip().upper() for arg in request.args.getlist('series') for s in arg.split(',') if s.strip()]
+    if reference_date and not re.fullmatch(r'\d{4}-\d{2}-\d{2}', reference_date):
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    if spot is not None and spot <= 0:
+        return jsonify({'error': 'spot must be positive'}), 400
 
+    day = options_cache().day(reference_date)
+    if day is None:
+        return jsonify({'error': f'No options data for {reference_date or "latest date"}'}), 404
+    if series and not any(s in day[2] for s in series):
+        return jsonify({'error': f'No options for series {", ".join(series)} on {options_cache().source_date(day[0])}'}), 404
+    if not series:
+        front = _front_series(options_cache().series(reference_date), options_cache().source_date(day[0]))
+        series = [front] if front else options_cache().series(reference_date)
 
-    # Get list of CSV files in the opcoes_dolar directory
-    calls_pattern = 'data/opcoes_dolar/*_DOL_OP_Call.csv'
-    puts_pattern = 'data/opcoes_dolar/*_DOL_OP_Put.csv'
-    
-    # Get the most recent files
-    calls_file = max(glob.glob(calls_pattern))
-    puts_file = max(glob.glob(puts_pattern))
-    
-    print(f'Calls file: {calls_file} and Puts file: {puts_file}')
-    analyzer = OptionsAnalysis(5.80, "H25", calls_file, puts_file)
-    df = analyzer.getOptionsData()
-    
-    # Convert DataFrame to dict and format response
-    result = {
-        'options': df[['Strike', 'OI', 'Tipo']].to_dict(orient='records'),
+    # O dia fica em memória uma vez; cada combinação de parâmetros é serializada uma vez
+    # e o cliente revalida com If-None-Match, recebendo 304 enquanto nada mudar
+    etag, body = options_cache().response(_options_payload, series, reference_date, spot=spot, vol=vol)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@api.route('/api/dolar-gamma-profile', methods=['GET'])
+def get_dolar_gamma_profile():
+    """
+    Perfil de gamma líquido (todas as séries e strikes) em um grid de preços do DOL
+    e o nível de zero gamma, com a volatilidade implícita de cada série no dia mais recente.
+    Parâmetros: spot, spot_min, spot_max, points.
+    """
+    spot = request.args.get('spot', default=5.80, type=float)
+    spot_min = request.args.get('spot_min', default=spot * 0.9, type=float)
+    spot_max = request.args.get('spot_max', default=spot * 1.1, type=float)
+    points = request.args.get('points', default=500, type=int)
+    if spot <= 0 or spot_min <= 0:
+        return jsonify({'error': 'spot and spot_min must be positive'}), 400
+    if spot_min >= spot_max or not 2 <= points <= 5000:
+        return jsonify({'error': 'Invalid price grid'}), 400
+
+    from OptionsAnalysis.analysis import OptionsAnalysis
+    day = options_cache().day()
+    if day is None:
+        return jsonify({'error': 'No options data'}), 404
+    reference_date = options_cache().source_date(day[0])
+    analyzer = OptionsAnalysis.from_frame(spot, day[1])
+    analyzer.use_implied_vol(reference_date)
+    profile = analyzer.gamma_profile(np.linspace(spot_min, spot_max, points), as_of=reference_date)
+
+    return jsonify({
+        'price': profile['Price'].tolist(),
+        'net_gamma': profile['Net_Gamma'].tolist(),
+        'zero_gamma': profile.attrs['zero_gamma'],
+        'spot': spot,
+        'date': reference_date,
         'timestamp': int(time.time())
-    }
-    
-    return jsonify(result)
+    })
+
+def _vol_surface_payload(df, reference_date, modified, spot):
+    from OptionsAnalysis.analysis import OptionsAnalysis
+    surface = OptionsAnalysis.from_frame(spot, df).vol_surface(reference_date)
+    options = surface.options.dropna(subset=['IV'])
+    return json.dumps({
+        'date': reference_date,
+        'spot': spot,
+        'smiles': surface.smiles,
+        'options': options[['Contrato', 'Tipo', 'Strike', 'Forward', 'Premio', 'IV']]
+            .astype({'Contrato': str, 'Tipo': str}).to_dict(orient='records'),
+        'timestamp': int(modified)
+    })
+
+@api.route('/api/dolar-vol-surface', methods=['GET'])
+def get_dolar_vol_surface():
+    """
+    Volatilidade implícita (Black-76) de cada opção e o smile ajustado por série.
+    Parâmetros: spot (padrão 5.80), date (AAAA-MM-DD, padrão: o dia mais recente).
+    """
+    spot = request.args.get('spot', default=5.80, type=float)
+    reference_date = request.args.get('date')
+    if reference_date and not re.fullmatch(r'\d{4}-\d{2}-\d{2}', reference_date):
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    if spot <= 0:
+        return jsonify({'error': 'spot must be positive'}), 400
+
+    cached = options_cache().response(_vol_surface_payload, None, reference_date, spot=spot)
+    if cached is None:
+        return jsonify({'error': f'No options data for {reference_date or "latest date"}'}), 404
+    etag, body = cached
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def _exposure_payload(df, reference_date, modified, spot, vol):
+    from OptionsAnalysis.analysis import OptionsAnalysis
+    analyzer = OptionsAnalysis.from_frame(spot, df)
+    if vol == 'implied':
+        analyzer.use_implied_vol(reference_date)
+    exposure = analyzer.dealer_exposure(as_of=reference_date)
+    totals = exposure.drop(columns='Strike').sum()
+    return json.dumps({
+        'date': reference_date,
+        'spot': spot,
+        'series': sorted(df['Contrato'].astype(str).unique().tolist()),
+        'exposure': exposure.to_dict(orient='records'),
+        'total': {name: float(value) for name, value in totals.items()},
+        'timestamp': int(modified)
+    })
+
+@api.route('/api/dolar-exposure', methods=['GET'])
+def get_dolar_exposure():
+    """
+    Exposição dos dealers por strike (DEX, GEX, VEX, vanna e charm) e os totais. Parâmetros:
+        spot    preço do dólar (padrão 5.80)
+        series  série(s) de vencimento, repetido ou separado por vírgula; padrão: todas
+        date    dia de referência AAAA-MM-DD (padrão: o mais recente)
+        vol     'implied' (smile de cada série, padrão) ou 'flat' (DEFAULT_VOLATILITY)
+    """
+    spot = request.args.get('spot', default=5.80, type=float)
+    reference_date = request.args.get('date')
+    vol = request.args.get('vol', default='implied')
+    series = [s.strip().upper() for arg in request.args.getlist('series') for s in arg.split(',') if s.strip()]
+    if reference_date and not re.fullmatch(r'\d{4}-\d{2}-\d{2}', reference_date):
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    if vol not in ('implied', 'flat'):
+        return jsonify({'error': "vol must be 'implied' or 'flat'"}), 400
+    if spot <= 0:
+        return jsonify({'error': 'spot must be positive'}), 400
+
+    cached = options_cache().response(_exposure_payload, series or None, reference_date, spot=spot, vol=vol)
+    if cached is None:
+        return jsonify({'error': f'No options data for {reference_date or "latest date"}'}), 404
+    etag, body = cached
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def _live_exposure(spot, vol):
+    from OptionsAnalysis.live import LiveExposure
+    day = options_cache().day()
+    if day is None:
+        return None
+    key = (day[0], vol)
+    with _live_lock:
+        live = _live_exposures.get(key)
+        if live is None:
+            _live_exposures.clear()  # boletim novo: a carteira anterior deixa de ser usada
+            live = _live_exposures[key] = LiveExposure(day[1], spot, options_cache().source_date(day[0]), vol == 'implied')
+    return live
+
+def _tick_spot(tick):
+    price = tick['last'] or (tick['bid'] + tick['ask']) / 2
+    return price / DOLLAR_POINTS if price else None
+
+@api.route('/api/dolar-exposure-stream', methods=['GET'])
+def get_dolar_exposure_stream():
+    """
+    Server-Sent Events com a exposição dos dealers por strike (todas as séries do dia mais
+    recente), reprecificada a cada tick do futuro de dólar (evento 'exposure').
+    Parâmetros: tickerName (padrão WDO$), vol ('implied' ou 'flat').
+    Se o terminal recusar o símbolo após a reconexão, envia um evento 'error' e termina.
+    """
+    ticker = request.args.get('tickerName', default='WDO$')
+    vol = request.args.get('vol', default='implied')
+    if vol not in ('implied', 'flat'):
+        return jsonify({'error': "vol must be 'implied' or 'flat'"}), 400
+    if options_cache().day() is None:
+        return jsonify({'error': 'No options data'}), 404
+    if MT5.subscribe_ticks([ticker]):
+        return jsonify({'error': f'Unknown symbol or subscription limit reached: {ticker}'}), 400
+
+    def events():
+        seen = {}
+        sent = None
+        while True:
+            changes = MT5.wait_for_changes([ticker], seen, STREAM_HEARTBEAT)
+            errors = [data for kind, _, data in changes if kind == 'error']
+            if errors:
+                yield f'event: error\ndata: {json.dumps(dict(errors[-1], ticker=ticker))}\n\n'
+                return
+            ticks = [data for kind, _, data in changes if kind == 'tick']
+            spot = _tick_spot(ticks[-1]) if ticks else None
+            live = _live_exposure(spot, vol) if spot else None
+            if live is None:
+                if not changes:
+                    yield ': keep-alive\n\n'
+                continue
+            # Vários clientes no mesmo tick: update() só recalcula na primeira chamada
+            exposure = live.update(spot)
+            if exposure['version'] == sent:
+                continue  # tick sem mudança de preço (só volume/book)
+            sent = exposure['version']
+            data = {name: value.tolist() if isinstance(value, np.ndarray) else value for name, value in exposure.items()}
+            data.update(ticker=ticker, date=live.as_of, time=ticks[-1]['time'])
+            yield f'event: exposure\ndata: {json.dumps(data)}\n\n'
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/api/dolar-oi-history', methods=['GET'])
+def get_dolar_oi_history():
+    """
+    Histórico de open interest de uma série ao longo dos boletins da base. Parâmetros:
+        series  série de vencimento (padrão: vencimento mais próximo no último boletim)
+        start, end  intervalo AAAA-MM-DD (inclusive; padrão: todo o histórico)
+    Retorna, por tipo (Call/Put) e [data][strike], o OI, a variação diária e o build-up
+    acumulado, e o centróide de strike ponderado por OI de cada dia (Call, Put e total).
+    """
+    start = request.args.get('start')
+    end = request.args.get('end')
+    for value in (start, end):
+        if value and not re.fullmatch(r'\d{4}-\d{2}-\d{2}', value):
+            return jsonify({'error': 'start/end must be YYYY-MM-DD'}), 400
+
+    from OptionsAnalysis.history import TYPES
+    history = options_history()
+    history.refresh()
+    if not len(history.dates):
+        return jsonify({'error': 'No options history'}), 404
+    series = request.args.get('series', '').strip().upper()
+    series = series or _front_series(history.series, str(history.dates[-1]))
+    window = history.window(series, start, end)
+    if window is None:
+        return jsonify({'error': f'Series {series} not found'}), 404
+    dates, strikes, oi = window
+    _, _, changes = history.oi_changes(series, start, end)
+    _, _, buildup = history.buildup(series, start, end)
+    _, centroid = history.centroid(series, start, end)
+
+    # Só os strikes com OI ou variação em algum dia do intervalo
+    used = (oi != 0).any(axis=(0, 1)) | (changes != 0).any(axis=(0, 1))
+    def by_type(matrix):
+        return {name: matrix[:, i, used].tolist() for i, name in enumerate(TYPES)}
+
+    return jsonify({
+        'series': series,
+        'dates': [str(d) for d in dates],
+        'strikes': strikes[used].tolist(),
+        'oi': by_type(oi),
+        'oi_change': by_type(changes),
+        'buildup': by_type(buildup),
+        'centroid': {name: [None if np.isnan(v) else v for v in centroid[:, i].tolist()]
+                     for i, name in enumerate(TYPES + ('Total',))},
+        'timestamp': int(time.time())
+    })
 
 @api.route('/api/estimate-cdi', methods=['GET'])
 def get_CDI_estimate():
@@ -81,30 +436,57 @@ def get_CDI_estimate():
         return jsonify({'error': 'Ticker and target_rate are required'}), 400
     
     initial_date = datetime.now().date()
-    
-    ticker_dates = {
-        "DI1N24": datetime(2024, 7, 1).date(),
-        "DI1F25": datetime(2025, 1, 2).date(),
-        "DI1N25": datetime(2025, 7, 1).date(),
-        "DI1F26": datetime(2026, 1, 2).date(),
-        "DI1N26": datetime(2026, 7, 1).date(),
-        "DI1F27": datetime(2027, 1, 4).date(),
-        "DI1F28": datetime(2028, 1, 3).date(),
-        "DI1F29": datetime(2029, 1, 2).date(),
-        "DI1F30": datetime(2030, 1, 2).date(),
-        "DI1F31": datetime(2031, 1, 2).date()
-    }
-
-    final_date = ticker_dates.get(ticker)
+
+    final_date = get_di1_expiry(ticker)
     if not final_date:
         return jsonify({'error': 'Invalid ticker'}), 400
 
+    import di
     initial_rate = 12.25  
     resultado = di.EstimaCDI(initial_rate, target_rate, initial_date, final_date)
     resultado_dict = resultado.to_dict(orient='records')
 
     return jsonify({'result': resultado_dict})
 
+@api.route('/api/di-curve', methods=['GET', 'POST'])
+def get_di_curve():
+    """
+    Curva DI1 completa em uma chamada: taxas dos vértices por ticker, via query string
+    (?DI1F26=14.9&DI1N26=15.1) ou JSON no corpo ({"DI1F26": 14.9, ...}).
+    Parâmetro opcional initial_rate (CDI atual, padrão 12.25).
+    """
+    body = request.get_json(silent=True)
+    if body is not None and not isinstance(body, dict):
+        return jsonify({'error': 'JSON body must be an object of DI1 tickers and rates'}), 400
+    rates = dict(body or request.args.items())
+    try:
+        initial_rate = float(rates.pop('initial_rate', request.args.get('initial_rate', 12.25)))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid initial_rate'}), 400
+    if not rates:
+        return jsonify({'error': 'At least one DI1 ticker and rate are required'}), 400
+
+    vertices = []
+    for ticker, rate in rates.items():
+        final_date = get_di1_expiry(ticker)
+        if not final_date:
+            return jsonify({'error': f'Invalid ticker {ticker}'}), 400
+        try:
+            vertices.append((ticker, final_date, float(rate)))
+        except (TypeError, ValueError):
+            return jsonify({'error': f'Invalid rate for {ticker}'}), 400
+
+    import di
+    vertices_df, copom_df = di.EstimaCurvaDI(initial_rate, vertices, datetime.now().date())
+    for df in (vertices_df, copom_df):
+        for column in df.select_dtypes('datetime').columns:
+            df[column] = df[column].dt.strftime('%Y-%m-%d')
+
+    return jsonify({
+        'vertices': vertices_df.astype(object).where(vertices_df.notna(), None).to_dict(orient='records'),
+        'copom': copom_df.to_dict(orient='records')
+    })
+
 
 
 """
@@ -22,9 +22,17 @@ import fitz  # PyMuPDF
 import pandas as pd
 import numpy as np
 from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import json
 import re
 import glob
 import os
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))  # lib/, para importar OptionsAnalysis
+from OptionsAnalysis.store import OptionsStore
 
 def extract_date_from_header(doc) -> str:
     """Extract date from the first page header"""
@@ -53,7 +61,51 @@ def extract_date_from_header(doc) -> str:
         return f"{year}-{month}-{day}"
     return None
 
-def extract_options_tables(pdf_path: str, output_path: str, file:str, header: str = "Mercado de Opções Sobre Disponível - Compra", finish: str = "DOL: Dólar Comercial" ) -> str:
+# Colunas das tabelas de opções como aparecem no PDF
+OPTIONS_COLUMNS = [
+    'Série', 'Código', 'Contratos em Aberto', 'Negócios Realizados',
+    'Contratos Negociados', 'Volume', 'Preço de Abertura', 'Preço Mínimo',
+    'Preço Máximo', 'Preço Médio', 'Último Preço', 'Variação em Pontos',
+    'Prêmio de Referência', 'Última Oferta de Compra', 'Última Oferta de Venda'
+]
+
+NUMERIC_COLUMNS = OPTIONS_COLUMNS[2:]
+
+CALL_HEADER = "Mercado de Opções Sobre Disponível - Compra"
+PUT_HEADER = "Mercado de Opções Sobre Disponível - Venda"
+DOL_TITLE = "DOL: Dólar Comercial"
+WDO_TITLE = "WDO: Dólar Míni"
+
+MANIFEST_FILE = "_manifest.json"
+
+def _append_row(table_data, text):
+    # Split the line and process all columns
+    row = text.split()
+    # Validate if this is a data row (should have numbers)
+    if len(row) >= len(OPTIONS_COLUMNS) and any(re.match(r'\d', item) for item in row):
+        table_data.append(row[:len(OPTIONS_COLUMNS)])  # Take all columns
+
+def _save_options_table(table_data, reference_date, output_path, file) -> str:
+    df = pd.DataFrame(table_data, columns=OPTIONS_COLUMNS)
+
+    for col in NUMERIC_COLUMNS:
+      # Substituir caracteres especiais no final dos números por nada
+      column = df[col].str.replace(r'[^\d,.-]', '', regex=True)
+      # Substituir vírgulas por pontos e converter para numérico
+      column = column.str.replace(',', '') #.str.replace(',', '.')
+      # Substituir valores vazios ou "-" por NaN
+      column = column.replace('-', np.nan)
+      df[col] =  pd.to_numeric(column, errors='coerce')
+
+    # Acrescenta a coluna de data de referência
+    df.insert(0, 'Data', reference_date)  # Insert 'Data' as first column with reference_date value
+    
+    output_filename = f"{output_path}{reference_date}_{file}.csv"
+    #df.to_excel(output_filename, index=False)
+    df.to_csv(output_filename, index=False, encoding='utf-8-sig', sep=';')
+    return output_filename
+
+def extract_options_tables(pdf_path: str, output_path: str, file:str, header: str = CALL_HEADER, finish: str = DOL_TITLE ) -> str:
     doc = fitz.open(pdf_path)
     table_data: List[List[str]] = []
 
@@ -62,13 +114,6 @@ def extract_options_tables(pdf_path: str, output_path: str, file:str, header: st
     print("Data de referência:", reference_date)
 
     capture_table = False
-    # Updated column names matching the actual PDF structure
-    columns = [
-        'Série', 'Código', 'Contratos em Aberto', 'Negócios Realizados',
-        'Contratos Negociados', 'Volume', 'Preço de Abertura', 'Preço Mínimo',
-        'Preço Máximo', 'Preço Médio', 'Último Preço', 'Variação em Pontos',
-        'Prêmio de Referência', 'Última Oferta de Compra', 'Última Oferta de Venda'
-    ]
     finish_table = False
     first_title = False
     for page in doc:
@@ -78,7 +123,7 @@ def extract_options_tables(pdf_path: str, output_path: str, file:str, header: st
             text = block[4].strip()
             
             if not first_title:
-              if "DOL: Dólar Comercial" in text: 
+              if DOL_TITLE in text: 
                   print("achei titulo 1:", text)
                   first_title = True
                   capture_table = False
@@ -98,73 +143,250 @@ def extract_options_tables(pdf_path: str, output_path: str, file:str, header: st
                 break
                 
             if capture_table:
-                # Split the line and process all columns
-                row = text.split()
-                
-                # Validate if this is a data row (should have numbers)
-                if len(row) >= len(columns) and any(re.match(r'\d', item) for item in row):
-                    table_data.append(row[:len(columns)])  # Take all columns
-                #else:
-                #    print("desconsiderado:", text)
+                _append_row(table_data, text)
         if finish_table:
             break
     
+    output_filename = _save_options_table(table_data, reference_date, output_path, file)
+    doc.close()
+    return output_filename
 
-    df = pd.DataFrame(table_data, columns=columns)
+# Títulos de seção do boletim usam fonte 12 e os subtítulos ("Mercado de Opções ...") 10,5;
+# o índice de seções considera somente textos com pelo menos este tamanho
+SECTION_FONT_SIZE = 10.5
 
-    numeric_columns = [
-        'Contratos em Aberto', 'Negócios Realizados', 'Contratos Negociados',
-        'Volume', 'Preço de Abertura', 'Preço Mínimo', 'Preço Máximo',
-        'Preço Médio', 'Último Preço', 'Variação em Pontos', 'Prêmio de Referência',
-        'Última Oferta de Compra', 'Última Oferta de Venda'
-    ]
+# Seleção de fonte (de qualquer tamanho) no content stream; o texto segue até o próximo ET.
+# Só textos em hexadecimal (Tj ou arrays TJ, como o boletim grava hoje) são decodificados:
+# strings literais ficam fora do índice, e extract_dolar_options cai na leitura completa
+_FONT_SELECT = re.compile(rb'/([\w.+-]+) (\d*\.?\d+) Tf')
+_HEX_TEXT = re.compile(rb'<([0-9a-fA-F]+)>\s*Tj|\[((?:\s*(?:<[0-9a-fA-F]*>|-?\d*\.?\d+))*)\s*\]\s*TJ')
+_HEX_STRING = re.compile(rb'<([0-9a-fA-F]*)>')
 
-    for col in numeric_columns:
-      # Substituir caracteres especiais no final dos números por nada
-      column = df[col].str.replace(r'[^\d,.-]', '', regex=True)
-      # Substituir vírgulas por pontos e converter para numérico
-      column = column.str.replace(',', '') #.str.replace(',', '.')
-      # Substituir valores vazios ou "-" por NaN
-      column = column.replace('-', np.nan)
-      df[col] =  pd.to_numeric(column, errors='coerce')
+def _to_unicode_map(doc, font_xref: int) -> dict:
+    """Tabela código -> caractere lida do CMap ToUnicode da fonte (vazia se não houver)."""
+    kind, value = doc.xref_get_key(font_xref, "ToUnicode")
+    if kind != 'xref':
+        return {}
+    cmap = doc.xref_stream(int(value.split()[0])).decode('latin-1')
+    mapping = {}
+    for section in re.findall(r'beginbfchar(.*?)endbfchar', cmap, re.S):
+        for code, char in re.findall(r'<([0-9a-fA-F]+)>\s*<([0-9a-fA-F]+)>', section):
+            mapping[int(code, 16)] = bytes.fromhex(char).decode('utf-16-be')
+    for section in re.findall(r'beginbfrange(.*?)endbfrange', cmap, re.S):
+        for low, high, char in re.findall(r'<([0-9a-fA-F]+)>\s*<([0-9a-fA-F]+)>\s*<([0-9a-fA-F]+)>', section):
+            for offset, code in enumerate(range(int(low, 16), int(high, 16) + 1)):
+                mapping[code] = chr(int(char, 16) + offset)
+    return mapping
 
-    # Acrescenta a coluna de data de referência
-    df.insert(0, 'Data', reference_date)  # Insert 'Data' as first column with reference_date value
-    
-    output_filename = f"{output_path}{reference_date}_{file}.csv"
-    #df.to_excel(output_filename, index=False)
-    df.to_csv(output_filename, index=False, encoding='utf-8-sig', sep=';')
-    
+def build_section_index(doc, stop_at: str = None) -> dict:
+    """
+    Índice leve página -> títulos de seção, sem extrair o texto das páginas:
+    procura no content stream bruto só as seleções de fonte >= SECTION_FONT_SIZE e
+    decodifica (via ToUnicode) apenas esses textos.
+    Com stop_at, para na primeira página que tiver um título contendo esse texto.
+    """
+    cmaps = {}
+    index = {}
+    for page in doc:
+        contents = page.read_contents()
+        headers = []
+        for match in _FONT_SELECT.finditer(contents):
+            if float(match.group(2)) < SECTION_FONT_SIZE:
+                continue
+            kind, value = doc.xref_get_key(page.xref, f"Resources/Font/{match.group(1).decode('latin-1')}")
+            if kind != 'xref':
+                continue
+            xref = int(value.split()[0])
+            if xref not in cmaps:
+                cmaps[xref] = _to_unicode_map(doc, xref)
+            end = contents.find(b'ET', match.end())
+            codes = ''.join(
+                (tj or b''.join(_HEX_STRING.findall(array))).decode('latin-1')
+                for tj, array in _HEX_TEXT.findall(contents, match.end(), end if end >= 0 else len(contents)))
+            text = ''.join(cmaps[xref].get(int(codes[i:i + 4], 16), '') for i in range(0, len(codes), 4))
+            if text:
+                headers.append(text)
+        if headers:
+            index[page.number] = headers
+            if stop_at and any(stop_at in h for h in headers):
+                break
+    return index
+
+def _dolar_pages(index: dict, page_count: int) -> List[int]:
+    """
+    Páginas que contêm a seção de opções DOL: do primeiro título DOL até o título WDO.
+    Sem o título DOL no índice (layout diferente), devolve todas as páginas.
+    """
+    first = next((p for p in sorted(index) if any(DOL_TITLE in h for h in index[p])), None)
+    if first is None:
+        return list(range(page_count))
+    last = next((p for p in sorted(index) if p >= first and any(WDO_TITLE in h for h in index[p])), page_count - 1)
+    return list(range(first, last + 1))
+
+def _read_dolar_tables(doc, pages) -> Tuple[List[List[str]], List[List[str]], bool]:
+    """
+    Linhas de calls e puts de DOL lidas dos blocos de texto das páginas, em ordem.
+    Retorna (calls, puts, True se chegou ao título WDO que encerra a seção).
+    """
+    calls: List[List[str]] = []
+    puts: List[List[str]] = []
+    # Estados: procura o título DOL -> procura cabeçalho Compra -> calls (até o próximo título DOL)
+    #          -> procura cabeçalho Venda -> puts (até o título WDO) -> fim
+    state = 'title'
+    for page_number in pages:
+        for block in doc[page_number].get_text("blocks"):
+            text = block[4].strip()
+            if state == 'title':
+                if DOL_TITLE in text:
+                    state = 'call_header'
+            elif state == 'call_header':
+                if CALL_HEADER in text:
+                    state = 'calls'
+            elif state == 'calls':
+                if CALL_HEADER in text:
+                    continue
+                if DOL_TITLE in text:
+                    state = 'put_header'
+                else:
+                    _append_row(calls, text)
+            elif state == 'put_header':
+                if PUT_HEADER in text:
+                    state = 'puts'
+            elif state == 'puts':
+                if PUT_HEADER in text:
+                    continue
+                if WDO_TITLE in text:
+                    state = 'done'
+                    break
+                _append_row(puts, text)
+        if state == 'done':
+            break
+    return calls, puts, state == 'done'
+
+def extract_dolar_options(pdf_path: str, output_path: str) -> Tuple[str, str, str]:
+    """
+    Extrai as tabelas de calls (Compra) e puts (Venda) de opções sobre DOL em uma única
+    leitura do PDF. Mesmo resultado de chamar extract_options_tables duas vezes.
+    Só as páginas da seção DOL (localizadas por build_section_index) têm os blocos de texto
+    extraídos. Se o índice vier vazio ou a seção não fechar nessas páginas (títulos que o
+    índice não reconhece), todas as páginas são lidas.
+    Retorna (data de referência, arquivo de calls, arquivo de puts).
+    """
+    start = time.perf_counter()
+    doc = fitz.open(pdf_path)
+    reference_date = extract_date_from_header(doc)
+    page_count = len(doc)
+
+    index = build_section_index(doc, stop_at=WDO_TITLE)
+    pages = _dolar_pages(index, page_count)
+    index_time = time.perf_counter() - start
+
+    calls, puts, done = _read_dolar_tables(doc, pages)
+    if not done and len(pages) < page_count:
+        print(f"{os.path.basename(pdf_path)}: seção DOL incompleta nas páginas do índice, lendo todas as páginas")
+        pages = range(page_count)
+        calls, puts, done = _read_dolar_tables(doc, pages)
     doc.close()
-    return output_filename
+    print(f"{os.path.basename(pdf_path)}: índice {index_time:.3f}s ({len(index)} páginas com títulos), "
+          f"tabelas {time.perf_counter() - start - index_time:.3f}s ({len(pages)} de {page_count} páginas)")
+
+    calls_file = _save_options_table(calls, reference_date, output_path, "DOL_OP_Call")
+    puts_file = _save_options_table(puts, reference_date, output_path, "DOL_OP_Put")
+    return reference_date, calls_file, puts_file
 
-def GenerateCSVOptionsDolar():
-    pathTo = "./data/opcoes_dolar/"
-    pathFrom = "./data/_para_processar/"
+def file_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
 
+def load_manifest(pathTo: str) -> dict:
+    manifest_path = os.path.join(pathTo, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(pathTo: str, manifest: dict):
+    # Grava em arquivo temporário e troca, para não deixar o manifesto corrompido
+    manifest_path = os.path.join(pathTo, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+def _ingest_bulletin(pdf_file: str, pathTo: str, dbPath: str) -> dict:
+    # Executado nos processos do pool: gera os CSVs e grava o dia na base colunar
+    reference_date, calls_file, puts_file = extract_dolar_options(pdf_file, pathTo)
+    OptionsStore(dbPath).import_csv(calls_file, puts_file)
+    return {'data': reference_date, 'saidas': [os.path.basename(calls_file), os.path.basename(puts_file)]}
+
+def GenerateCSVOptionsDolar(pathFrom="./data/_para_processar/", pathTo="./data/opcoes_dolar/",
+                            dbPath="./data/opcoes_dolar_db/", max_workers=None):
+    """
+    Processa os boletins (BDI_03-1_*.pdf) de pathFrom em paralelo, um processo por documento.
+    Cada PDF é lido uma única vez; o hash do conteúdo fica registrado no manifesto em pathTo
+    e boletins já processados são ignorados. Ao final os PDFs vão para 'arquivos_processados'.
+    Os dias processados (e CSVs antigos ainda não importados) vão para a base colunar em dbPath.
+    """
     # Print the absolute paths
     print(f"Current working directory: {os.getcwd()}")
 
+    imported = OptionsStore(dbPath).sync_csv_dir(pathTo)
+    if imported:
+        print(f"Importados para a base de opções: {', '.join(imported)}")
+
     # Look for all BDI files in the pathFrom directory
-    #print(f"Path busca arquivos: {os.path.join(pathFrom, 'BDI_03-1_*.pdf')}")
-    bdi_files = glob.glob(os.path.join(pathFrom, "BDI_03-1_*.pdf"))
-    
+    bdi_files = sorted(glob.glob(os.path.join(pathFrom, "BDI_03-1_*.pdf")))
+    if not bdi_files:
+        return
+
+    manifest = load_manifest(pathTo)
+    pending = {}
+    done = []
     for pdf_file in bdi_files:
-        print(f"Processing {pdf_file}...")
-        try:
-            # Extract options tables for both calls and puts
-            extract_options_tables(pdf_file, pathTo, "DOL_OP_Call", "Mercado de Opções Sobre Disponível - Compra")
-            extract_options_tables(pdf_file, pathTo, "DOL_OP_Put", "Mercado de Opções Sobre Disponível - Venda", "WDO: Dólar Míni")
-            
-            # Move file to processed folder after successful processing
-            processed_dir = os.path.join(pathFrom, 'arquivos_processados')
-            if not os.path.exists(processed_dir):
-                os.makedirs(processed_dir)
-            os.rename(pdf_file, os.path.join(processed_dir, os.path.basename(pdf_file)))
-            #print(f"Successfully moved {pdf_file} to processed folder")
-            
-        except Exception as e:
-            print(f"Erro processando o arquivo {pdf_file}: {str(e)}")
+        digest = file_hash(pdf_file)
+        if digest in manifest:
+            print(f"Ignorando {pdf_file}: já processado em {manifest[digest]['data']}")
+            done.append(pdf_file)
+        else:
+            pending[pdf_file] = digest
+
+    def outcomes():
+        # Um único documento não compensa subir o pool de processos
+        if len(pending) == 1:
+            for pdf_file in pending:
+                try:
+                    yield pdf_file, _ingest_bulletin(pdf_file, pathTo, dbPath), None
+                except Exception as e:
+                    yield pdf_file, None, e
+            return
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_ingest_bulletin, pdf_file, pathTo, dbPath): pdf_file for pdf_file in pending}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+
+    start = time.perf_counter()
+    for pdf_file, result, error in outcomes():
+        if error is not None:
+            print(f"Erro processando o arquivo {pdf_file}: {str(error)}")
+            continue
+        print(f"Processado {pdf_file} ({result['data']})")
+        manifest[pending[pdf_file]] = dict(result, arquivo=os.path.basename(pdf_file))
+        save_manifest(pathTo, manifest)
+        done.append(pdf_file)
+    if pending:
+        print(f"{len(pending)} boletim(ns) em {time.perf_counter() - start:.2f}s")
+
+    # Move file to processed folder after successful processing
+    processed_dir = os.path.join(pathFrom, 'arquivos_processados')
+    if not os.path.exists(processed_dir):
+        os.makedirs(processed_dir)
+    for pdf_file in done:
+        os.replace(pdf_file, os.path.join(processed_dir, os.path.basename(pdf_file)))
     return 
 
 
@@ -0,0 +1,78 @@
+"""
+Armazenamento local de barras OHLC por símbolo e timeframe.
+Cada série fica em um arquivo binário com registros de tamanho fixo no mesmo formato
+do array retornado por mt5.copy_rates_* e é lida via memória mapeada (np.memmap),
+então ler as últimas N barras não depende do tamanho do histórico.
+"""
+import os
+import re
+import threading
+
+import numpy as np
+
+# Mesmo dtype do array retornado por mt5.copy_rates_*
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+class BarStore:
+    def __init__(self, path='./data/bars/'):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, symbol, timeframe):
+        # '$' e outros caracteres de símbolos contínuos (ex.: WDO$) não vão para o nome do arquivo
+        name = re.sub(r'[^A-Za-z0-9_-]', '_', symbol)
+        return os.path.join(self.path, f"{name}_{timeframe}.bin")
+
+    def size(self, symbol, timeframe):
+        """Quantidade de barras armazenadas."""
+        filename = self._file(symbol, timeframe)
+        if not os.path.exists(filename):
+            return 0
+        return os.path.getsize(filename) // RATES_DTYPE.itemsize
+
+    def read(self, symbol, timeframe, count=None):
+        """Retorna (cópia de) as últimas 'count' barras, ou todas se count for None."""
+        with self._lock:
+            n = self.size(symbol, timeframe)
+            if n == 0:
+                return np.empty(0, dtype=RATES_DTYPE)
+            mm = np.memmap(self._file(symbol, timeframe), dtype=RATES_DTYPE, mode='r', shape=(n,))
+            start = 0 if count is None else max(0, n - count)
+            bars = np.array(mm[start:])
+            del mm
+            return bars
+
+    def last_time(self, symbol, timeframe):
+        """Timestamp da última barra armazenada (None se vazio)."""
+        last = self.read(symbol, timeframe, 1)
+        return int(last['time'][0]) if len(last) else None
+
+    def append(self, symbol, timeframe, rates):
+        """
+        Grava as barras mais novas que a última armazenada.
+        A última barra gravada pode ser a barra ainda em formação, então uma barra com o
+        mesmo timestamp sobrescreve o registro final em vez de duplicá-lo.
+        Retorna a quantidade de registros escritos.
+        """
+        rates = np.asarray(rates).astype(RATES_DTYPE, copy=False)
+        with self._lock:
+            filename = self._file(symbol, timeframe)
+            n = self.size(symbol, timeframe)
+            position = n
+            if n:
+                mm = np.memmap(filename, dtype=RATES_DTYPE, mode='r', shape=(n,))
+                last = int(mm['time'][-1])
+                del mm
+                rates = rates[rates['time'] >= last]
+                if len(rates) and int(rates['time'][0]) == last:
+                    position = n - 1
+            if len(rates) == 0:
+                return 0
+            with open(filename, 'r+b' if n else 'wb') as f:
+                f.seek(position * RATES_DTYPE.itemsize)
+                f.write(rates.tobytes())
+            return len(rates)
@@ -0,0 +1,153 @@
+"""
+Captura do book de ofertas e dos ticks de vários símbolos em um único processo.
+O pacote MetaTrader5 não entrega os eventos de book (OnBookEvent só existe em MQL5),
+então a captura consulta market_book_get e symbol_info_tick em alta frequência e só
+grava quando algo mudou:
+    - o book é comparado pelo hash da tupla de níveis; se mudou, grava no TickStore as
+      mudanças de nível ('delta': inclusão, alteração, remoção) em vez do snapshot;
+    - um snapshot completo ('book') é gravado na primeira leitura e a cada
+      SNAPSHOT_INTERVAL segundos, para a reconstrução poder começar no meio do dia;
+    - o tick só é gravado se algum campo mudou.
+As chamadas passam pela sessão de MT5.py (reconexão, MT5_FAKE).
+
+Uso:
+    cd server
+    python lib/BookCapture.py WSPZ24 WDO$ --intervalo 0.01
+"""
+import threading
+import time
+
+try:
+    from .MT5 import mt5
+    from .TickStore import TickStore, book_records, delta_records, tick_records
+except ImportError:
+    from MT5 import mt5
+    from TickStore import TickStore, book_records, delta_records, tick_records
+
+POLL_INTERVAL = 0.01     # segundos entre consultas de cada rodada
+SNAPSHOT_INTERVAL = 60   # segundos entre snapshots completos do book
+RESUBSCRIBE_INTERVAL = 1 # segundos mínimos entre novas assinaturas do book de um símbolo
+
+_COUNTERS = ('polls', 'book_changes', 'snapshots', 'deltas', 'levels_seen', 'ticks', 'errors')
+
+class _SymbolState:
+    def __init__(self):
+        self.book_hash = None
+        self.levels = None       # {(side, price): volume} do último book
+        self.snapshot_at = 0     # ns do último snapshot gravado
+        self.subscribed_at = 0   # ns da última assinatura do book
+        self.tick = None
+        self.polls = 0
+        self.book_changes = 0
+        self.snapshots = 0
+        self.deltas = 0
+        self.levels_seen = 0     # níveis que snapshots a cada mudança teriam gravado
+        self.ticks = 0
+        self.errors = 0
+
+class BookCapture:
+    def __init__(self, symbols, store=None, interval=POLL_INTERVAL, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.store = store if store is not None else TickStore()
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+        self._symbols = {symbol: _SymbolState() for symbol in symbols}
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def _subscribe(self, symbol):
+        self._symbols[symbol].subscribed_at = time.time_ns()
+        mt5.select(symbol)
+        return mt5.market_book_add(symbol)
+
+    def poll(self, symbol):
+        """Uma consulta do símbolo: grava as mudanças de book e de tick desde a anterior."""
+        state = self._symbols[symbol]
+        state.polls += 1
+        book = mt5.market_book_get(symbol)
+        now = time.time_ns()
+        if book is None:
+            # Assinatura perdida (reconexão) ou símbolo sem book: nova assinatura no
+            # máximo a cada RESUBSCRIBE_INTERVAL, não a cada consulta
+            state.errors += 1
+            if now - state.subscribed_at >= RESUBSCRIBE_INTERVAL * 1e9:
+                self._subscribe(symbol)
+        elif hash(book) != state.book_hash:
+            state.book_hash = hash(book)
+            levels = {(level.type, level.price): level.volume for level in book}
+            state.book_changes += 1
+            state.levels_seen += len(levels)
+            if state.levels is None or now - state.snapshot_at >= self.snapshot_interval * 1e9:
+                self.store.append(symbol, 'book', book_records(book, now))
+                state.snapshot_at = now
+                state.snapshots += 1
+            else:
+                deltas = delta_records(state.levels, levels, now)
+                self.store.append(symbol, 'delta', deltas)
+                state.deltas += len(deltas)
+            state.levels = levels
+
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is not None and tick != state.tick:
+            self.store.append(symbol, 'tick', tick_records(tick, now))
+            state.tick = tick
+            state.ticks += 1
+
+    def run(self):
+        """Laço de captura até stop(): uma rodada por todos os símbolos a cada interval."""
+        mt5.wait_connected()
+        for symbol in self._symbols:
+            self._subscribe(symbol)
+        self._started = time.time()
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                if mt5.is_connected():
+                    for symbol in self._symbols:
+                        self.poll(symbol)
+                self._stop.wait(max(0.0, self.interval - (time.perf_counter() - start)))
+        finally:
+            for symbol in self._symbols:
+                mt5.market_book_release(symbol)
+            self.store.flush()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='book-capture', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def status(self):
+        """Contadores por símbolo: consultas, mudanças de book, snapshots, deltas e ticks gravados."""
+        return {
+            'uptime': None if self._started is None else time.time() - self._started,
+            'symbols': {symbol: {k: v for k, v in vars(state).items() if k in _COUNTERS}
+                        for symbol, state in self._symbols.items()},
+        }
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--intervalo', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--snapshot', type=float, default=SNAPSHOT_INTERVAL)
+    parser.add_argument('--pasta', default='./data/ticks/')
+    args = parser.parse_args()
+
+    capture = BookCapture(args.symbols, TickStore(args.pasta), args.intervalo, args.snapshot)
+    capture.start()
+    try:
+        while True:
+            time.sleep(10)
+            for symbol, s in capture.status()['symbols'].items():
+                print(f"{symbol}: {s['polls']} consultas, {s['book_changes']} mudanças de book, "
+                      f"{s['deltas']} deltas (contra {s['levels_seen']} níveis em snapshots), "
+                      f"{s['snapshots']} snapshots, {s['ticks']} ticks")
+    except KeyboardInterrupt:
+        print("Encerrando a captura...")
+    finally:
+        capture.stop()
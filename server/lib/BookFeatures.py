@@ -0,0 +1,196 @@
+"""
+Indicadores de microestrutura a partir do book e dos ticks gravados (TickStore).
+Cada snapshot do book vira uma linha de matrizes [snapshot, nível] por lado (preço e
+volume, do melhor preço para fora) e os indicadores são operações sobre essas matrizes:
+    spread, mid, imbalance      topo do book; imbalance = (Vb - Va) / (Vb + Va)
+    microprice                  mid ponderado pelo volume do topo (puxa para o lado mais fraco)
+    depth_mid                   o mesmo com o preço médio e o volume total de LEVELS níveis
+    bid_depth_N, ask_depth_N    volume a menos de N ticks do melhor preço (DEPTH_TICKS)
+    bid/ask_queue_change, ofi   variação das filas do topo (order flow imbalance de
+                                Cont, Kukanov e Stoikov), somada entre ticks
+    trade_sign                  +1 compra, -1 venda, 0 sem negócio
+O resultado é colunar (dict de arrays), uma linha por tick, com os indicadores do
+último snapshot até o tick. pd.DataFrame(features) monta a tabela.
+"""
+import numpy as np
+
+try:
+    from .BookReplay import BookReplay
+    from .TickStore import DTYPES, from_price
+except ImportError:
+    from BookReplay import BookReplay
+    from TickStore import DTYPES, from_price
+
+LEVELS = 10               # níveis por lado usados em depth_mid
+DEPTH_TICKS = (1, 5, 10)  # distâncias (em ticks do melhor preço) da profundidade acumulada
+
+# Flags do tick no MetaTrader5 (TICK_FLAG_*)
+TICK_FLAG_LAST = 8
+TICK_FLAG_VOLUME = 16
+TICK_FLAG_BUY = 32
+TICK_FLAG_SELL = 64
+BOOK_TYPE_SELL = 1
+BOOK_TYPE_SELL_MARKET = 3
+
+def tick_size(prices):
+    """Menor passo entre os preços (inteiros escalados) da gravação."""
+    steps = np.diff(np.unique(prices))
+    return int(np.gcd.reduce(steps)) if len(steps) else 1
+
+def snapshot_levels(book, levels=LEVELS):
+    """
+    Snapshots completos -> (tempos, preço de compra, volume, preço de venda, volume),
+    matrizes [snapshot, nível] com preços escalados (0 onde o nível não existe).
+    """
+    times, snapshot = np.unique(book['time'], return_inverse=True)
+    sell = (book['side'] == BOOK_TYPE_SELL) | (book['side'] == BOOK_TYPE_SELL_MARKET)
+    matrices = []
+    for side, direction in ((~sell, -1), (sell, 1)):
+        rows, price = snapshot[side], book['price'][side]
+        # Ordena por snapshot e, dentro dele, do melhor preço para fora
+        order = np.lexsort((direction * price, rows))
+        rows, price, volume = rows[order], price[order], book['volume'][side][order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        keep = rank < levels
+        prices = np.zeros((len(times), levels), dtype=np.int64)
+        volumes = np.zeros((len(times), levels), dtype=np.int64)
+        prices[rows[keep], rank[keep]] = price[keep]
+        volumes[rows[keep], rank[keep]] = volume[keep]
+        matrices += [prices, volumes]
+    return (times, *matrices)
+
+def replay_levels(replay, levels=LEVELS):
+    """
+    O mesmo que snapshot_levels reconstruindo o book (snapshots e deltas) com BookReplay:
+    uma linha por timestamp com mudança no book.
+    """
+    ladder = replay.ladder
+    times, rows = [], []
+    for event in replay.events():
+        if event.kind == 'tick':
+            continue
+        bids = np.flatnonzero(ladder.bids)[::-1][:levels]
+        asks = np.flatnonzero(ladder.asks)[:levels]
+        row = np.zeros((4, levels), dtype=np.int64)
+        row[0, :len(bids)], row[1, :len(bids)] = ladder.prices[bids], ladder.bids[bids]
+        row[2, :len(asks)], row[3, :len(asks)] = ladder.prices[asks], ladder.asks[asks]
+        if times and times[-1] == event.time:
+            rows[-1] = row  # snapshot e deltas no mesmo timestamp: fica o estado final
+        else:
+            times.append(event.time)
+            rows.append(row)
+    data = np.array(rows, dtype=np.int64).reshape(len(rows), 4, levels)
+    return (np.array(times, dtype=np.int64), data[:, 0], data[:, 1], data[:, 2], data[:, 3])
+
+def book_features(times, bid_price, bid_volume, ask_price, ask_volume, tick, levels=LEVELS, depth_ticks=DEPTH_TICKS):
+    """Indicadores por snapshot (dict de arrays) a partir das matrizes de níveis."""
+    bid_price, ask_price = bid_price[:, :levels], ask_price[:, :levels]
+    bid_volume, ask_volume = bid_volume[:, :levels], ask_volume[:, :levels]
+    empty = (bid_volume[:, 0] == 0) | (ask_volume[:, 0] == 0)
+    bid, ask = from_price(bid_price[:, 0]), from_price(ask_price[:, 0])
+    bv, av = bid_volume[:, 0].astype(float), ask_volume[:, 0].astype(float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features = {
+            'book_time': times,
+            'bid_price': bid,
+            'ask_price': ask,
+            'spread': ask - bid,
+            'spread_ticks': (ask_price[:, 0] - bid_price[:, 0]) / tick,
+            'mid': (bid + ask) / 2,
+            'imbalance': (bv - av) / (bv + av),
+            'microprice': (bid * av + ask * bv) / (bv + av),
+        }
+        bid_total, ask_total = bid_volume.sum(axis=1), ask_volume.sum(axis=1)
+        bid_vwap = (from_price(bid_price) * bid_volume).sum(axis=1) / bid_total
+        ask_vwap = (from_price(ask_price) * ask_volume).sum(axis=1) / ask_total
+        features['depth_mid'] = (bid_vwap * ask_total + ask_vwap * bid_total) / (bid_total + ask_total)
+
+    # Distância de cada nível até o melhor preço do lado, em ticks
+    bid_distance = (bid_price[:, :1] - bid_price) // tick
+    ask_distance = (ask_price - ask_price[:, :1]) // tick
+    for n in depth_ticks:
+        features[f'bid_depth_{n}'] = np.where(bid_distance < n, bid_volume, 0).sum(axis=1)
+        features[f'ask_depth_{n}'] = np.where(ask_distance < n, ask_volume, 0).sum(axis=1)
+
+    # Order flow imbalance do topo: fila nova se o preço melhorou ou ficou, menos a
+    # antiga se piorou ou ficou
+    previous_bid, previous_ask = np.roll(bid_price[:, 0], 1), np.roll(ask_price[:, 0], 1)
+    previous_bv, previous_av = np.roll(bv, 1), np.roll(av, 1)
+    bid_change = (bid_price[:, 0] >= previous_bid) * bv - (bid_price[:, 0] <= previous_bid) * previous_bv
+    ask_change = (ask_price[:, 0] <= previous_ask) * av - (ask_price[:, 0] >= previous_ask) * previous_av
+    if len(times):
+        bid_change[0] = ask_change[0] = 0
+    features['bid_queue_change'] = bid_change
+    features['ask_queue_change'] = ask_change
+    features['ofi'] = bid_change - ask_change
+
+    for name in ('bid_price', 'ask_price', 'spread', 'spread_ticks', 'mid', 'imbalance', 'microprice', 'depth_mid'):
+        features[name] = np.where(empty, np.nan, features[name])
+    return features
+
+def trade_sign(ticks, mid=None):
+    """
+    Sinal do agressor de cada tick: TICK_FLAG_BUY/SELL quando presentes; nos demais
+    negócios (flag LAST ou VOLUME, ou Last diferente do tick anterior, caso das capturas
+    por symbol_info_tick) compara o Last com o mid do book e, no mid, usa o tick rule
+    (sentido da última variação do Last). Ticks sem negócio ficam 0.
+    """
+    flags = ticks['flags'].astype(np.int64)
+    last = ticks['last']
+    changed = np.diff(last, prepend=last[:1]) != 0
+    trade = ((flags & (TICK_FLAG_LAST | TICK_FLAG_VOLUME | TICK_FLAG_BUY | TICK_FLAG_SELL)) != 0) | changed
+
+    # Tick rule: sentido da última variação não nula do Last
+    moves = np.sign(np.diff(last, prepend=last[:1]))
+    last_move = np.maximum.accumulate(np.where(moves != 0, np.arange(len(moves)), 0))
+    sign = moves[last_move] if len(moves) else moves
+    if mid is not None:
+        price = from_price(last)
+        sign = np.where(price > mid, 1, np.where(price < mid, -1, sign))
+    sign = np.where(flags & TICK_FLAG_BUY, 1, np.where(flags & TICK_FLAG_SELL, -1, sign))
+    return np.where(trade, sign, 0).astype(np.int8)
+
+def features(book, ticks, deltas=None, levels=LEVELS, depth_ticks=DEPTH_TICKS):
+    """
+    Série colunar alinhada aos ticks: colunas do tick (time, time_msc, last, bid, ask,
+    volume, trade_sign) mais os indicadores do último snapshot até cada tick (NaN antes
+    do primeiro). As variações de fila e o ofi são a soma desde o tick anterior.
+    """
+    ticks = np.sort(np.asarray(ticks, dtype=DTYPES['tick']), order='time', kind='stable')
+    if deltas is not None and len(deltas):
+        replay = BookReplay(book, deltas)
+        levels_data, prices = replay_levels(replay, levels), replay.ladder.prices
+    else:
+        levels_data, prices = snapshot_levels(book, levels), book['price']
+    per_book = book_features(*levels_data, tick_size(prices), levels, depth_ticks)
+
+    # Último snapshot até cada tick (-1 = nenhum ainda)
+    index = np.searchsorted(per_book['book_time'], ticks['time'], side='right') - 1
+    valid = index >= 0
+    columns = {
+        'time': ticks['time'],
+        'time_msc': ticks['time_msc'],
+        'last': from_price(ticks['last']),
+        'bid': from_price(ticks['bid']),
+        'ask': from_price(ticks['ask']),
+        'volume': ticks['volume'],
+    }
+    for name, values in per_book.items():
+        if name in ('bid_queue_change', 'ask_queue_change', 'ofi'):
+            # Soma das variações dos snapshots entre o tick anterior e este
+            total = np.concatenate([[0], np.cumsum(values)])
+            previous = np.concatenate([[-1], index[:-1]])
+            columns[name] = total[index + 1] - total[previous + 1]
+        elif values.dtype.kind == 'f':
+            columns[name] = np.where(valid, values[np.maximum(index, 0)], np.nan) if len(values) else np.full(len(index), np.nan)
+        else:
+            columns[name] = np.where(valid, values[np.maximum(index, 0)], 0) if len(values) else np.zeros(len(index), dtype=values.dtype)
+    columns['trade_sign'] = trade_sign(ticks, columns['mid'])
+    return columns
+
+def store_features(store, symbols, start=None, end=None, **kwargs):
+    """features() de cada símbolo do TickStore entre start e end: {símbolo: colunas}."""
+    return {symbol: features(store.read(symbol, 'book', start, end), store.read(symbol, 'tick', start, end),
+                             store.read(symbol, 'delta', start, end), **kwargs)
+            for symbol in symbols}
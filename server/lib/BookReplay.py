@@ -0,0 +1,129 @@
+"""
+Reconstrução e reprodução do book de ofertas gravado.
+Junta por timestamp os snapshots ('book'), as mudanças de nível ('delta') e os ticks
+de um símbolo, vindos do TickStore ou dos CSVs de orderbook01.py, e reconstrói o book
+L2 em escadas de preço (Ladder) guardadas em arrays: um grid com todos os preços da
+gravação e um array de volume por lado, indexados pelo preço.
+events() é um gerador de Event na ordem do tempo; no mesmo timestamp vêm primeiro o
+snapshot, depois as mudanças e por último o tick. speed=None reproduz o mais rápido
+possível; speed=1 respeita o tempo original (2 = duas vezes mais rápido, ...).
+
+    replay = BookReplay.from_csv(glob('orderbook_WSPZ24_*.csv'), glob('tick_WSPZ24_*.csv'))
+    for event in replay.events():
+        bid, ask = replay.ladder.best_bid(), replay.ladder.best_ask()
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    from .TickStore import DTYPES, DELTA_REMOVE, csv_records, from_price
+except ImportError:
+    from TickStore import DTYPES, DELTA_REMOVE, csv_records, from_price
+
+BOOK_TYPE_SELL = 1
+BOOK_TYPE_SELL_MARKET = 3
+KINDS = ('book', 'delta', 'tick')  # ordem de aplicação no mesmo timestamp
+
+# records: fatia (visão) dos registros do evento, no dtype de TickStore.DTYPES[kind]
+Event = namedtuple('Event', 'time kind records')
+
+class Ladder:
+    """Book L2 em arrays: volume de compra e de venda em cada preço do grid."""
+    def __init__(self, prices):
+        self.prices = np.asarray(prices, dtype=np.int64)  # grid ordenado, inteiros escalados
+        self.bids = np.zeros(len(self.prices), dtype=np.int64)
+        self.asks = np.zeros(len(self.prices), dtype=np.int64)
+
+    def reset(self, index, side, volume):
+        """Troca todo o book pelo snapshot (índices no grid, lados, volumes)."""
+        self.bids[:] = 0
+        self.asks[:] = 0
+        self.update(index, side, volume)
+
+    def update(self, index, side, volume):
+        sell = (side == BOOK_TYPE_SELL) | (side == BOOK_TYPE_SELL_MARKET)
+        self.asks[index[sell]] = volume[sell]
+        self.bids[index[~sell]] = volume[~sell]
+
+    def best_bid(self):
+        """Índice no grid do melhor preço de compra (-1 se vazio)."""
+        levels = np.flatnonzero(self.bids)
+        return int(levels[-1]) if len(levels) else -1
+
+    def best_ask(self):
+        levels = np.flatnonzero(self.asks)
+        return int(levels[0]) if len(levels) else -1
+
+    def depth(self, levels=None):
+        """
+        (preços de compra, volumes, preços de venda, volumes) em R$, do melhor preço para
+        fora, até levels níveis por lado.
+        """
+        bids = np.flatnonzero(self.bids)[::-1][:levels]
+        asks = np.flatnonzero(self.asks)[:levels]
+        return from_price(self.prices[bids]), self.bids[bids], from_price(self.prices[asks]), self.asks[asks]
+
+class BookReplay:
+    def __init__(self, book=None, deltas=None, ticks=None):
+        self.records = {
+            kind: np.empty(0, dtype=DTYPES[kind]) if records is None else np.sort(records, order='time', kind='stable')
+            for kind, records in zip(KINDS, (book, deltas, ticks))
+        }
+        level_prices = [self.records['book']['price'], self.records['delta']['price']]
+        self.ladder = Ladder(np.unique(np.concatenate(level_prices)))
+        # Índice de cada nível no grid, calculado uma vez para toda a gravação
+        self._index = {kind: np.searchsorted(self.ladder.prices, self.records[kind]['price'])
+                       for kind in ('book', 'delta')}
+        self._schedule()
+
+    @classmethod
+    def from_store(cls, store, symbol, start=None, end=None):
+        return cls(*(store.read(symbol, kind, start, end) for kind in KINDS))
+
+    @classmethod
+    def from_csv(cls, book_files, tick_files=()):
+        def load(kind, files):
+            parts = [csv_records(kind, f) for f in sorted(files)]
+            return np.concatenate(parts) if parts else None
+        return cls(load('book', book_files), None, load('tick', tick_files))
+
+    def _schedule(self):
+        """Eventos de todos os tipos em ordem: (tempo, tipo, início, fim) em arrays."""
+        times, kinds, starts, ends = [], [], [], []
+        for k, kind in enumerate(KINDS):
+            t = self.records[kind]['time']
+            # book e delta: registros com o mesmo timestamp formam um evento; tick: um por registro
+            first = np.flatnonzero(np.concatenate([[len(t) > 0], t[1:] != t[:-1]])) if kind != 'tick' else np.arange(len(t))
+            times.append(t[first])
+            kinds.append(np.full(len(first), k))
+            starts.append(first)
+            ends.append(np.append(first[1:], len(t))[:len(first)])
+        times, kinds, starts, ends = map(np.concatenate, (times, kinds, starts, ends))
+        order = np.lexsort((kinds, times))
+        self._events = (times[order], kinds[order], starts[order], ends[order])
+
+    def __len__(self):
+        return len(self._events[0])
+
+    def events(self, speed=None):
+        """
+        Gerador de Event, aplicando cada snapshot ou mudança em self.ladder antes de
+        entregá-lo (a escada é o mesmo objeto a cada evento, não uma cópia).
+        """
+        times, kinds, starts, ends = self._events
+        clock, first = time.perf_counter(), int(times[0]) if len(times) else 0
+        for t, k, start, end in zip(times.tolist(), kinds.tolist(), starts.tolist(), ends.tolist()):
+            if speed:
+                wait = clock + (t - first) / 1e9 / speed - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            kind = KINDS[k]
+            records = self.records[kind][start:end]
+            if kind == 'book':
+                self.ladder.reset(self._index['book'][start:end], records['side'], records['volume'])
+            elif kind == 'delta':
+                volume = np.where(records['action'] == DELTA_REMOVE, 0, records['volume'])
+                self.ladder.update(self._index['delta'][start:end], records['side'], volume)
+            yield Event(t, kind, records)
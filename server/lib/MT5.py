@@ -1,14 +1,57 @@
-import MetaTrader5 as mt5
-import pandas as pd
+import os
+import threading
+import time
+from BarStore import BarStore
+from MT5Session import MT5Session
 
-# Get historical data from MT5
-def get_historical_data(tickerName):
-    rates = mt5.copy_rates_from_pos(tickerName, mt5.TIMEFRAME_M5, 0, 500)
-    df = pd.DataFrame(rates)
+# MT5_FAKE=1 troca o terminal por um feed simulado em processo (testes de carga locais)
+if os.environ.get('MT5_FAKE'):
+    import MT5Fake as _backend
+else:
+    import MetaTrader5 as _backend
+
+# Todas as chamadas ao terminal passam pela sessão supervisionada (reconexão, métricas)
+mt5 = MT5Session(_backend)
+
+BACKFILL_BARS = 50000  # barras pedidas ao MT5 na primeira carga de um símbolo/timeframe
+
+_bar_store = BarStore()
+
+######################################
+# Sincroniza o armazenamento local com o MT5
+def sync_bars(tickerName, timeframe='M5'):
+    """
+    Na primeira vez faz o backfill de BACKFILL_BARS barras; depois pede ao MT5 apenas
+    as barras a partir do último timestamp armazenado (dobrando a janela se houver buraco).
+    """
+    if not wait_connected(0):
+        return  # terminal ainda não conectado: serve o que já está armazenado
+    mt5.select(tickerName)
+    mt5_timeframe = getattr(mt5, f'TIMEFRAME_{timeframe}')
+    last_time = _bar_store.last_time(tickerName, timeframe)
+    if last_time is None:
+        rates = mt5.copy_rates_from_pos(tickerName, mt5_timeframe, 0, BACKFILL_BARS)
+    else:
+        count = 64
+        while True:
+            rates = mt5.copy_rates_from_pos(tickerName, mt5_timeframe, 0, count)
+            if rates is None or len(rates) < count or rates['time'][0] <= last_time or count >= BACKFILL_BARS:
+                break
+            count *= 2
+    if rates is not None and len(rates):
+        _bar_store.append(tickerName, timeframe, rates)
+
+# Get historical data from the local bar store (kept in sync with MT5)
+def get_historical_data(tickerName, count=500, timeframe='M5'):
+    sync_bars(tickerName, timeframe)
+    rates = _bar_store.read(tickerName, timeframe, count)
+    if len(rates) == 0:
+        return None
     #df['time'] = pd.to_datetime(df['time'], unit='s') não precisa transformar deve ficar em inteiro
-    df.rename(columns={'real_volume': 'volume'}, inplace=True)
-    print(df.head())
-    return df.to_dict(orient='records')
+    # 'real_volume' vai como 'volume' (nome usado pelo tradingview)
+    columns = {name: rates[name].tolist() for name in rates.dtype.names}
+    columns['volume'] = columns.pop('real_volume')
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
 
 ######################################
 # Get real-time tick data from MT5
@@ -27,6 +70,7 @@ def get_real_time_tick():
 ######################################
 # Get real-time tick data from MT5 (este pode passar o tick como parâmetro)
 def get_real_time_tick2(tickerName):
+    mt5.select(tickerName)
     tick = mt5.symbol_info_tick(tickerName)
     if tick:
         return {
@@ -38,6 +82,223 @@ def get_real_time_tick2(tickerName):
         }
     return None
 
+######################################
+# Cache de ticks em memória
+# Uma única thread consulta o MT5 para o conjunto de símbolos inscritos e mantém
+# um snapshot compartilhado. As requisições da API leem somente o snapshot, então
+# o número de clientes conectados não gera novas chamadas ao terminal.
+TICK_REFRESH_INTERVAL = 0.5  # segundos entre atualizações do snapshot
+BAR_REFRESH_INTERVAL = 5     # segundos entre verificações da última barra M5 fechada
+# Símbolos acompanhados sempre (MT5_TICK_SYMBOLS=WDO$,WIN$,...); os pedidos pelos
+# clientes entram sob demanda, até MAX_TICK_SYMBOLS no total, e saem depois de
+# TICK_SYMBOL_IDLE segundos sem nenhuma requisição ou stream usando-os
+TICK_SYMBOLS = {s.strip() for s in os.environ.get('MT5_TICK_SYMBOLS', '').split(',') if s.strip()}
+MAX_TICK_SYMBOLS = int(os.environ.get('MT5_MAX_TICK_SYMBOLS', 32))
+TICK_SYMBOL_IDLE = 300
+
+_subscribed = {}  # símbolo pedido por cliente -> último uso (time.time())
+# Pedidos com o terminal desconectado: aceitos sem symbol_select, validados na reconexão
+_unvalidated = set()
+_symbol_errors = {}  # símbolo recusado após a reconexão -> {'error': mensagem}
+
+_tick_snapshot = {}
+_bar_snapshot = {}
+# Versões por (tipo, símbolo): só mudam quando o valor muda, usadas pelo stream SSE
+_versions = {}
+_tick_lock = threading.Lock()
+_changed = threading.Condition(_tick_lock)
+_tick_thread = None
+
+def _same_tick(a, b):
+    return all(a[k] == b[k] for k in ('time', 'bid', 'ask', 'last', 'volume'))
+
+def _refresh_ticks(symbols):
+    """Consulta o MT5 para os símbolos informados e atualiza o snapshot."""
+    for symbol in symbols:
+        tick = get_real_time_tick2(symbol)
+        if tick:
+            tick['updated_at'] = time.time()  # momento em que o servidor leu o tick
+            with _tick_lock:
+                previous = _tick_snapshot.get(symbol)
+                _tick_snapshot[symbol] = tick
+                if previous is None or not _same_tick(previous, tick):
+                    _versions[('tick', symbol)] = _versions.get(('tick', symbol), 0) + 1
+                    _changed.notify_all()
+
+def _refresh_bars(symbols):
+    """Atualiza a última barra M5 fechada (posição 1) de cada símbolo."""
+    for symbol in symbols:
+        mt5.select(symbol)
+        rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M5, 1, 1)
+        if rates is None or len(rates) == 0:
+            continue
+        bar = rates[0]
+        bar = {
+            'time': int(bar['time']),
+            'open': float(bar['open']),
+            'high': float(bar['high']),
+            'low': float(bar['low']),
+            'close': float(bar['close']),
+            'volume': int(bar['real_volume'])
+        }
+        with _tick_lock:
+            if _bar_snapshot.get(symbol) != bar:
+                _bar_snapshot[symbol] = bar
+                _versions[('bar', symbol)] = _versions.get(('bar', symbol), 0) + 1
+                _changed.notify_all()
+
+def _polled_symbols():
+    return TICK_SYMBOLS | _subscribed.keys()
+
+def _reject_symbol(symbol, message):
+    """Tira do poller um símbolo inscrito e avisa os streams (evento 'error')."""
+    with _tick_lock:
+        _unvalidated.discard(symbol)
+        _subscribed.pop(symbol, None)
+        _tick_snapshot.pop(symbol, None)
+        _bar_snapshot.pop(symbol, None)
+        _symbol_errors[symbol] = {'error': message}
+        _versions[('error', symbol)] = _versions.get(('error', symbol), 0) + 1
+        _changed.notify_all()
+    mt5.forget(symbol)
+
+def _validate_symbols():
+    """
+    Seleciona os símbolos aceitos enquanto o terminal estava desconectado. Os que o
+    terminal não conhece (symbol_select falha com a sessão conectada) são recusados.
+    """
+    with _tick_lock:
+        symbols = list(_unvalidated)
+    for symbol in symbols:
+        if mt5.select(symbol):
+            with _tick_lock:
+                _unvalidated.discard(symbol)
+        elif is_connected():
+            _reject_symbol(symbol, f'Unknown symbol: {symbol}')
+
+def _expire_symbols():
+    """Tira do poller os símbolos pedidos por clientes e sem uso há TICK_SYMBOL_IDLE segundos."""
+    now = time.time()
+    with _tick_lock:
+        idle = [s for s, used in _subscribed.items() if now - used > TICK_SYMBOL_IDLE and s not in TICK_SYMBOLS]
+        for symbol in idle:
+            del _subscribed[symbol]
+            _unvalidated.discard(symbol)
+            _tick_snapshot.pop(symbol, None)
+            _bar_snapshot.pop(symbol, None)
+    for symbol in idle:
+        mt5.forget(symbol)
+
+def _tick_poller():
+    last_bars = 0
+    while True:
+        if not mt5.wait_connected(TICK_REFRESH_INTERVAL):
+            continue
+        _validate_symbols()
+        _expire_symbols()
+        with _tick_lock:
+            symbols = list(_polled_symbols())
+        _refresh_ticks(symbols)
+        if time.time() - last_bars >= BAR_REFRESH_INTERVAL:
+            _refresh_bars(symbols)
+            last_bars = time.time()
+        time.sleep(TICK_REFRESH_INTERVAL)
+
+def subscribe_ticks(tickerNames):
+    """
+    Inclui símbolos no conjunto acompanhado pelo poller e o inicia se necessário.
+    Com o terminal conectado, símbolos novos precisam existir (symbol_select) e são lidos
+    uma vez de forma síncrona para que a primeira requisição já tenha valor. Desconectado,
+    são aceitos e validados pelo poller na reconexão; os inexistentes saem do poller e
+    wait_for_changes devolve um ('error', símbolo, {'error': mensagem}) para eles.
+    Retorna os símbolos recusados (inexistentes ou acima de MAX_TICK_SYMBOLS).
+    """
+    global _tick_thread
+    connect()
+    now = time.time()
+    with _tick_lock:
+        for symbol in tickerNames:
+            if symbol in _subscribed:
+                _subscribed[symbol] = now
+        new_symbols = [t for t in dict.fromkeys(tickerNames) if t not in _polled_symbols()]
+        # Acima do limite nem consulta o terminal
+        free = max(0, MAX_TICK_SYMBOLS - len(_polled_symbols()))
+        rejected = new_symbols[free:]
+        new_symbols = new_symbols[:free]
+        if _tick_thread is None:
+            _tick_thread = threading.Thread(target=_tick_poller, name='mt5-tick-poller', daemon=True)
+            _tick_thread.start()
+
+    unvalidated = set()
+    for symbol in new_symbols:
+        if mt5.select(symbol):
+            continue
+        if is_connected():
+            mt5.forget(symbol)
+            rejected.append(symbol)
+        else:
+            unvalidated.add(symbol)
+    accepted = []
+    with _tick_lock:
+        for symbol in new_symbols:
+            if symbol in rejected:
+                continue
+            if len(_polled_symbols()) >= MAX_TICK_SYMBOLS and symbol not in _subscribed:
+                rejected.append(symbol)
+                mt5.forget(symbol)
+                continue
+            _subscribed[symbol] = now
+            _symbol_errors.pop(symbol, None)
+            if symbol in unvalidated:
+                _unvalidated.add(symbol)
+            accepted.append(symbol)
+    if accepted and is_connected():
+        _refresh_ticks(accepted)
+        _refresh_bars(accepted)
+    return rejected
+
+def get_cached_ticks(tickerNames):
+    """
+    Retorna os ticks do snapshot para os símbolos pedidos.
+    Cada tick traz 'updated_at' (epoch da última leitura) e 'stale' (segundos desde então).
+    Símbolos que o MT5 não retornou ficam de fora, como em get_real_time_tick2.
+    """
+    subscribe_ticks(tickerNames)
+    now = time.time()
+    result = {}
+    with _tick_lock:
+        for ticker in tickerNames:
+            tick = _tick_snapshot.get(ticker)
+            if tick:
+                result[ticker] = dict(tick, stale=round(now - tick['updated_at'], 3))
+    return result
+
+def wait_for_changes(tickerNames, seen, timeout):
+    """
+    Bloqueia até que algum tick ou barra fechada dos símbolos mude em relação a 'seen'
+    (dicionário (tipo, símbolo) -> versão, atualizado aqui) ou até estourar o timeout.
+    Retorna a lista de (tipo, símbolo, dados) alterados; vazia no timeout. O tipo 'error'
+    indica um símbolo recusado pelo terminal após a reconexão (ver subscribe_ticks).
+    """
+    deadline = time.time() + timeout
+    with _tick_lock:
+        # Streams abertos mantêm os símbolos no poller
+        for symbol in tickerNames:
+            if symbol in _subscribed:
+                _subscribed[symbol] = time.time()
+        while True:
+            changes = []
+            for symbol in tickerNames:
+                for kind, snapshot in (('tick', _tick_snapshot), ('bar', _bar_snapshot), ('error', _symbol_errors)):
+                    version = _versions.get((kind, symbol))
+                    if version is not None and symbol in snapshot and seen.get((kind, symbol)) != version:
+                        seen[(kind, symbol)] = version
+                        changes.append((kind, symbol, dict(snapshot[symbol])))
+            remaining = deadline - time.time()
+            if changes or remaining <= 0:
+                return changes
+            _changed.wait(remaining)
+
 ######################################
 def get_lastbar_data():
   rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M5, 0, 1)
@@ -55,13 +316,23 @@ def get_lastbar_data():
 
 ######################################
 # Inicializa o MT5
+# A conexão é feita em segundo plano pela sessão (com novas tentativas e reconexão),
+# e não na importação: o servidor sobe e atende (opções, barras já armazenadas)
+# enquanto o terminal não responde.
+def connect():
+    """Inicia a conexão com o terminal em segundo plano (chamadas seguintes não fazem nada)."""
+    mt5.connect()
+
+def is_connected():
+    return mt5.is_connected()
+
+def wait_connected(timeout=None):
+    """Bloqueia até o terminal conectar (ou até o timeout). Retorna True se conectado."""
+    return mt5.wait_connected(timeout)
 
-# MT5 connection
-if not mt5.initialize():
-  print("Initialize failed, error code =", mt5.last_error())
-  quit()
-else: 
-  print("MT5 inicializado")
+def connection_status():
+    """Estado da conexão, reconexões e métricas por chamada (ver MT5Session.status)."""
+    return mt5.status()
 
 """
 # Choose the symbol
@@ -0,0 +1,465 @@
+"""
+Feed simulado do MT5 rodando em processo.
+Implementa o subconjunto da API do pacote MetaTrader5 usado pelo servidor e pelos
+scripts de captura (initialize, symbol_select, symbol_info_tick, copy_rates_*,
+copy_ticks_*, market_book_*, history_deals_get) com os mesmos tipos de retorno.
+Serve para testar e medir o servidor e as ferramentas de captura sem o terminal,
+inclusive em Linux.
+
+Cada símbolo vem de uma de duas fontes:
+    - gravação: arquivos tick_<SÍMBOLO>_*.csv (Timestamp,Last,Bid,Ask,Volume,Flags),
+      orderbook_<SÍMBOLO>_*.csv (Timestamp,Type,Price,Volume) e <SÍMBOLO>.csv
+      (barras no formato de copy_rates) em MT5_FAKE_DATA. A gravação é reproduzida em
+      laço na velocidade MT5_FAKE_SPEED, com os horários originais; sem o arquivo de
+      barras, elas são montadas a partir dos ticks.
+    - passeio aleatório (padrão), com livro sintético em volta do preço.
+
+Uso: definir MT5_FAKE=1 antes de iniciar o servidor (ver MT5.py).
+Variáveis opcionais:
+    MT5_FAKE_TICK_INTERVAL   segundos entre ticks do passeio aleatório (padrão 0.25)
+    MT5_FAKE_LATENCY         atraso artificial por chamada, em segundos (padrão 0)
+    MT5_FAKE_LATENCY_JITTER  atraso extra aleatório, uniforme entre 0 e o valor (padrão 0)
+    MT5_FAKE_DATA            diretórios com as gravações, separados por os.pathsep
+    MT5_FAKE_SPEED           velocidade de reprodução das gravações (padrão 1 = tempo real)
+    MT5_FAKE_BOOK_DEPTH      níveis por lado do livro sintético (padrão 10)
+    MT5_FAKE_MAX_TICKS       ticks guardados por símbolo no passeio aleatório (padrão 200000,
+                             o histórico inicial mais cerca de 11 horas a 0.25 s); os mais
+                             antigos são descartados e as barras só cobrem essa janela
+A latência também pode ser trocada em execução com set_latency().
+"""
+import calendar
+import fnmatch
+import glob
+import os
+import time
+import random
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TIMEFRAME_W1 = 32769
+
+BOOK_TYPE_SELL = 1
+BOOK_TYPE_BUY = 2
+BOOK_TYPE_SELL_MARKET = 3
+BOOK_TYPE_BUY_MARKET = 4
+
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+TICK_FLAG_BID = 2
+TICK_FLAG_ASK = 4
+TICK_FLAG_LAST = 8
+TICK_FLAG_VOLUME = 16
+TICK_FLAG_BUY = 32
+TICK_FLAG_SELL = 64
+
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+
+TICK_INTERVAL = float(os.environ.get('MT5_FAKE_TICK_INTERVAL', 0.25))
+LATENCY = float(os.environ.get('MT5_FAKE_LATENCY', 0))
+LATENCY_JITTER = float(os.environ.get('MT5_FAKE_LATENCY_JITTER', 0))
+DATA_DIRS = [d for d in os.environ.get('MT5_FAKE_DATA', '').split(os.pathsep) if d]
+SPEED = float(os.environ.get('MT5_FAKE_SPEED', 1))
+BOOK_DEPTH = int(os.environ.get('MT5_FAKE_BOOK_DEPTH', 10))
+HISTORY_BARS = 2000
+MAX_TICKS = int(os.environ.get('MT5_FAKE_MAX_TICKS', 200_000))
+
+# Mesmos campos e ordem do Tick retornado pelo MetaTrader5
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc flags volume_real')
+BookInfo = namedtuple('BookInfo', 'type price volume volume_dbl')
+TradeDeal = namedtuple('TradeDeal', 'ticket order time time_msc type entry magic position_id reason '
+                                    'volume price commission swap profit fee symbol comment external_id')
+
+# Mesmo dtype do array retornado por copy_rates_*
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+# Mesmo dtype do array retornado por copy_ticks_*
+TICKS_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8')
+])
+
+# Preço inicial e tamanho do tick por prefixo de símbolo
+PRICES = {
+    'WDO': (5800.0, 0.5),
+    'DOL': (5800.0, 0.5),
+    'WSP': (5800.0, 0.25),
+    'WIN': (128000.0, 5.0),
+    'DI1': (14.5, 0.005),
+}
+
+_TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60, TIMEFRAME_M5: 300, TIMEFRAME_M15: 900,
+    TIMEFRAME_H1: 3600, TIMEFRAME_H4: 4 * 3600, TIMEFRAME_D1: 86400, TIMEFRAME_W1: 7 * 86400,
+}
+_WEEK_OFFSET = 3 * 86400  # 01/01/1970 foi quinta-feira; barras semanais começam no domingo
+
+_lock = threading.Lock()
+_symbols = {}
+
+
+def _epoch(value):
+    """Segundos desde 1970 de um datetime (sem fuso = horário do servidor, como no MetaTrader5) ou número."""
+    if hasattr(value, 'timetuple'):
+        if getattr(value, 'tzinfo', None) is not None:
+            return value.timestamp()
+        return calendar.timegm(value.timetuple()) + getattr(value, 'microsecond', 0) / 1e6
+    return float(value)
+
+def _aggregate(rates, timeframe):
+    """Agrega barras ordenadas no timeframe pedido (barras de timeframe menor que a base ficam como estão)."""
+    seconds = _TIMEFRAME_SECONDS.get(timeframe, 300)
+    offset = _WEEK_OFFSET if timeframe == TIMEFRAME_W1 else 0
+    if len(rates) == 0:
+        return rates
+    keys = rates['time'] - (rates['time'] - offset) % seconds
+    first = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    last = np.concatenate([first[1:] - 1, [len(rates) - 1]])
+    out = np.empty(len(first), dtype=RATES_DTYPE)
+    out['time'] = keys[first]
+    out['open'] = rates['open'][first]
+    out['high'] = np.maximum.reduceat(rates['high'], first)
+    out['low'] = np.minimum.reduceat(rates['low'], first)
+    out['close'] = rates['close'][last]
+    out['tick_volume'] = np.add.reduceat(rates['tick_volume'], first)
+    out['spread'] = np.minimum.reduceat(rates['spread'], first)
+    out['real_volume'] = np.add.reduceat(rates['real_volume'], first)
+    return out
+
+def _bars_from_ticks(ticks, tick_size):
+    """Barras M1 a partir dos ticks com negócio (flags LAST ou VOLUME)."""
+    trades = ticks[(ticks['flags'] & (TICK_FLAG_LAST | TICK_FLAG_VOLUME)) != 0]
+    rates = np.empty(len(trades), dtype=RATES_DTYPE)
+    rates['time'] = trades['time']
+    for field in ('open', 'high', 'low', 'close'):
+        rates[field] = trades['last']
+    rates['tick_volume'] = 1
+    rates['spread'] = np.rint((trades['ask'] - trades['bid']) / tick_size)
+    rates['real_volume'] = trades['volume']
+    return _aggregate(rates, TIMEFRAME_M1)
+
+def _tick_mask(ticks, flags):
+    if flags == COPY_TICKS_INFO:
+        return (ticks['flags'] & (TICK_FLAG_BID | TICK_FLAG_ASK)) != 0
+    if flags == COPY_TICKS_TRADE:
+        return (ticks['flags'] & (TICK_FLAG_LAST | TICK_FLAG_VOLUME)) != 0
+    return np.ones(len(ticks), dtype=bool)
+
+def _read_csv(files):
+    """Linhas (como arrays de str por coluna) de CSVs com o mesmo cabeçalho, concatenadas."""
+    tables = [np.loadtxt(f, delimiter=',', skiprows=1, dtype=str, ndmin=2) for f in sorted(files)]
+    tables = [t for t in tables if len(t)]
+    return np.concatenate(tables).T if tables else None
+
+def _msc(timestamps):
+    return np.array(timestamps, dtype='datetime64[ms]').astype(np.int64)
+
+
+class _Symbol:
+    """
+    Passeio aleatório: ticks a cada TICK_INTERVAL, barras M1 e livro sintético.
+    Os ticks ficam em um buffer circular de MAX_TICKS; as barras são montadas a partir dele.
+    """
+    def __init__(self, name):
+        price, tick_size = PRICES.get(name[:3], (100.0, 0.01))
+        self.rng = random.Random(name)
+        self.book_rng = random.Random(name + ':book')
+        self.tick_size = tick_size
+        self.price = price
+        self.volume = 0
+        self.flags = TICK_FLAG_BID | TICK_FLAG_ASK
+        self.last_step = time.time()
+        self._ring = np.empty(MAX_TICKS, dtype=TICKS_DTYPE)
+        self._count = 0           # ticks gerados desde o início (o buffer guarda os últimos MAX_TICKS)
+        self._tick_array = (0, np.empty(0, dtype=TICKS_DTYPE))  # (contagem, ticks em ordem)
+        self._m1 = (0, None)      # (contagem, barras M1 da janela)
+        self._depth = {}          # (lado, preço) -> volume do último book
+        self._book = None
+        self._book_ticks = 0
+        self._backfill()
+
+    def _move(self, timestamp):
+        steps = self.rng.choice((-2, -1, -1, 0, 0, 0, 1, 1, 2))
+        self.price = round(max(self.tick_size, self.price + steps * self.tick_size), 6)
+        self.volume = self.rng.randint(1, 20)
+        self.flags = TICK_FLAG_LAST | TICK_FLAG_VOLUME | (TICK_FLAG_BID | TICK_FLAG_ASK if steps else 0)
+        self.flags |= TICK_FLAG_BUY if steps > 0 else TICK_FLAG_SELL if steps < 0 else 0
+        self._ring[self._count % MAX_TICKS] = (int(timestamp), self.price - self.tick_size, self.price, self.price,
+                                               self.volume, int(timestamp * 1000), self.flags, float(self.volume))
+        self._count += 1
+
+    def _backfill(self):
+        now = int(self.last_step)
+        first = now - now % 60 - HISTORY_BARS * 5 * 60
+        for timestamp in range(first, now, 15):
+            self._move(timestamp)
+
+    def step(self):
+        now = time.time()
+        steps = min(int((now - self.last_step) / TICK_INTERVAL), 1000)
+        for i in range(steps):
+            self.last_step += TICK_INTERVAL
+            self._move(self.last_step)
+
+    def tick(self):
+        spread = self.tick_size
+        return Tick(int(self.last_step), self.price - spread, self.price, self.price,
+                    self.volume, int(self.last_step * 1000), self.flags, float(self.volume))
+
+    def ticks(self):
+        # Janela em ordem de tempo, refeita só quando há ticks novos
+        count, ticks = self._tick_array
+        if count != self._count:
+            if self._count <= MAX_TICKS:
+                ticks = self._ring[:self._count].copy()
+            else:
+                start = self._count % MAX_TICKS
+                ticks = np.concatenate([self._ring[start:], self._ring[:start]])
+            self._tick_array = (self._count, ticks)
+        return ticks
+
+    def rates(self, timeframe):
+        # Barras M1 da janela de ticks; timeframes maiores são agregados a partir delas
+        if self._m1[0] != self._count:
+            self._m1 = (self._count, _bars_from_ticks(self.ticks(), self.tick_size))
+        return _aggregate(self._m1[1], timeframe)
+
+    def book(self):
+        # O book só muda junto com os ticks: níveis que continuam no livro mantêm o
+        # volume e alguns deles são alterados a cada tick novo
+        if self._book is not None and self._book_ticks == self._count:
+            return self._book
+        bid, ask = self.price - self.tick_size, self.price
+        levels = [(BOOK_TYPE_SELL, round(ask + i * self.tick_size, 6)) for i in range(BOOK_DEPTH)][::-1]
+        levels += [(BOOK_TYPE_BUY, round(bid - i * self.tick_size, 6)) for i in range(BOOK_DEPTH)]
+        depth = {key: self._depth.get(key) or self.book_rng.randint(1, 50) for key in levels}
+        for key in self.book_rng.sample(levels, min(3, len(levels))):
+            depth[key] = self.book_rng.randint(1, 50)
+        self._depth = depth
+        self._book = tuple(BookInfo(side, price, depth[side, price], float(depth[side, price])) for side, price in levels)
+        self._book_ticks = self._count
+        return self._book
+
+
+class _Recorded:
+    """
+    Reprodução de uma gravação em laço: o instante reproduzido avança com o relógio
+    (vezes SPEED) a partir do primeiro registro; tick e livro são os últimos gravados
+    até ele. As gravações de captura vêm de symbol_info_tick, cujos flags só indicam a
+    última mudança: ticks em que Last ou Volume mudou são marcados como negócio.
+    """
+    def __init__(self, name, tick_files, book_files, bar_files):
+        self.tick_size = PRICES.get(name[:3], (100.0, 0.01))[1]
+        self._ticks = np.empty(0, dtype=TICKS_DTYPE)
+        columns = _read_csv(tick_files)
+        if columns is not None:
+            timestamp, last, bid, ask, volume, flags = columns
+            order = np.argsort(_msc(timestamp), kind='stable')
+            ticks = np.empty(len(order), dtype=TICKS_DTYPE)
+            ticks['time_msc'] = _msc(timestamp)[order]
+            ticks['time'] = ticks['time_msc'] // 1000
+            ticks['last'] = last.astype(float)[order]
+            ticks['bid'] = bid.astype(float)[order]
+            ticks['ask'] = ask.astype(float)[order]
+            ticks['volume'] = volume.astype(float)[order]
+            ticks['volume_real'] = ticks['volume']
+            ticks['flags'] = flags.astype(np.int64)[order]
+            traded = np.concatenate([[True], (np.diff(ticks['last']) != 0) | (np.diff(ticks['volume'].astype(np.int64)) != 0)])
+            ticks['flags'] |= np.where(traded, TICK_FLAG_LAST | TICK_FLAG_VOLUME, 0).astype(np.uint32)
+            self._ticks = ticks
+
+        # Livro: linhas com o mesmo Timestamp formam um snapshot, na ordem gravada
+        self._book_times = np.empty(0, dtype=np.int64)
+        columns = _read_csv(book_files)
+        if columns is not None:
+            timestamp, kind, price, volume = columns
+            msc = _msc(timestamp)
+            order = np.argsort(msc, kind='stable')
+            msc = msc[order]
+            self._book_rows = [BookInfo(int(t), float(p), int(float(v)), float(v))
+                               for t, p, v in zip(kind[order], price[order], volume[order])]
+            self._book_start = np.flatnonzero(np.concatenate([[True], msc[1:] != msc[:-1]]))
+            self._book_times = msc[self._book_start]
+            self._book_end = np.concatenate([self._book_start[1:], [len(msc)]])
+
+        columns = _read_csv(bar_files)
+        if columns is not None:
+            rates = np.empty(len(columns[0]), dtype=RATES_DTYPE)
+            rates['time'] = _msc(columns[0]) // 1000
+            for field, values in zip(RATES_DTYPE.names[1:], columns[1:]):
+                rates[field] = values.astype(float)
+            self._bars = np.sort(rates, order='time')
+        else:
+            self._bars = _bars_from_ticks(self._ticks, self.tick_size)
+
+        starts = [a[0] for a in (self._ticks['time_msc'], self._book_times) if len(a)]
+        ends = [a[-1] for a in (self._ticks['time_msc'], self._book_times) if len(a)]
+        self.start = min(starts) if starts else 0
+        self.span = max(max(ends) - self.start, 1) if ends else 1
+        self.clock = time.time()
+
+    def _position(self):
+        """Instante reproduzido, em ms no relógio da gravação."""
+        return self.start + int((time.time() - self.clock) * SPEED * 1000) % (self.span + 1)
+
+    def step(self):
+        pass
+
+    def tick(self):
+        if not len(self._ticks):
+            return None
+        i = max(np.searchsorted(self._ticks['time_msc'], self._position(), side='right') - 1, 0)
+        return Tick(*self._ticks[i].tolist())
+
+    def ticks(self):
+        return self._ticks
+
+    def rates(self, timeframe):
+        return _aggregate(self._bars, timeframe)
+
+    def book(self):
+        if not len(self._book_times):
+            return None
+        i = max(np.searchsorted(self._book_times, self._position(), side='right') - 1, 0)
+        return tuple(self._book_rows[self._book_start[i]:self._book_end[i]])
+
+
+def _recorded_files(symbol):
+    def find(pattern):
+        return [f for d in DATA_DIRS for f in glob.glob(os.path.join(d, pattern))]
+    return find(f'tick_{symbol}_*.csv'), find(f'orderbook_{symbol}_*.csv'), find(f'{symbol}.csv')
+
+def set_latency(latency, jitter=0.0):
+    """Troca o atraso artificial por chamada (segundos fixos mais até jitter aleatório)."""
+    global LATENCY, LATENCY_JITTER
+    LATENCY, LATENCY_JITTER = float(latency), float(jitter)
+
+def _delay():
+    if LATENCY or LATENCY_JITTER:
+        time.sleep(LATENCY + random.uniform(0, LATENCY_JITTER))
+
+def _get(symbol):
+    _delay()
+    with _lock:
+        state = _symbols.get(symbol)
+        if state is None:
+            files = _recorded_files(symbol)
+            state = _symbols[symbol] = _Recorded(symbol, *files) if any(files) else _Symbol(symbol)
+        state.step()
+        return state
+
+
+def initialize(*args, **kwargs):
+    return True
+
+def shutdown():
+    return True
+
+def last_error():
+    return (1, 'Success')
+
+def symbol_select(symbol, enable=True):
+    _get(symbol)
+    return True
+
+def symbol_info_tick(symbol):
+    state = _get(symbol)
+    with _lock:
+        return state.tick()
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    state = _get(symbol)
+    with _lock:
+        rates = state.rates(timeframe)
+    end = len(rates) - start_pos
+    return rates[max(0, end - count):max(0, end)]
+
+def copy_rates_from(symbol, timeframe, date_from, count):
+    state = _get(symbol)
+    with _lock:
+        rates = state.rates(timeframe)
+    end = np.searchsorted(rates['time'], _epoch(date_from), side='right')
+    return rates[max(0, end - count):end]
+
+def copy_rates_range(symbol, timeframe, date_from, date_to):
+    state = _get(symbol)
+    with _lock:
+        rates = state.rates(timeframe)
+    return rates[(rates['time'] >= _epoch(date_from)) & (rates['time'] <= _epoch(date_to))]
+
+def copy_ticks_from(symbol, date_from, count, flags=COPY_TICKS_ALL):
+    state = _get(symbol)
+    with _lock:
+        ticks = state.ticks()
+    ticks = ticks[np.searchsorted(ticks['time_msc'], int(_epoch(date_from) * 1000)):]
+    return ticks[_tick_mask(ticks, flags)][:count]
+
+def copy_ticks_range(symbol, date_from, date_to, flags=COPY_TICKS_ALL):
+    state = _get(symbol)
+    with _lock:
+        ticks = state.ticks()
+    first, last = np.searchsorted(ticks['time_msc'], [int(_epoch(date_from) * 1000), int(_epoch(date_to) * 1000)], side='left')
+    ticks = ticks[first:last]
+    return ticks[_tick_mask(ticks, flags)]
+
+def market_book_add(symbol):
+    _get(symbol)
+    return True
+
+def market_book_release(symbol):
+    return True
+
+def market_book_get(symbol):
+    state = _get(symbol)
+    with _lock:
+        return state.book()
+
+def _group_match(symbol, group):
+    """Filtro de grupo do MT5: padrões separados por vírgula com * e exclusão com '!'."""
+    included = False
+    for pattern in (p.strip() for p in group.split(',')):
+        if pattern.startswith('!') and fnmatch.fnmatchcase(symbol, pattern[1:]):
+            return False
+        included = included or fnmatch.fnmatchcase(symbol, pattern)
+    return included
+
+def history_deals_get(date_from=None, date_to=None, group=None, ticket=None, position=None):
+    """
+    Negócios dos símbolos já usados na sessão: cada tick com negócio vira um deal de
+    entrada (compra ou venda conforme o agressor). ticket e position_id são
+    time_msc * 100 + índice do símbolo.
+    """
+    _delay()
+    start = -np.inf if date_from is None else _epoch(date_from) * 1000
+    end = np.inf if date_to is None else _epoch(date_to) * 1000
+    deals = []
+    with _lock:
+        for index, (symbol, state) in enumerate(_symbols.items()):
+            if group is not None and not _group_match(symbol, group):
+                continue
+            ticks = state.ticks()
+            ticks = ticks[_tick_mask(ticks, COPY_TICKS_TRADE) & (ticks['time_msc'] >= start) & (ticks['time_msc'] <= end)]
+            for t in ticks:
+                number = int(t['time_msc']) * 100 + index
+                if ticket is not None and number != ticket or position is not None and number != position:
+                    continue
+                side = DEAL_TYPE_SELL if t['flags'] & TICK_FLAG_SELL else DEAL_TYPE_BUY
+                deals.append(TradeDeal(number, number, int(t['time']), int(t['time_msc']), side, DEAL_ENTRY_IN,
+                                       0, number, 0, float(t['volume_real']), float(t['last']),
+                                       0.0, 0.0, 0.0, 0.0, symbol, '', ''))
+    deals.sort(key=lambda d: d.time_msc)
+    return tuple(deals)
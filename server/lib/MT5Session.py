@@ -0,0 +1,213 @@
+"""
+Sessão supervisionada com o terminal MT5.
+Envolve o módulo MetaTrader5 (ou MT5Fake) e passa a ser o único dono da conexão:
+    - conecta em segundo plano, com novas tentativas e backoff exponencial;
+    - toda chamada ao terminal passa por call(), que mede a latência e conta erros;
+    - um resultado None com last_error() de falha de comunicação (códigos <= -10000:
+      IPC, envio, recebimento, timeout) marca a sessão como desconectada e dispara a
+      reconexão; enquanto isso as chamadas retornam None sem ir ao terminal;
+    - os símbolos usados são selecionados (symbol_select) uma vez por conexão e de novo
+      após cada reconexão.
+Atributos que não são funções (TIMEFRAME_M5, ...) são repassados do módulo original.
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+RETRY_DELAY = 1       # segundos até a segunda tentativa; dobra a cada falha
+RETRY_MAX_DELAY = 30  # limite do intervalo entre tentativas
+LATENCY_WINDOW = 1024  # últimas latências guardadas por função (para percentis)
+
+# last_error() do MetaTrader5: RES_E_INTERNAL_FAIL (-10000) e abaixo são falhas de
+# comunicação com o terminal (envio, recebimento, inicialização, conexão, timeout)
+DISCONNECT_ERROR = -10000
+RES_E_NOT_FOUND = -4
+
+# Funções que não são chamadas de dados e ficam fora do supervisionamento
+_SESSION_CALLS = {'initialize', 'shutdown', 'last_error', 'login', 'version'}
+
+class _CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.skipped = 0  # chamadas recusadas por estar desconectado
+        self.total = 0.0
+        self.max = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.last_error = None
+
+    def snapshot(self):
+        latencies = np.array(self.latencies) * 1000
+        p50, p95 = np.percentile(latencies, [50, 95]) if len(latencies) else (None, None)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'skipped': self.skipped,
+            'avg_ms': self.total / self.calls * 1000 if self.calls else None,
+            'p50_ms': None if p50 is None else float(p50),
+            'p95_ms': None if p95 is None else float(p95),
+            'max_ms': self.max * 1000,
+            'last_error': self.last_error,
+        }
+
+class MT5Session:
+    def __init__(self, backend, retry_delay=RETRY_DELAY, retry_max_delay=RETRY_MAX_DELAY):
+        self.backend = backend
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        self._connected = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._symbols = set()    # símbolos usados (re-selecionados após reconectar)
+        self._selected = set()   # selecionados na conexão atual
+        self._stats = {}
+        self._status = {
+            'state': 'idle', 'attempts': 0, 'reconnects': 0, 'last_error': None,
+            'connected_at': None, 'disconnected_at': None, 'downtime': 0.0,
+        }
+
+    def __getattr__(self, name):
+        attribute = getattr(self.backend, name)
+        if not callable(attribute) or name in _SESSION_CALLS:
+            return attribute
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    ######################################
+    # Conexão
+    def connect(self):
+        """Inicia a conexão em segundo plano (não faz nada se já conectado ou conectando)."""
+        with self._lock:
+            # A própria thread de conexão pode pedir uma nova (falha ao re-selecionar os
+            # símbolos logo após conectar): ela termina logo em seguida, então não conta
+            running = (self._thread is not None and self._thread.is_alive()
+                       and self._thread is not threading.current_thread())
+            if self._connected.is_set() or running:
+                return
+            self._status['state'] = 'connecting' if self._status['connected_at'] is None else 'reconnecting'
+            self._thread = threading.Thread(target=self._connect_loop, name='mt5-connect', daemon=True)
+            self._thread.start()
+
+    def _connect_loop(self):
+        delay = self.retry_delay
+        while True:
+            with self._lock:
+                self._status['attempts'] += 1
+            if self.backend.initialize():
+                with self._lock:
+                    reconnect = self._status['connected_at'] is not None
+                    if self._status['disconnected_at'] is not None:
+                        self._status['downtime'] += time.time() - self._status['disconnected_at']
+                    self._status.update(state='connected', last_error=None, connected_at=time.time(), disconnected_at=None)
+                    self._status['reconnects'] += reconnect
+                    self._selected.clear()
+                    symbols = list(self._symbols)
+                self._connected.set()
+                print("MT5 reconectado" if reconnect else "MT5 inicializado")
+                for symbol in symbols:
+                    self._select(symbol)
+                return
+            error = self.backend.last_error()
+            with self._lock:
+                self._status.update(state='retrying', last_error=str(error))
+            print(f"Initialize failed, error code = {error}; nova tentativa em {delay}s")
+            time.sleep(delay)
+            delay = min(delay * 2, self.retry_max_delay)
+
+    def _disconnected(self, error):
+        """Falha de comunicação: derruba a sessão e reconecta em segundo plano."""
+        with self._lock:
+            if not self._connected.is_set():
+                return
+            self._connected.clear()
+            self._status.update(state='disconnected', last_error=str(error), disconnected_at=time.time())
+        print(f"MT5 desconectado ({error}); reconectando")
+        self.backend.shutdown()
+        self.connect()
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def wait_connected(self, timeout=None):
+        """Bloqueia até conectar (ou até o timeout); inicia a conexão se necessário."""
+        self.connect()
+        return self._connected.wait(timeout)
+
+    ######################################
+    # Símbolos
+    def select(self, symbol):
+        """
+        Garante o símbolo no Market Watch da conexão atual (symbol_select uma vez por conexão).
+        Desconectado, só registra o símbolo e retorna False: ele é selecionado na reconexão,
+        e quem o pediu deve validá-lo então (e chamar forget se o terminal não o conhecer).
+        """
+        with self._lock:
+            self._symbols.add(symbol)
+        return self._select(symbol)
+
+    def _select(self, symbol):
+        with self._lock:
+            # Esquecido (forget) enquanto a reconexão re-selecionava os símbolos
+            if symbol not in self._symbols:
+                return False
+            if symbol in self._selected or not self._connected.is_set():
+                return self._connected.is_set()
+        if self.call('symbol_select', symbol, True):
+            with self._lock:
+                if symbol in self._symbols:
+                    self._selected.add(symbol)
+            return True
+        return False
+
+    def forget(self, symbol):
+        """Deixa de re-selecionar o símbolo após reconexões."""
+        with self._lock:
+            self._symbols.discard(symbol)
+            self._selected.discard(symbol)
+
+    ######################################
+    # Chamadas
+    def call(self, name, *args, **kwargs):
+        """
+        Chama backend.name(*args) medindo a latência. None (ou False) como resultado conta
+        como erro, com o last_error() guardado; falha de comunicação dispara a reconexão.
+        Desconectado, retorna None sem chamar o terminal.
+        """
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _CallStats()
+            if not self._connected.is_set():
+                stats.skipped += 1
+                return None
+
+        start = time.perf_counter()
+        result = getattr(self.backend, name)(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        error = None if result is not None and result is not False else self.backend.last_error()
+
+        with self._lock:
+            stats.calls += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.latencies.append(elapsed)
+            if error is not None:
+                stats.errors += 1
+                stats.last_error = str(error)
+        if error is not None and error[0] <= DISCONNECT_ERROR:
+            self._disconnected(error)
+        elif error is not None and error[0] == RES_E_NOT_FOUND and name != 'symbol_select' and args:
+            # Símbolo fora do Market Watch: seleciona de novo na próxima chamada
+            with self._lock:
+                self._selected.discard(args[0])
+        return result
+
+    def status(self):
+        """Estado da conexão e métricas por função (chamadas, erros, latências em ms)."""
+        with self._lock:
+            status = dict(self._status, connected=self._connected.is_set(), symbols=sorted(self._symbols))
+            if status['disconnected_at'] is not None:
+                status['downtime'] += time.time() - status['disconnected_at']
+            status['calls'] = {name: stats.snapshot() for name, stats in self._stats.items()}
+        return status
@@ -5,10 +5,6 @@ focado na identificação de níveis de suporte e resistência através da expos
 
 import numpy as np
 import pandas as pd
-from scipy.stats import norm
-from sklearn.cluster import DBSCAN
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, date
 
 try:
@@ -18,11 +14,29 @@ except ImportError:
     # Funciona quando o script é executado diretamente (teste em console)
     from data_loader import OptionsDataLoader
 
+try:
+    from .volatility import VolSurface
+except ImportError:
+    from volatility import VolSurface
+
+try:
+    from .greeks import gamma, greeks, dealer_exposure, GREEKS
+except ImportError:
+    from greeks import gamma, greeks, dealer_exposure, GREEKS
+
+try:
+    from .clustering import kde_clusters, gap_clusters
+except ImportError:
+    from clustering import kde_clusters, gap_clusters
+
 try:
     from .config import *
 except ImportError:
     from config import *
 
+from B3.Calendario import DolarOption
+import business_days
+
 class OptionsAnalysis:
     def __init__(self, current_price, contract_filter, calls='calls.csv', puts='puts.csv'):
         # Carrega e prepara os dados
@@ -35,20 +49,71 @@ class OptionsAnalysis:
         loader = OptionsDataLoader()
         self.df = loader.prepare_data(calls_csv, puts_csv, contract_filter)
         self.current_price = current_price
+        self.surface = None
+        self._surfaces = {}
+
+    @classmethod
+    def from_frame(cls, current_price, df):
+        """Cria a análise a partir de um DataFrame já preparado (ex.: OptionsStore.load_day)."""
+        analyzer = cls.__new__(cls)
+        analyzer.df = df.reset_index(drop=True)
+        analyzer.current_price = current_price
+        analyzer.surface = None
+        analyzer._surfaces = {}
+        return analyzer
 
     def getOptionsData(self):
         return self.df
 
-    def calculate_gamma(self, S, K, T, r, sigma):
+    def vol_surface(self, as_of=None):
+        """
+        Superfície de volatilidade implícita (VolSurface) das opções carregadas, resolvida
+        para o preço atual e a data as_of. Fica em cache por (preço, data): basta atualizar
+        current_price para a próxima chamada resolver de novo.
+        """
+        key = (float(self.current_price), str(as_of or date.today()))
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = VolSurface.fit(self.df, self.current_price, as_of, self._time_to_expiry(as_of))
+            self._surfaces = {key: surface}
+        return surface
+
+    def use_implied_vol(self, as_of=None):
+        """Passa a usar o smile de cada série (em vez de DEFAULT_VOLATILITY) nos cálculos de gamma."""
+        self.surface = self.vol_surface(as_of)
+        return self.surface
+
+    def _volatility(self):
+        """Volatilidade de cada linha de self.df: da superfície, se em uso, ou DEFAULT_VOLATILITY."""
+        if self.surface is None:
+            return np.full(len(self.df), DEFAULT_VOLATILITY)
+        return self.surface.for_frame(self.df)
+
+    def calculate_gamma(self, S, K, T, r, sigma, q=CUPOM_CAMBIAL):
         """
-        Calcula o gamma de uma opção usando a fórmula Black–Scholes.
+        Calcula o gamma de uma opção (Garman-Kohlhagen, greeks.gamma), com o cupom
+        cambial como carregamento, como em dealer_exposure: o GEX dos dois é o mesmo.
         Note que o gamma é o mesmo para calls e puts.
+        Aceita escalares ou arrays NumPy (com broadcast).
         """
-        d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-        gamma = norm.pdf(d1) / (S * sigma * np.sqrt(T))
-        return gamma
+        return gamma(S, K, T, r, q, sigma)
 
-    def calculate_gamma_exposure(self, days_to_expiry):
+    def _exposure_inputs(self):
+        """
+        Arrays de Strike, OI e sinal (+1 call, -1 put) usados no cálculo de exposição.
+        """
+        # Assegura que 'Strike' e 'OI' sejam numéricos
+        self.df['Strike'] = pd.to_numeric(self.df['Strike'], errors='coerce')
+        self.df['OI'] = pd.to_numeric(self.df['OI'], errors='coerce')
+
+        strikes = self.df['Strike'].to_numpy(dtype=float)
+        oi = self.df['OI'].to_numpy(dtype=float)
+        # Calls trazem pressão de venda (resistência): sinal positivo
+        # Puts trazem pressão de compra (suporte): sinal negativo
+        sign = np.where(self.df['Tipo'].astype(str).str.strip().str.lower() == 'call', 1.0, -1.0)
+        return strikes, oi, sign
+
+    def calculate_gamma_exposure(self, days_to_expiry=None, as_of=None):
         """
         Calcula a exposição total de gamma, considerando o lado da opção.
         Para calls, a exposição é positiva (indicando resistência);
@@ -64,59 +129,192 @@ class OptionsAnalysis:
 
         Esta função também agrega a exposição por Strike para facilitar a identificação
         de zonas com suporte (exposição negativa) e resistência (exposição positiva).
+        O cálculo é feito sobre as colunas inteiras (sem apply por linha).
+        Sem days_to_expiry, cada série usa o próprio prazo até o vencimento em as_of
+        (várias séries carregadas); opções vencidas ficam com exposição 0.
         """
-        # Assegura que 'Strike' e 'OI' sejam numéricos
-        self.df['Strike'] = pd.to_numeric(self.df['Strike'], errors='coerce')
-        self.df['OI'] = pd.to_numeric(self.df['OI'], errors='coerce')
-
-        # Função interna para calcular a exposição para cada linha (opção)
-        def compute_exposure(row):
-            try:
-                gamma = self.calculate_gamma(
-                    S=float(self.current_price),
-                    K=float(row.Strike),
-                    T=float(days_to_expiry) / 252,  # Assumindo 252 dias de negociação
-                    r=SELIC_RATE,
-                    sigma=DEFAULT_VOLATILITY
-                )
-                # Definir o sinal de acordo com o tipo de opção.
-                # Calls trazem pressão de venda (resistência): sinal positivo
-                # Puts trazem pressão de compra (suporte): sinal negativo
-                option_type = row.Tipo.strip().lower()
-                sign = 1 if option_type == 'call' else -1
-                # Calcula a exposição ponderada com open interest e o fator de contrato
-                return float(gamma * sign * row.OI * CONTRACT_SIZE)
-            except (ValueError, TypeError) as e:
-                print(f"Error processing row: {row}, Error: {e}")
-                return 0.0
-
-        # Calcular Gamma Exposure usando apply com lambda
-        self.df['Gamma_Exposure'] = self.df.apply(lambda row: compute_exposure(row), axis=1)
+        strikes, oi, sign = self._exposure_inputs()
+        if days_to_expiry is None:
+            T = self._time_to_expiry(as_of)
+            T = np.where(T > 0, T, np.nan)
+        else:
+            T = float(days_to_expiry) / 252  # Assumindo 252 dias de negociação
+        gamma = self.calculate_gamma(
+            S=float(self.current_price),
+            K=strikes,
+            T=T,
+            r=SELIC_RATE,
+            sigma=self._volatility()
+        )
+        exposure = gamma * sign * oi * CONTRACT_SIZE
+        self.df['Gamma_Exposure'] = exposure if days_to_expiry is not None else np.nan_to_num(exposure)
 
         # Agrega a exposição de gamma por Strike para visualizar o efeito líquido
-        exposure_by_strike = (
-            self.df.groupby('Strike')['Gamma_Exposure']
-            .sum()
-            .reset_index()
-            .rename(columns={'Gamma_Exposure': 'Net_Gamma_Exposure'})
+        self.df['Net_Gamma_Exposure'] = self.df.groupby('Strike')['Gamma_Exposure'].transform('sum')
+
+        return self.df
+
+    def calculate_gamma_exposure_matrix(self, spot_prices, days_to_expiry):
+        """
+        Exposição líquida de gamma por Strike para vários preços do ativo em uma única chamada.
+
+        Args:
+            spot_prices: sequência de preços do ativo (n_spots)
+            days_to_expiry: dias até o vencimento
+
+        Returns:
+            (strikes, matrix): strikes únicos ordenados (n_strikes) e a matriz
+            (n_spots × n_strikes) com a soma de calls e puts em cada strike.
+        """
+        strikes, oi, sign = self._exposure_inputs()
+        valid = ~np.isnan(strikes)
+        strikes, oi, sign = strikes[valid], np.nan_to_num(oi[valid]), sign[valid]
+        sigma = self._volatility()[valid]
+
+        spots = np.asarray(spot_prices, dtype=float).reshape(-1, 1)
+        gamma = self.calculate_gamma(
+            S=spots,
+            K=strikes[None, :],
+            T=float(days_to_expiry) / 252,
+            r=SELIC_RATE,
+            sigma=sigma[None, :]
+        )
+        exposure = gamma * (sign * oi * CONTRACT_SIZE)[None, :]
+
+        # Soma por strike via matriz indicadora (linhas de opção -> strikes únicos)
+        unique_strikes, inverse = np.unique(strikes, return_inverse=True)
+        indicator = np.zeros((len(strikes), len(unique_strikes)))
+        indicator[np.arange(len(strikes)), inverse] = 1.0
+        return unique_strikes, exposure @ indicator
+
+    def _time_to_expiry(self, as_of=None):
+        """
+        Prazo em anos (dias úteis / 252) de cada linha, pelo vencimento da série em 'Contrato'.
+        Séries sem vencimento conhecido ficam com NaN.
+        """
+        as_of = np.datetime64(as_of or date.today(), 'D')
+        expiries = {}
+        for series in self.df['Contrato'].dropna().unique():
+            expiration = DolarOption(series).get_expiration_date()
+            if expiration != "Série não encontrada":
+                expiries[series] = expiration
+        expiry = pd.to_datetime(self.df['Contrato'].map(expiries), format="%d/%m/%Y").to_numpy(dtype='datetime64[D]')
+        known = ~np.isnat(expiry)
+        T = np.full(len(expiry), np.nan)
+        T[known] = business_days.business_days_between(as_of, expiry[known]) / 252
+        return T
+
+    def _profile_inputs(self, as_of=None):
+        """Strike, prazo, volatilidade e peso (sinal * OI * CONTRACT_SIZE) das opções ainda não vencidas."""
+        strikes, oi, sign = self._exposure_inputs()
+        T = self._time_to_expiry(as_of)
+        valid = ~np.isnan(strikes) & (T > 0)
+        sigma = self._volatility()
+        return strikes[valid], T[valid], sigma[valid], (sign * np.nan_to_num(oi) * CONTRACT_SIZE)[valid]
+
+    def gamma_profile(self, price_grid, as_of=None):
+        """
+        Perfil de gamma líquido dos dealers: soma, em todos os strikes e séries carregados,
+        da exposição de gamma para cada preço do grid (cálculo vetorizado grid × opções).
+        Cada série usa o próprio prazo até o vencimento (DolarOption) e, depois de
+        use_implied_vol(), a volatilidade do próprio smile.
+
+        Returns:
+            DataFrame com 'Price' e 'Net_Gamma' e, em attrs['zero_gamma'], o nível de
+            virada (zero gamma) mais próximo do preço atual, ou None se não houver.
+        """
+        grid = np.asarray(price_grid, dtype=float)
+        strikes, T, sigma, weight = self._profile_inputs(as_of)
+        gamma = self.calculate_gamma(
+            S=grid[:, None], K=strikes[None, :], T=T[None, :], r=SELIC_RATE, sigma=sigma[None, :]
         )
+        net_gamma = gamma @ weight
+
+        profile = pd.DataFrame({'Price': grid, 'Net_Gamma': net_gamma})
+        profile.attrs['zero_gamma'] = self._find_zero_gamma(grid, net_gamma, strikes, T, sigma, weight)
+        return profile
 
-        # Junta as colunas agregadas ao DataFrame principal para análises futuras
-        self.df = pd.merge(self.df, exposure_by_strike, on='Strike', how='left')
+    def _find_zero_gamma(self, grid, net_gamma, strikes, T, sigma, weight):
+        """
+        Localiza as trocas de sinal do perfil no grid e refina cada uma com brentq.
+        Retorna a raiz mais próxima do preço atual.
+        """
+        crossings = np.nonzero(np.sign(net_gamma[:-1]) * np.sign(net_gamma[1:]) < 0)[0]
+        if len(crossings) == 0:
+            return None
+        from scipy.optimize import brentq
+
+        def net_gamma_at(S):
+            return float(self.calculate_gamma(S, strikes, T, SELIC_RATE, sigma) @ weight)
+
+        roots = np.array([brentq(net_gamma_at, grid[i], grid[i + 1]) for i in crossings])
+        return float(roots[np.argmin(np.abs(roots - float(self.current_price)))])
 
+    def _greeks(self, as_of=None):
+        """Strike, posição dos dealers (sinal * OI * CONTRACT_SIZE) e gregas (greeks.greeks) de cada linha."""
+        strikes, oi, sign = self._exposure_inputs()
+        values = greeks(
+            S=float(self.current_price),
+            K=strikes,
+            T=self._time_to_expiry(as_of),
+            r=SELIC_RATE,
+            q=CUPOM_CAMBIAL,
+            sigma=self._volatility(),
+            is_call=sign > 0
+        )
+        return strikes, sign * np.nan_to_num(oi) * CONTRACT_SIZE, values
+
+    def calculate_greeks(self, as_of=None):
+        """
+        Delta, Gamma, Vega, Vanna e Charm de cada opção (colunas de mesmo nome), em uma
+        passada vetorizada sobre todas as linhas (greeks.greeks, com o cupom cambial como
+        carregamento). Cada série usa o próprio prazo em as_of e a volatilidade de
+        _volatility(); opções vencidas ficam com 0.
+        """
+        _, _, values = self._greeks(as_of)
+        for name in GREEKS:
+            self.df[name] = np.nan_to_num(values[name])
         return self.df
 
-    def analyze_strike_clusters(self):
+    def dealer_exposure(self, as_of=None):
+        """
+        Exposição dos dealers por strike (calls e puts de todas as séries carregadas):
+        DEX, GEX, VEX, Vanna_Exposure e Charm_Exposure, com a posição
+        sinal * OI * CONTRACT_SIZE de calculate_gamma_exposure.
+
+        Returns:
+            DataFrame por Strike (ordenado) com as colunas de exposição
+        """
+        strikes, position, values = self._greeks(as_of)
+        return dealer_exposure(strikes, position, values)
+
+    def analyze_strike_clusters(self, method=None):
         """
         Realiza uma análise de agrupamento (cluster) dos strikes,
         baseando-se em Strike e OI, para identificar áreas onde a exposição de gamma
         pode estar acumulada.
+
+        method (padrão CLUSTER_METHOD):
+            'dbscan' DBSCAN sobre (Strike, OI) normalizados (scikit-learn, importado aqui)
+            'kde'    vales da densidade de OI ao longo dos strikes (clustering.kde_clusters)
+            'gap'    saltos maiores que GAP_THRESHOLD entre strikes com OI (clustering.gap_clusters)
+        Em todos, a coluna 'Cluster' traz 0, 1, ... e -1 para ruído.
         """
-        X = np.array(self.df[['Strike', 'OI']])
-        X_normalized = (X - X.mean(axis=0)) / X.std(axis=0)
+        method = method or CLUSTER_METHOD
+        if method == 'kde':
+            self.df['Cluster'] = kde_clusters(self.df['Strike'], self.df['OI'], KDE_BANDWIDTH)
+        elif method == 'gap':
+            self.df['Cluster'] = gap_clusters(self.df['Strike'], self.df['OI'], GAP_THRESHOLD)
+        elif method == 'dbscan':
+            from sklearn.cluster import DBSCAN
+
+            X = np.array(self.df[['Strike', 'OI']])
+            X_normalized = (X - X.mean(axis=0)) / X.std(axis=0)
 
-        clustering = DBSCAN(eps=DBSCAN_EPS, min_samples=DBSCAN_MIN_SAMPLES).fit(X_normalized)
-        self.df['Cluster'] = clustering.labels_
+            clustering = DBSCAN(eps=DBSCAN_EPS, min_samples=DBSCAN_MIN_SAMPLES).fit(X_normalized)
+            self.df['Cluster'] = clustering.labels_
+        else:
+            raise ValueError(f"Método de cluster desconhecido: {method}")
 
         return self.df
 
@@ -156,67 +354,23 @@ class OptionsAnalysis:
         Utiliza a agregação do open interest para identificar zonas com alta concentração e classifica cada nível.
         """
         # Calcula o peso do OI separadamente para puts e calls
-        self.df['OI_Weight'] = self.df.groupby('Tipo')['OI'].transform(lambda x: x / x.sum())
+        self.df['OI_Weight'] = self.df['OI'] / self.df.groupby('Tipo', observed=True)['OI'].transform('sum')
 
         # Identifica níveis com alta concentração (acima de média + desvio padrão)
-        mask = self.df['OI_Weight'] > self.df.groupby('Tipo')['OI_Weight'].transform(
-            lambda x: x.mean() + x.std()
-        )
+        weights = self.df.groupby('Tipo', observed=True)['OI_Weight']
+        mask = self.df['OI_Weight'] > weights.transform('mean') + weights.transform('std')
         critical_levels = self.df[mask].copy()
 
-        def is_itm(row, current_price):
-            """
-            Determina se a opção está ITM:
-              - Call ITM: Strike < Preço Atual;
-              - Put ITM: Strike > Preço Atual.
-            """
-            strike = float(row['Strike'])
-            current = float(current_price)
-            if row['Tipo'].strip().lower() == 'call':
-                return strike < current
-            else:
-                return strike > current
-
-        def classify_barrier(row):
-            """
-            Classifica barreiras baseado no tipo de opção:
-              - Para Calls:
-                  OTM (Strike > Preço) -> Resistência (venda para hedge)
-                  ITM (Strike < Preço) -> Suporte (compradores defendem ITM)
-              - Para Puts:
-                  OTM (Strike < Preço) -> Suporte (compra para hedge)
-                  ITM (Strike > Preço) -> Resistência
-            """
-            strike = float(row['Strike'])
-            current = float(self.current_price)
-            is_call = row['Tipo'].strip().lower() == 'call'
-            if is_call:
-                return 'Resistência' if strike > current else 'Suporte'
-            else:
-                return 'Suporte' if strike < current else 'Resistência'
-
-        # Debug detalhado
-        print("\nDEBUG - Classificação detalhada de barreiras:")
-        for _, row in critical_levels.iterrows():
-            strike = float(row['Strike'])
-            current = float(self.current_price)
-            is_call = row['Tipo'].strip().lower() == 'call'
-            moneyness = 'ITM' if is_itm(row, current) else 'OTM'
-            barrier = classify_barrier(row)
-            print(f"""
-    Tipo: {row['Tipo']}
-    Strike: {strike:.3f}
-    Preço Atual: {current:.3f}
-    Moneyness: {moneyness}
-    {"Call acima do preço" if is_call and strike > current else "Call abaixo do preço" if is_call else "Put acima do preço" if strike > current else "Put abaixo do preço"}
-    Classificação: {barrier}
-    OI: {row['OI']}
-    Net Gamma Exposure: {row.get('Net_Gamma_Exposure', 'N/A')}
-    ------------------------
-""")
-        
-        # Aplica a classificação final dos níveis críticos
-        critical_levels.loc[:, 'Barrier_Type'] = critical_levels.apply(classify_barrier, axis=1)
+        # Classificação das barreiras pelo tipo e moneyness:
+        #   Calls: OTM (Strike > Preço) -> Resistência (venda para hedge);
+        #          ITM (Strike <= Preço) -> Suporte (compradores defendem ITM)
+        #   Puts:  OTM (Strike < Preço) -> Suporte (compra para hedge);
+        #          ITM (Strike >= Preço) -> Resistência
+        strike = critical_levels['Strike'].astype(float).to_numpy()
+        current = float(self.current_price)
+        is_call = critical_levels['Tipo'].astype(str).str.strip().str.lower().to_numpy() == 'call'
+        resistance = np.where(is_call, strike > current, strike >= current)
+        critical_levels.loc[:, 'Barrier_Type'] = np.where(resistance, 'Resistência', 'Suporte')
 
         # Normaliza o score de liquidez
         max_oi = critical_levels['OI'].max()
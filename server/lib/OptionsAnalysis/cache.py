@@ -0,0 +1,141 @@
+"""
+Cache em memória das opções de dólar servidas pela API.
+Cada dia (partição da OptionsStore ou, com a base vazia, o par de CSVs) é carregado
+uma vez, com todas as séries, e identificado por (arquivo, mtime). Junto com o dia
+fica o índice posicional de cada série (Contrato), então a visão de uma ou mais séries
+é um iloc sobre posições já calculadas, sem reler nem refiltrar o dia.
+As respostas já serializadas ficam guardadas por (arquivo, mtime, parâmetros) junto
+com o ETag; um boletim novo muda o arquivo/mtime e invalida tudo na próxima requisição.
+"""
+import os
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from .data_loader import OptionsDataLoader
+except ImportError:
+    from data_loader import OptionsDataLoader
+
+MAX_DAYS = 8  # dias mantidos em memória (o mais recente + consultas a datas anteriores)
+MAX_RESPONSES = 256  # respostas serializadas (entradas de dias antigos saem por ordem de uso)
+
+class OptionsCache:
+    def __init__(self, store, csv_path='data/opcoes_dolar/', max_days=MAX_DAYS):
+        self.store = store
+        self.csv_path = csv_path
+        self.max_days = max_days
+        self._lock = threading.Lock()
+        self._days = OrderedDict()  # reference_date -> (source, df, posições por série)
+        self._responses = OrderedDict()
+
+    def source(self, reference_date=None):
+        """
+        (arquivo, mtime) do dia pedido (o mais recente se reference_date for None).
+        Retorna None se o dia não existir nem na base nem em CSV.
+        """
+        reference_date = reference_date or self.store.latest_date()
+        if reference_date is not None and os.path.exists(self.store.partition_file(reference_date)):
+            filename = self.store.partition_file(reference_date)
+            return filename, os.path.getmtime(filename)
+
+        calls_files = glob.glob(os.path.join(self.csv_path, f"{reference_date or '*'}_DOL_OP_Call.csv"))
+        if not calls_files:
+            return None
+        calls_file = max(calls_files)
+        puts_file = calls_file.replace('_DOL_OP_Call.csv', '_DOL_OP_Put.csv')
+        if not os.path.exists(puts_file):
+            return None
+        return calls_file, max(os.path.getmtime(calls_file), os.path.getmtime(puts_file))
+
+    @staticmethod
+    def source_date(source):
+        """Dia de referência (AAAA-MM-DD) de um source."""
+        filename = source[0]
+        if filename.endswith('.parquet'):
+            # .../Data=AAAA-MM-DD/opcoes.parquet
+            return os.path.basename(os.path.dirname(filename)).split('=', 1)[1]
+        return os.path.basename(filename).split('_')[0]
+
+    def _load(self, source):
+        filename = source[0]
+        if filename.endswith('.parquet'):
+            return self.store.load_day(self.source_date(source))
+        with open(filename, 'r', encoding='utf-8') as f:
+            calls_csv = f.read()
+        with open(filename.replace('_DOL_OP_Call.csv', '_DOL_OP_Put.csv'), 'r', encoding='utf-8') as f:
+            puts_csv = f.read()
+        return OptionsDataLoader().prepare_data(calls_csv, puts_csv, None)
+
+    def day(self, reference_date=None):
+        """
+        (source, DataFrame com todas as séries, {série: posições}) do dia pedido,
+        ou None se o dia não existir.
+        """
+        source = self.source(reference_date)
+        if source is None:
+            return None
+        key = self.source_date(source)
+        with self._lock:
+            cached = self._days.get(key)
+            if cached is None or cached[0] != source:
+                df = self._load(source).reset_index(drop=True)
+                positions = {str(s): p for s, p in df.groupby('Contrato', observed=True).indices.items()}
+                cached = self._days[key] = (source, df, positions)
+            self._days.move_to_end(key)
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+            return cached
+
+    def series(self, reference_date=None):
+        """Séries (Contrato) disponíveis no dia."""
+        day = self.day(reference_date)
+        return sorted(day[2]) if day is not None else []
+
+    def frame(self, series=None, reference_date=None):
+        """
+        Opções do dia (todas as séries, ou as pedidas: 'H25' ou ['H25', 'J25']).
+        Retorna None se o dia não existir.
+        """
+        day = self.day(reference_date)
+        return self._view(day, series) if day is not None else None
+
+    @staticmethod
+    def _view(day, series):
+        _, df, positions = day
+        if series is None:
+            return df
+        series = [series] if isinstance(series, str) else list(series)
+        rows = [positions[s] for s in series if s in positions]
+        return df.iloc[np.concatenate(rows) if rows else []]
+
+    def response(self, build, series=None, reference_date=None, **params):
+        """
+        (etag, corpo) da resposta, ou None se o dia não existir.
+        build(df, reference_date, mtime, **params) gera o corpo (bytes ou str) e só é chamada quando o dia ou os parâmetros ainda não
+        estão no cache.
+        """
+        day = self.day(reference_date)
+        if day is None:
+            return None
+        source = day[0]
+        series_key = series if series is None or isinstance(series, str) else tuple(series)
+        key = (source, series_key, tuple(sorted(params.items())))
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached is not None:
+                self._responses.move_to_end(key)
+                return cached
+
+        body = build(self._view(day, series), self.source_date(source), source[1], **params)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        cached = (hashlib.sha1(body).hexdigest(), body)
+        with self._lock:
+            self._responses[key] = cached
+            while len(self._responses) > MAX_RESPONSES:
+                self._responses.popitem(last=False)
+        return cached
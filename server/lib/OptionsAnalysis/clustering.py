@@ -0,0 +1,61 @@
+"""
+Agrupamento de strikes em uma dimensão, só com NumPy (alternativa ao DBSCAN sobre
+(Strike, OI), que exige scikit-learn).
+O OI de calls e puts é somado por strike e os grupos são intervalos contíguos de strikes:
+    - 'kde': densidade de kernel gaussiano ponderada por OI; os vales da densidade
+      separam os grupos.
+    - 'gap': strikes com OI ordenados; um salto maior que o limite abre um novo grupo.
+Rótulos no formato do DBSCAN: 0, 1, ... da esquerda para a direita e -1 (ruído) para
+linhas sem OI ou sem strike.
+"""
+import numpy as np
+
+KDE_GRID_POINTS = 512  # pontos do grid onde a densidade é avaliada
+
+def _strike_weights(strikes, oi):
+    """Strikes com OI (ordenados), OI somado de cada um e o índice do strike de cada linha (-1 se sem OI)."""
+    strikes = np.asarray(strikes, dtype=float)
+    oi = np.nan_to_num(np.asarray(oi, dtype=float))
+    valid = ~np.isnan(strikes) & (oi > 0)
+    unique_strikes, inverse = np.unique(strikes[valid], return_inverse=True)
+    weights = np.bincount(inverse, weights=oi[valid], minlength=len(unique_strikes))
+    rows = np.full(len(strikes), -1)
+    rows[valid] = inverse
+    return unique_strikes, weights, rows
+
+def _row_labels(strike_labels, rows):
+    labels = np.full(len(rows), -1)
+    labels[rows >= 0] = strike_labels[rows[rows >= 0]]
+    return labels
+
+def silverman_bandwidth(values, weights):
+    """Regra de Silverman com desvio padrão e tamanho efetivo da amostra ponderados."""
+    mean = np.average(values, weights=weights)
+    std = np.sqrt(np.average((values - mean) ** 2, weights=weights))
+    n_eff = weights.sum() ** 2 / (weights ** 2).sum()
+    return 1.06 * std * n_eff ** -0.2
+
+def kde_clusters(strikes, oi, bandwidth=None):
+    """
+    Rótulo de cada linha pelos vales da densidade de OI ao longo dos strikes.
+    bandwidth em R$/US$ (mesma unidade dos strikes); None usa silverman_bandwidth.
+    """
+    unique_strikes, weights, rows = _strike_weights(strikes, oi)
+    if len(unique_strikes) < 2:
+        return _row_labels(np.zeros(len(unique_strikes), dtype=int), rows)
+    if bandwidth is None:
+        bandwidth = silverman_bandwidth(unique_strikes, weights)
+    bandwidth = max(bandwidth, 1e-9)
+
+    grid = np.linspace(unique_strikes[0], unique_strikes[-1], KDE_GRID_POINTS)
+    density = np.exp(-0.5 * ((grid[:, None] - unique_strikes[None, :]) / bandwidth) ** 2) @ weights
+    # Vales: mínimos locais da densidade no grid (em um platô, o início dele)
+    slope = np.diff(density)
+    valleys = np.flatnonzero((slope[:-1] < 0) & (slope[1:] >= 0)) + 1
+    return _row_labels(np.searchsorted(grid[valleys], unique_strikes), rows)
+
+def gap_clusters(strikes, oi, gap):
+    """Rótulo de cada linha: novo grupo sempre que dois strikes com OI consecutivos distam mais que gap."""
+    unique_strikes, _, rows = _strike_weights(strikes, oi)
+    strike_labels = np.concatenate([[0], np.cumsum(np.diff(unique_strikes) > gap)]) if len(unique_strikes) else np.array([], dtype=int)
+    return _row_labels(strike_labels, rows)
@@ -5,6 +5,7 @@ import datetime
 
 # Configurações gerais
 SELIC_RATE = 0.1175  # Taxa Selic aproximada
+CUPOM_CAMBIAL = 0.05  # Cupom cambial aproximado (juro em dólar no Brasil), para o forward do dólar
 DEFAULT_VOLATILITY = 0.15  # Volatilidade implícita média do dólar
 CONTRACT_SIZE = 50000  # Tamanho do contrato de dólar futuro
 CURRENT_DATE = datetime.datetime(2025, 2, 7, 12, 16, 28)
@@ -12,6 +13,9 @@ CURRENT_DATE = datetime.datetime(2025, 2, 7, 12, 16, 28)
 # Configurações de clustering
 DBSCAN_EPS = 0.3
 DBSCAN_MIN_SAMPLES = 2
+CLUSTER_METHOD = 'dbscan'  # 'dbscan' (requer scikit-learn), 'kde' ou 'gap' (só NumPy)
+KDE_BANDWIDTH = 0.05  # R$/US$ (dois strikes de 0,025); None: regra de Silverman ponderada por OI
+GAP_THRESHOLD = 0.1  # R$/US$ entre strikes com OI consecutivos que separa dois grupos
 
 # Configurações de cache
 CACHE_EXPIRY = 3600  # 1 hora em segundos
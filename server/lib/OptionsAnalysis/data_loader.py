@@ -4,21 +4,28 @@ Módulo para carregar e preparar os dados
 import pandas as pd
 import numpy as np
 import io
+import math
 from functools import lru_cache
 import datetime
 
+# Colunas de texto do CSV; todas as demais são numéricas
+TEXT_COLUMNS = ('Data', 'Série', 'Código')
+
+# Código da opção: série (3) + C/P (1) + strike * 1000, ex.: H25C005800
+CODE_PREFIX = 4
+
 class OptionsDataLoader:
     @staticmethod
     def parse_data(csv_text):
         return pd.read_csv(io.StringIO(csv_text), sep=';', decimal=',')
-    
+
     @staticmethod
     def extract_strike(code, prefix_length=4):
         try:
             return int(code[prefix_length:]) / 1000
         except Exception:
             return np.nan
-    
+
     @staticmethod
     @lru_cache(maxsize=128)
     def calculate_days_to_expiry(series_code, current_date):
@@ -28,32 +35,109 @@ class OptionsDataLoader:
         """
         month_codes = {'F': 1, 'G': 2, 'H': 3, 'J': 4, 'K': 5, 'M': 6,
                       'N': 7, 'Q': 8, 'U': 9, 'V': 10, 'X': 11, 'Z': 12}
-        
+
         month = month_codes[series_code[0]]
         year = 2000 + int(series_code[1:3])
         expiry_date = datetime.datetime(year, month, 15)  # Assumindo vencimento no dia 15
-        
+
         return (expiry_date - current_date).days
 
+    @staticmethod
+    def read_table(csv_text):
+        """
+        Colunas (nome -> array) do CSV do boletim (';'), lido pelo motor C do read_csv:
+        as de texto como object e as demais em float. Os CSVs do BoletimDiario usam ponto
+        decimal e já saem do read_csv como números; uma coluna com vírgula decimal ou texto
+        inválido é convertida depois (inválido vira NaN, como pd.to_numeric).
+        """
+        df = pd.read_csv(io.StringIO(csv_text), sep=';', dtype={name: object for name in TEXT_COLUMNS})
+        columns = {name: column.to_numpy() for name, column in df.items()}
+        for name, dtype in df.dtypes.items():
+            if name in TEXT_COLUMNS or dtype.kind == 'f':
+                continue
+            if dtype.kind in 'iub':
+                columns[name] = columns[name].astype(float)
+            else:
+                column = df[name].astype(str).str.replace(',', '.', regex=False)
+                columns[name] = pd.to_numeric(column, errors='coerce').to_numpy(dtype=float)
+        return columns
+
+    @staticmethod
+    def parse_codes(codes):
+        """
+        Decompõe os códigos (ex.: H25C005800) em série, tipo (ord de 'C'/'P') e strike
+        para o array inteiro de uma vez, por fatias sobre os caracteres. A largura vem do
+        maior código da coluna; nos menores as posições que sobram são '\0'.
+        Códigos fora do formato ficam com strike NaN.
+        """
+        codes = np.asarray(codes).astype(str)
+        width = max(codes.dtype.itemsize // 4, CODE_PREFIX + 1)
+        codes = codes.astype(f'U{width}')
+        chars = codes.view(np.uint32).reshape(len(codes), width)
+        lengths = (chars != 0).sum(axis=1)
+        # Expoente de cada dígito do strike; negativo nas posições depois do fim do código
+        exponent = lengths[:, None] - CODE_PREFIX - 1 - np.arange(width - CODE_PREFIX)
+        present = exponent >= 0
+        digits = chars[:, CODE_PREFIX:].astype(np.int64) - ord('0')
+        valid = (((digits >= 0) & (digits <= 9)) | ~present).all(axis=1) & (lengths > CODE_PREFIX)
+        # Inteiro e só depois / 1000, para o mesmo float de int(code[4:]) / 1000
+        strike = np.where(present, digits * 10 ** np.maximum(exponent, 0), 0).sum(axis=1)
+        strikes = np.where(valid, strike / 1000, np.nan)
+        return codes.astype('U3'), chars[:, 3], strikes
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _category_dtype(categories):
+        # Séries, datas e tipos se repetem entre arquivos: o dtype (e a validação das categorias) é reaproveitado
+        return pd.CategoricalDtype(list(categories))
+
+    @classmethod
+    def _categorical(cls, values, categories=None):
+        if categories is None and len(values) and (values == values[0]).all():
+            # Caso comum da coluna Data: um único valor no arquivo
+            categories, codes = values[:1], np.zeros(len(values), dtype=np.int8)
+        elif categories is None:
+            categories, codes = np.unique(values, return_inverse=True)
+        else:
+            codes = values
+        return pd.Categorical.from_codes(codes, dtype=cls._category_dtype(tuple(categories)), validate=False)
+
     def prepare_data(self, calls_csv, puts_csv, contract_filter="H25"):
-        # Lê os dados
-        df_calls = self.parse_data(calls_csv)
-        df_puts = self.parse_data(puts_csv)
-        
-        # Filtra pelo contrato específico
-        df_calls = df_calls[df_calls['Código'].str.startswith(f"{contract_filter}C")].copy()
-        df_puts = df_puts[df_puts['Código'].str.startswith(f"{contract_filter}P")].copy()
-        
-        # Processa calls e puts
-        for df in [df_calls, df_puts]:
-            df['Strike'] = df['Código'].apply(lambda x: self.extract_strike(x))
-            df['OI'] = pd.to_numeric(df['Contratos em Aberto'], errors='coerce').fillna(0)
-            df['Volume'] = pd.to_numeric(df['Contratos Negociados'], errors='coerce').fillna(0)
-            df['Último'] = pd.to_numeric(df['Último Preço'], errors='coerce')
-            df['Compra'] = pd.to_numeric(df['Última Oferta de Compra'], errors='coerce')
-            df['Venda'] = pd.to_numeric(df['Última Oferta de Venda'], errors='coerce')
-        
-        df_calls['Tipo'] = 'Call'
-        df_puts['Tipo'] = 'Put'
-        
-        return pd.concat([df_calls, df_puts], ignore_index=True)
\ No newline at end of file
+        """
+        Calls e puts do boletim em um único DataFrame, com colunas numéricas em float,
+        Strike/OI/Volume/Último/Compra/Venda derivados e Data/Contrato/Tipo categóricos.
+        Código é decomposto uma vez para o arquivo inteiro (sem apply por linha).
+        contract_filter mantém apenas uma série (ex.: 'H25'); None mantém todas.
+        """
+        calls, puts = self.read_table(calls_csv), self.read_table(puts_csv)
+        if list(puts) != list(calls):
+            raise ValueError("CSVs de calls e puts com colunas diferentes")
+        names = list(calls)
+        # Calls e puts juntas coluna a coluna (sem pd.concat)
+        columns = {name: np.concatenate([calls[name], puts[name]]) for name in names}
+
+        codes = columns['Código'].astype(str)
+        series, option_type, strikes = self.parse_codes(codes)
+        is_call = np.arange(len(codes)) < len(calls['Código'])
+        keep = None
+        if contract_filter is not None:
+            # Filtro por prefixo do código, como antes: série + C nas calls, série + P nas puts
+            keep = np.where(is_call, np.char.startswith(codes, f"{contract_filter}C"),
+                            np.char.startswith(codes, f"{contract_filter}P"))
+            series, strikes, is_call = series[keep], strikes[keep], is_call[keep]
+
+        data = {}
+        for name in names:
+            values = columns[name] if keep is None else columns[name][keep]
+            data[name] = self._categorical(values) if name == 'Data' else values
+
+        data['Contrato'] = self._categorical(series)  # série de vencimento, ex.: H25
+        data['Strike'] = strikes
+        data['OI'] = np.nan_to_num(data['Contratos em Aberto'])
+        data['Volume'] = np.nan_to_num(data['Contratos Negociados'])
+        data['Último'] = data['Último Preço'].copy()
+        data['Compra'] = data['Última Oferta de Compra'].copy()
+        data['Venda'] = data['Última Oferta de Venda'].copy()
+        data['Tipo'] = self._categorical(np.where(is_call, 0, 1), ('Call', 'Put'))
+
+        return pd.DataFrame(data, copy=False)
@@ -0,0 +1,110 @@
+"""
+Gregas das opções de dólar (Garman-Kohlhagen: Black-Scholes com o cupom cambial como
+taxa de carregamento) calculadas para todas as linhas de uma vez, e a exposição dos
+dealers agregada por strike (DEX/GEX/VEX, vanna e charm).
+
+Convenções:
+    - Derivadas em relação ao spot do dólar (R$/US$); prazo em anos (dias úteis / 252).
+    - Vega e vanna por 1,00 de volatilidade; charm é a variação do delta por ano.
+    - Posição dos dealers: sinal * OI * CONTRACT_SIZE, com o mesmo sinal de
+      OptionsAnalysis.calculate_gamma_exposure (+1 calls, -1 puts).
+    - OptionsAnalysis.calculate_gamma (exposição de gamma e perfil) usa gamma() com o
+      mesmo q, para o GEX daqui e o de lá serem o mesmo número.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from .volatility import norm_cdf, norm_pdf
+except ImportError:
+    from volatility import norm_cdf, norm_pdf
+
+GREEKS = ('Delta', 'Gamma', 'Vega', 'Vanna', 'Charm')
+
+# Coluna da exposição agregada de cada grega
+EXPOSURES = {'Delta': 'DEX', 'Gamma': 'GEX', 'Vega': 'VEX', 'Vanna': 'Vanna_Exposure', 'Charm': 'Charm_Exposure'}
+
+def prepare(K, T, r, q, sigma):
+    """
+    Termos das gregas que não dependem do spot (log do strike, raiz do prazo, drift,
+    desconto do carregamento, ...), calculados uma vez por carteira. Prazo <= 0 ou NaN
+    resulta em NaN nas gregas.
+    """
+    K, T, sigma = (np.asarray(a, dtype=float) for a in (K, T, sigma))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        T = np.where(T > 0, T, np.nan)
+        sqrt_T = np.sqrt(T)
+        vol_T = sigma * sqrt_T
+        return {
+            'log_K': np.log(K),
+            'drift': (r - q + 0.5 * sigma**2) * T,
+            'sqrt_T': sqrt_T,
+            'vol_T': vol_T,
+            'sigma': sigma,
+            'carry': np.exp(-q * T),
+            # d(d1)/dT = (r - q) / vol_T + d2 / (-2T), separado em termo fixo e coeficiente de d2
+            'd1_dT_fixed': (r - q) / vol_T,
+            'd1_dT_d2': -0.5 / T,
+            'q': q,
+        }
+
+def spot_greeks(S, terms, is_call):
+    """Gregas para o spot S a partir dos termos de prepare(); só d1 e o que depende dele são recalculados."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        S = np.asarray(S, dtype=float)
+        d1 = (np.log(S) - terms['log_K'] + terms['drift']) / terms['vol_T']
+        d2 = d1 - terms['vol_T']
+        cdf = norm_cdf(d1)
+        density = terms['carry'] * norm_pdf(d1)  # e^(-qT) * n(d1), comum a todas as gregas de segunda ordem
+
+        delta = terms['carry'] * np.where(is_call, cdf, cdf - 1)
+        # O charm (-d(delta)/dT) é igual para calls e puts a menos do termo q * delta
+        d1_dT = terms['d1_dT_fixed'] + terms['d1_dT_d2'] * d2
+        return {
+            'Delta': delta,
+            'Gamma': density / (S * terms['vol_T']),
+            'Vega': S * density * terms['sqrt_T'],
+            'Vanna': -density * d2 / terms['sigma'],
+            'Charm': terms['q'] * delta - density * d1_dT,
+        }
+
+def gamma(S, K, T, r, q, sigma):
+    """Só o gamma (o mesmo de greeks()), para os grids spot × opções do perfil de gamma."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vol_T = sigma * np.sqrt(T)
+        d1 = (np.log(S / K) + (r - q + 0.5 * sigma**2) * T) / vol_T
+        return np.exp(-q * T) * norm_pdf(d1) / (S * vol_T)
+
+def greeks(S, K, T, r, q, sigma, is_call):
+    """
+    Delta, gamma, vega, vanna e charm de um lote de opções (arrays com broadcast).
+    d1, a densidade e os descontos são calculados uma vez e compartilhados por todas as gregas.
+    Prazo <= 0 ou NaN resulta em NaN.
+
+    Returns:
+        dict grega -> array, na ordem de GREEKS
+    """
+    return spot_greeks(S, prepare(K, T, r, q, sigma), is_call)
+
+def by_strike(strikes, values):
+    """
+    Soma por strike (calls e puts de todas as séries juntas) de cada array em values.
+    Linhas com strike NaN são ignoradas; NaN nos valores conta como 0.
+
+    Returns:
+        DataFrame com 'Strike' (ordenado) e uma coluna por chave de values
+    """
+    strikes = np.asarray(strikes, dtype=float)
+    valid = ~np.isnan(strikes)
+    unique_strikes, inverse = np.unique(strikes[valid], return_inverse=True)
+    table = {'Strike': unique_strikes}
+    for name, value in values.items():
+        table[name] = np.bincount(inverse, weights=np.nan_to_num(np.asarray(value)[valid]), minlength=len(unique_strikes))
+    return pd.DataFrame(table)
+
+def dealer_exposure(strikes, position, values):
+    """
+    Exposição dos dealers por strike: cada grega de values (saída de greeks) vezes a
+    posição (sinal * OI * CONTRACT_SIZE), somada por strike, nas colunas de EXPOSURES.
+    """
+    return by_strike(strikes, {EXPOSURES[name]: value * position for name, value in values.items()})
@@ -0,0 +1,135 @@
+"""
+Histórico de open interest das opções de dólar ao longo dos boletins.
+Todos os dias da OptionsStore são carregados em uma única matriz contígua
+oi[data, série, tipo, strike] (tipo 0 = Call, 1 = Put), com um grid de strikes comum a
+todas as séries; opções ausentes em um dia ficam com OI 0. Datas são o primeiro eixo,
+então um intervalo de datas é uma fatia da matriz (sem reabrir arquivos).
+Sobre ela: variação diária de OI, build-up acumulado e o centróide de strike
+ponderado por OI de cada série.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+TYPES = ('Call', 'Put')
+COLUMNS = ['Contrato', 'Tipo', 'Strike', 'OI']
+
+class OptionsHistory:
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._days = {}  # data -> (mtime, DataFrame com COLUMNS)
+        # (datas, séries, strikes, oi) trocados juntos a cada refresh; leituras usam uma única referência
+        self._matrix = (np.array([], dtype='datetime64[D]'), [], np.array([]), np.zeros((0, 0, len(TYPES), 0)))
+
+    @property
+    def dates(self):
+        return self._matrix[0]
+
+    @property
+    def series(self):
+        return self._matrix[1]
+
+    @property
+    def strikes(self):
+        return self._matrix[2]
+
+    @property
+    def oi(self):
+        return self._matrix[3]
+
+    def refresh(self):
+        """
+        Sincroniza com a base: lê só as partições novas ou regravadas e remonta a matriz
+        se algo mudou. Retorna True se houve mudança.
+        """
+        stored = {d: os.path.getmtime(self.store.partition_file(d)) for d in self.store.dates()}
+        with self._lock:
+            changed = [d for d, mtime in stored.items() if self._days.get(d, (None,))[0] != mtime]
+            removed = [d for d in self._days if d not in stored]
+            if not changed and not removed:
+                return False
+            for d in removed:
+                del self._days[d]
+            for d in changed:
+                df = pd.read_parquet(self.store.partition_file(d), columns=COLUMNS)
+                self._days[d] = (stored[d], df.astype({'Contrato': str, 'Tipo': str}))
+            self._build()
+            return True
+
+    def _build(self):
+        dates = sorted(self._days)
+        frames = [self._days[d][1] for d in dates]
+        day = np.repeat(np.arange(len(dates)), [len(df) for df in frames])
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+        valid = df['Strike'].notna().to_numpy() & df['Tipo'].isin(TYPES).to_numpy()
+        df, day = df[valid], day[valid]
+
+        series, series_idx = np.unique(df['Contrato'].to_numpy(dtype=str), return_inverse=True)
+        strikes, strike_idx = np.unique(df['Strike'].to_numpy(dtype=float), return_inverse=True)
+        type_idx = (df['Tipo'].to_numpy(dtype=str) == 'Put').astype(np.intp)
+
+        oi = np.zeros((len(dates), len(series), len(TYPES), len(strikes)))
+        oi[day, series_idx, type_idx, strike_idx] = np.nan_to_num(df['OI'].to_numpy(dtype=float))
+        self._matrix = (np.array(dates, dtype='datetime64[D]'), series.tolist(), strikes, oi)
+
+    @staticmethod
+    def _range(dates, start=None, end=None):
+        """Fatia do eixo de datas entre start e end (inclusive)."""
+        first = 0 if start is None else np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+        last = len(dates) if end is None else np.searchsorted(dates, np.datetime64(end, 'D'), side='right')
+        return slice(first, max(first, last))
+
+    def window(self, series, start=None, end=None):
+        """
+        (datas, strikes, oi) de uma série entre start e end: oi[data, tipo, strike] é uma
+        visão da matriz, sem cópia. Strikes sem OI em todo o intervalo são mantidos.
+        Retorna None se a série não estiver no histórico.
+        """
+        dates, names, strikes, oi = self._matrix
+        if series not in names:
+            return None
+        days = self._range(dates, start, end)
+        return dates[days], strikes, oi[days, names.index(series)]
+
+    def oi_changes(self, series, start=None, end=None):
+        """
+        (datas, strikes, variação) com a variação diária de OI, [data, tipo, strike], entre
+        boletins consecutivos do histórico. O primeiro dia do intervalo compara com o
+        boletim anterior, se houver, ou fica 0.
+        """
+        dates, names, strikes, oi = self._matrix
+        if series not in names:
+            return None
+        days = self._range(dates, start, end)
+        oi = oi[:, names.index(series)]
+        window = oi[days]
+        if len(window) == 0:
+            return dates[days], strikes, window.copy()
+        previous = oi[days.start - 1] if days.start > 0 else window[0]
+        return dates[days], strikes, np.diff(window, axis=0, prepend=previous[None])
+
+    def buildup(self, series, start=None, end=None):
+        """Build-up acumulado de OI por tipo e strike: soma das variações diárias desde o início do intervalo."""
+        changes = self.oi_changes(series, start, end)
+        if changes is None:
+            return None
+        dates, strikes, delta = changes
+        return dates, strikes, np.cumsum(delta, axis=0)
+
+    def centroid(self, series, start=None, end=None):
+        """
+        (datas, centróide) com o strike médio ponderado por OI de cada dia, [data, 3] com
+        Call, Put e o total. Dias sem OI ficam NaN.
+        """
+        data = self.window(series, start, end)
+        if data is None:
+            return None
+        dates, strikes, oi = data
+        oi = np.concatenate([oi, oi.sum(axis=1, keepdims=True)], axis=1)
+        total = oi.sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centroid = (oi @ strikes) / total
+        return dates, np.where(total > 0, centroid, np.nan)
@@ -0,0 +1,76 @@
+"""
+Exposição dos dealers reprecificada a cada tick do dólar futuro.
+As posições do dia (strike, prazo, volatilidade, sinal * OI) são carregadas e
+preparadas uma vez; update(spot) recalcula só os termos que dependem do spot e soma
+por strike com bincount, sem montar DataFrames. A volatilidade fica fixa por opção
+entre ticks (sticky strike), na superfície resolvida para o spot de abertura.
+"""
+import threading
+
+import numpy as np
+
+try:
+    from .analysis import OptionsAnalysis
+    from .greeks import prepare, spot_greeks, GREEKS, EXPOSURES
+    from .config import SELIC_RATE, CUPOM_CAMBIAL, CONTRACT_SIZE
+except ImportError:
+    from analysis import OptionsAnalysis
+    from greeks import prepare, spot_greeks, GREEKS, EXPOSURES
+    from config import SELIC_RATE, CUPOM_CAMBIAL, CONTRACT_SIZE
+
+class LiveExposure:
+    def __init__(self, df, spot, as_of, implied_vol=True):
+        """
+        df: opções do dia (formato de OptionsDataLoader.prepare_data), uma ou várias séries.
+        spot: preço do dólar (R$/US$) usado para resolver a superfície de volatilidade.
+        as_of: data de referência (AAAA-MM-DD) para o prazo de cada série.
+        implied_vol: False usa DEFAULT_VOLATILITY em todas as opções.
+        """
+        analyzer = OptionsAnalysis.from_frame(spot, df)
+        if implied_vol:
+            analyzer.use_implied_vol(as_of)
+        strikes, oi, sign = analyzer._exposure_inputs()
+        T = analyzer._time_to_expiry(as_of)
+        sigma = analyzer._volatility()
+
+        # Só entram opções vivas com OI: as demais não contribuem para a exposição
+        keep = ~np.isnan(strikes) & (T > 0) & (np.nan_to_num(oi) != 0)
+        self.as_of = as_of
+        self.strikes, self._inverse = np.unique(strikes[keep], return_inverse=True)
+        self._position = (sign * oi * CONTRACT_SIZE)[keep]
+        self._is_call = sign[keep] > 0
+        self._terms = prepare(strikes[keep], T[keep], SELIC_RATE, CUPOM_CAMBIAL, sigma[keep])
+
+        self.spot = None
+        self.exposure = None  # último resultado de update()
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def update(self, spot):
+        """
+        Reprecifica a carteira para um novo spot e guarda a exposição líquida por strike.
+        O mesmo spot da última chamada devolve o resultado anterior sem recalcular; version
+        só muda quando o resultado muda (cada stream de /api/dolar-exposure-stream chama
+        update no tick que recebe e só envia versões novas).
+
+        Returns:
+            dict com 'spot', 'version', 'Strike' e, em arrays alinhados a Strike, as colunas
+            de greeks.EXPOSURES, além de 'total' (soma de cada exposição)
+        """
+        spot = float(spot)
+        with self._lock:
+            if spot == self.spot:
+                return self.exposure
+
+        values = spot_greeks(spot, self._terms, self._is_call)
+        exposure = {'spot': spot, 'Strike': self.strikes}
+        for name in GREEKS:
+            exposure[EXPOSURES[name]] = np.bincount(
+                self._inverse, weights=np.nan_to_num(values[name] * self._position), minlength=len(self.strikes))
+        exposure['total'] = {EXPOSURES[name]: float(exposure[EXPOSURES[name]].sum()) for name in GREEKS}
+
+        with self._lock:
+            self.version += 1
+            exposure['version'] = self.version
+            self.spot, self.exposure = spot, exposure
+        return exposure
@@ -0,0 +1,133 @@
+"""
+Base histórica colunar das opções de dólar.
+Cada dia de referência vira uma partição Parquet (Data=AAAA-MM-DD/opcoes.parquet) com as
+colunas já tipadas (Contrato e Tipo categóricos, Strike/OI/preços numéricos), no mesmo
+formato do DataFrame de OptionsDataLoader.prepare_data. Carregar um dia não refaz o
+parsing do CSV.
+Requer pyarrow (usado pelo pandas para ler/gravar Parquet).
+"""
+import os
+import glob
+
+import pandas as pd
+
+try:
+    from .data_loader import OptionsDataLoader
+except ImportError:
+    from data_loader import OptionsDataLoader
+
+PARTITION_PREFIX = 'Data='
+PARTITION_FILE = 'opcoes.parquet'
+
+# Colunas numéricas vindas do boletim (mantidas como float; vazios viram NaN)
+NUMERIC_COLUMNS = [
+    'Contratos em Aberto', 'Negócios Realizados', 'Contratos Negociados', 'Volume',
+    'Preço de Abertura', 'Preço Mínimo', 'Preço Máximo', 'Preço Médio', 'Último Preço',
+    'Variação em Pontos', 'Prêmio de Referência', 'Última Oferta de Compra',
+    'Última Oferta de Venda', 'Strike', 'OI', 'Último', 'Compra', 'Venda'
+]
+
+class OptionsStore:
+    def __init__(self, path='./data/opcoes_dolar_db/'):
+        self.path = path
+
+    def partition_file(self, reference_date):
+        """Caminho do arquivo Parquet de um dia."""
+        return os.path.join(self.path, f"{PARTITION_PREFIX}{reference_date}", PARTITION_FILE)
+
+    def dates(self):
+        """Datas de referência armazenadas (AAAA-MM-DD), em ordem crescente."""
+        pattern = os.path.join(self.path, f"{PARTITION_PREFIX}*", PARTITION_FILE)
+        return sorted(os.path.basename(os.path.dirname(f))[len(PARTITION_PREFIX):] for f in glob.glob(pattern))
+
+    def latest_date(self):
+        dates = self.dates()
+        return dates[-1] if dates else None
+
+    @staticmethod
+    def _typed(df):
+        df = df.copy()
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        df['Data'] = pd.to_datetime(df['Data']).dt.date.astype(str)
+        for col in ('Série', 'Código'):
+            df[col] = df[col].astype(str)
+        df['Contrato'] = df['Contrato'].astype('category')
+        df['Tipo'] = df['Tipo'].astype('category')
+        return df
+
+    def write_day(self, df):
+        """Grava (substitui) a partição do dia a partir de um DataFrame no formato de prepare_data."""
+        df = self._typed(df)
+        for reference_date, day in df.groupby('Data', observed=True):
+            filename = self.partition_file(reference_date)
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            day.drop(columns='Data').reset_index(drop=True).to_parquet(filename + '.tmp', index=False)
+            os.replace(filename + '.tmp', filename)
+
+    def import_csv(self, calls_file, puts_file):
+        """Converte um par de CSVs do boletim (calls e puts do mesmo dia) para a base."""
+        with open(calls_file, 'r', encoding='utf-8') as f:
+            calls_csv = f.read()
+        with open(puts_file, 'r', encoding='utf-8') as f:
+            puts_csv = f.read()
+        self.write_day(OptionsDataLoader().prepare_data(calls_csv, puts_csv, None))
+
+    def sync_csv_dir(self, csv_path='./data/opcoes_dolar/'):
+        """Importa os dias que existem em CSV e ainda não estão na base. Retorna as datas importadas."""
+        stored = set(self.dates())
+        imported = []
+        for calls_file in sorted(glob.glob(os.path.join(csv_path, '*_DOL_OP_Call.csv'))):
+            reference_date = os.path.basename(calls_file).split('_')[0]
+            puts_file = calls_file.replace('_DOL_OP_Call.csv', '_DOL_OP_Put.csv')
+            if reference_date in stored or not os.path.exists(puts_file):
+                continue
+            self.import_csv(calls_file, puts_file)
+            imported.append(reference_date)
+        return imported
+
+    def load_day(self, reference_date=None, series=None):
+        """
+        Opções de um dia (o mais recente se reference_date for None), opcionalmente
+        filtradas por série(s) de vencimento (ex.: 'H25' ou ['H25', 'J25']).
+        Retorna None se o dia não estiver na base.
+        """
+        reference_date = reference_date or self.latest_date()
+        if reference_date is None or not os.path.exists(self.partition_file(reference_date)):
+            return None
+        filters = None
+        if series is not None:
+            filters = [('Contrato', 'in', [series] if isinstance(series, str) else list(series))]
+        df = pd.read_parquet(self.partition_file(reference_date), filters=filters)
+        df.insert(0, 'Data', reference_date)
+        return df
+
+    def series_range(self, series, start=None, end=None):
+        """Histórico de uma série de vencimento entre duas datas (inclusive)."""
+        frames = [
+            self.load_day(d, series) for d in self.dates()
+            if (start is None or d >= str(start)) and (end is None or d <= str(end))
+        ]
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True)
+
+    def oi_change(self, start, end, series=None):
+        """
+        Variação de open interest por opção (Código) entre duas datas.
+        Opções que só existem em uma das datas entram com OI 0 na outra.
+        """
+        before = self.load_day(str(start), series)
+        after = self.load_day(str(end), series)
+        if before is None or after is None:
+            return None
+        keys = ['Código', 'Contrato', 'Tipo', 'Strike']
+        merged = pd.merge(
+            before[keys + ['OI']].astype({'Contrato': str, 'Tipo': str}),
+            after[keys + ['OI']].astype({'Contrato': str, 'Tipo': str}),
+            on=keys, how='outer', suffixes=('_Inicio', '_Fim')
+        )
+        merged[['OI_Inicio', 'OI_Fim']] = merged[['OI_Inicio', 'OI_Fim']].fillna(0)
+        merged['Variacao_OI'] = merged['OI_Fim'] - merged['OI_Inicio']
+        return merged.sort_values(['Contrato', 'Tipo', 'Strike']).reset_index(drop=True)
@@ -0,0 +1,240 @@
+"""
+Volatilidade implícita das opções de dólar (Black-76 sobre o forward do vencimento).
+Resolve todas as opções de um dia de uma vez (Newton vetorizado com bisseção de
+reserva), ajusta um smile por série e expõe o resultado como uma superfície que os
+cálculos de gamma/gregas consultam por (série, strike).
+
+Convenções:
+    - Prêmios do boletim vêm em pontos (R$ por US$ 1.000); strikes em R$/US$.
+    - Prazo em dias úteis / 252 (mesmo de OptionsAnalysis._time_to_expiry).
+    - Forward de cada série: spot * exp((SELIC_RATE - CUPOM_CAMBIAL) * T).
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from .config import SELIC_RATE, CUPOM_CAMBIAL, DEFAULT_VOLATILITY
+except ImportError:
+    from config import SELIC_RATE, CUPOM_CAMBIAL, DEFAULT_VOLATILITY
+
+PREMIUM_SCALE = 1000  # pontos por R$/US$
+VOL_MIN, VOL_MAX = 1e-4, 5.0
+TOLERANCE = 1e-10  # erro de preço aceito (R$/US$)
+MAX_ITERATIONS = 50
+SMILE_MIN_STRIKES = 5  # strikes distintos para o smile quadrático; abaixo disso é plano (média ponderada)
+SMILE_IV_MIN, SMILE_IV_MAX = 0.01, 2.0  # IVs aceitas no ajuste e faixa do smile dentro dos strikes observados
+
+_SQRT_2PI = np.sqrt(2 * np.pi)
+
+def norm_cdf(x):
+    """
+    Distribuição normal acumulada vetorizada (erfc de Numerical Recipes, erro relativo < 1.2e-7),
+    sem importar scipy no caminho da API.
+    """
+    z = np.abs(x) / np.sqrt(2)
+    t = 1 / (1 + 0.5 * z)
+    erfc = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (-0.82215223 + t * 0.17087277)))))))))
+    return np.where(x >= 0, 1 - 0.5 * erfc, 0.5 * erfc)
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x**2) / _SQRT_2PI
+
+def black76(F, K, T, r, sigma, is_call):
+    """Preço (Black-76) e vega de calls/puts sobre o forward F. Aceita arrays (broadcast)."""
+    sqrt_T = np.sqrt(T)
+    d1 = (np.log(F / K) + 0.5 * sigma**2 * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    discount = np.exp(-r * T)
+    call = discount * (F * norm_cdf(d1) - K * norm_cdf(d2))
+    put = call - discount * (F - K)  # paridade put-call
+    vega = discount * F * norm_pdf(d1) * sqrt_T
+    return np.where(is_call, call, put), vega
+
+def implied_vol(price, F, K, T, r, is_call):
+    """
+    Volatilidade implícita de um lote de opções (arrays do mesmo tamanho).
+    Newton a partir de uma estimativa ATM; quando o passo sai do intervalo que contém
+    a raiz (ou a vega é ~0), usa o ponto médio do intervalo. Prêmios fora dos limites de
+    arbitragem (abaixo do intrínseco ou acima do forward descontado) ficam NaN.
+    """
+    price, F, K, T = (np.asarray(a, dtype=float) for a in np.broadcast_arrays(price, F, K, T))
+    is_call = np.broadcast_to(is_call, price.shape)
+    discount = np.exp(-r * T)
+    intrinsic = discount * np.maximum(np.where(is_call, F - K, K - F), 0)
+    upper = discount * np.where(is_call, F, K)
+    valid = (T > 0) & (price > intrinsic + TOLERANCE) & (price < upper)
+
+    sigma = np.full(price.shape, np.nan)
+    idx = np.flatnonzero(valid)
+    if len(idx) == 0:
+        return sigma
+    target, F, K, T, is_call = price[idx], F[idx], K[idx], T[idx], is_call[idx]
+
+    # Estimativa inicial de Brenner-Subrahmanyam (ATM), limitada ao intervalo de busca
+    vol = np.clip(target / (discount[idx] * F) * _SQRT_2PI / np.sqrt(T), 0.05, 1.0)
+    low, high = np.full(len(idx), VOL_MIN), np.full(len(idx), VOL_MAX)
+    active = np.arange(len(idx))
+    for _ in range(MAX_ITERATIONS):
+        value, vega = black76(F[active], K[active], T[active], r, vol[active], is_call[active])
+        diff = value - target[active]
+        done = np.abs(diff) < TOLERANCE
+        # Preço cresce com a volatilidade: o sinal do erro atualiza o intervalo
+        high[active] = np.where(diff > 0, vol[active], high[active])
+        low[active] = np.where(diff < 0, vol[active], low[active])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = vol[active] - diff / vega
+        bisect = ~((step > low[active]) & (step < high[active]))
+        vol[active] = np.where(done, vol[active], np.where(bisect, 0.5 * (low[active] + high[active]), step))
+        active = active[~done]
+        if len(active) == 0:
+            break
+    vol[active] = np.nan  # não convergiu
+    sigma[idx] = vol
+    return sigma
+
+def option_premiums(df):
+    """
+    Prêmio (R$/US$) usado para cada opção: Prêmio de Referência; sem ele, o meio do
+    book (Compra/Venda) e, por último, o Último negócio. Zeros viram NaN.
+    """
+    def column(name):
+        return df[name].to_numpy(dtype=float) if name in df.columns else np.full(len(df), np.nan)
+
+    reference = column('Prêmio de Referência')
+    mid = 0.5 * (column('Compra') + column('Venda'))
+    premium = np.where(np.isnan(reference), np.where(np.isnan(mid), column('Último'), mid), reference)
+    premium = np.where(premium > 0, premium, np.nan)
+    return premium / PREMIUM_SCALE
+
+def forward_price(spot, T):
+    return spot * np.exp((SELIC_RATE - CUPOM_CAMBIAL) * T)
+
+def _series_codes(contracts):
+    """(séries, código de cada linha) a partir de uma coluna Contrato (categórica ou texto)."""
+    contracts = pd.Categorical(contracts)
+    return np.asarray(contracts.categories.astype(str)), contracts.codes
+
+def fit_smiles(codes, n_series, k, sigma, weight):
+    """
+    Ajuste quadrático sigma(k) = a + b*k + c*k**2 de todas as séries de uma vez, por
+    mínimos quadrados ponderados (equações normais 3x3 montadas com bincount e
+    resolvidas em lote). Séries com menos de SMILE_MIN_STRIKES strikes distintos, ou
+    cujo ajuste sai de [SMILE_IV_MIN, SMILE_IV_MAX] em algum ponto entre k_min e k_max
+    (curvatura que leva a vol a zero ou a valores absurdos), ficam com o smile plano na
+    média ponderada; séries sem pontos, NaN.
+
+    Returns:
+        (coeficientes [n_series, 3] em ordem a, b, c; k_min; k_max)
+    """
+    def sums(values):
+        return np.bincount(codes, weights=values, minlength=n_series)
+
+    moments = np.stack([sums(weight * k**p) for p in range(5)], axis=1)  # sum w*k^p, p = 0..4
+    targets = np.stack([sums(weight * sigma * k**p) for p in range(3)], axis=1)
+    # Calls e puts do mesmo strike contam uma vez
+    pairs = np.unique(np.column_stack([codes, k]), axis=0)
+    strikes = np.bincount(pairs[:, 0].astype(np.int64), minlength=n_series)
+    k_min = np.full(n_series, np.inf)
+    k_max = np.full(n_series, -np.inf)
+    np.minimum.at(k_min, codes, k)
+    np.maximum.at(k_max, codes, k)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coefficients = np.zeros((n_series, 3))
+        coefficients[:, 0] = targets[:, 0] / moments[:, 0]  # plano: média ponderada
+        quadratic = (strikes >= SMILE_MIN_STRIKES) & (k_max - k_min > 1e-9)
+        if quadratic.any():
+            normal = moments[quadratic][:, [[0, 1, 2], [1, 2, 3], [2, 3, 4]]]
+            well_conditioned = np.abs(np.linalg.det(normal)) > 1e-300
+            solved = np.linalg.solve(normal[well_conditioned], targets[quadratic][well_conditioned][..., None])[..., 0]
+            rows = np.flatnonzero(quadratic)[well_conditioned]
+            # Extremos do smile no intervalo ajustado: pontas e vértice, se estiver dentro
+            a, b, c = solved.T
+            lo, hi = k_min[rows], k_max[rows]
+            vertex = np.clip(np.where(c != 0, -b / (2 * c), lo), lo, hi)
+            values = np.stack([a + b * x + c * x**2 for x in (lo, hi, vertex)])
+            sane = (values.min(axis=0) >= SMILE_IV_MIN) & (values.max(axis=0) <= SMILE_IV_MAX)
+            coefficients[rows[sane]] = solved[sane]
+    return coefficients, k_min, k_max
+
+class VolSurface:
+    """
+    Smiles por série em log-moneyness k = ln(K / F): sigma(k) = a + b*k + c*k**2,
+    ajustado por mínimos quadrados ponderados pela vega (ver fit_smiles). Fora do
+    intervalo de strikes observado o smile é extrapolado plano. Séries sem IVs
+    plausíveis usam DEFAULT_VOLATILITY.
+    """
+    def __init__(self, spot, as_of, series, coefficients, k_min, k_max, forwards, options):
+        self.spot = spot
+        self.as_of = as_of
+        self.series = series              # nomes das séries (índice das demais arrays)
+        self.coefficients = coefficients  # [n_series, 3]: a, b, c (NaN = sem smile)
+        self.k_min = k_min
+        self.k_max = k_max
+        self.forwards = forwards          # forward de cada série no ajuste (NaN se vencida)
+        self.options = options            # DataFrame por opção: Contrato, Tipo, Strike, T, Forward, Premio, IV
+        self._index = {name: i for i, name in enumerate(series)}
+
+    @classmethod
+    def fit(cls, df, spot, as_of, T):
+        """
+        Resolve a volatilidade implícita de todas as opções de df (uma linha por opção,
+        com Contrato, Tipo, Strike e prêmios) e ajusta um smile por série.
+        T: prazo em anos de cada linha (NaN/<=0 para séries vencidas ou sem calendário).
+        """
+        strikes = df['Strike'].to_numpy(dtype=float)
+        series, codes = _series_codes(df['Contrato'])
+        is_call = np.asarray(pd.Categorical(df['Tipo']).astype(str)) == 'Call'
+        T = np.asarray(T, dtype=float)
+        alive = T > 0
+        forwards = forward_price(float(spot), np.where(alive, T, np.nan))
+        premiums = option_premiums(df)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            iv = implied_vol(premiums, forwards, strikes, T, SELIC_RATE, is_call)
+            _, vega = black76(forwards, strikes, T, SELIC_RATE, iv, is_call)
+            moneyness = np.log(strikes / forwards)
+        # IVs que não convergiram ou fora da faixa plausível não entram no ajuste
+        ok = (iv >= SMILE_IV_MIN) & (iv <= SMILE_IV_MAX) & (vega > 0) & (codes >= 0)
+        coefficients, k_min, k_max = fit_smiles(codes[ok], len(series), moneyness[ok], iv[ok], vega[ok])
+
+        series_forwards = np.full(len(series), np.nan)
+        series_forwards[codes[alive & (codes >= 0)]] = forwards[alive & (codes >= 0)]
+
+        options = pd.DataFrame({
+            'Contrato': df['Contrato'].to_numpy(), 'Tipo': df['Tipo'].to_numpy(), 'Strike': strikes,
+            'T': T, 'Forward': forwards, 'Premio': premiums, 'IV': iv,
+        })
+        return cls(spot, as_of, series, coefficients, k_min, k_max, series_forwards, options)
+
+    @property
+    def smiles(self):
+        """Série -> {'a', 'b', 'c', 'k_min', 'k_max', 'forward'} das séries com smile ajustado."""
+        return {
+            name: {'a': a, 'b': b, 'c': c, 'k_min': lo, 'k_max': hi, 'forward': fwd}
+            for name, (a, b, c), lo, hi, fwd in zip(
+                self.series, self.coefficients.tolist(), self.k_min.tolist(), self.k_max.tolist(), self.forwards.tolist())
+            if not np.isnan(a)
+        }
+
+    def vol(self, contracts, strikes):
+        """Volatilidade do smile para cada (série, strike); arrays do mesmo tamanho."""
+        names, codes = _series_codes(contracts)
+        strikes = np.asarray(strikes, dtype=float)
+        positions = np.array([self._index.get(name, -1) for name in names] + [-1], dtype=np.int64)
+        rows = positions[codes]  # código -1 (sem série) cai na última posição: -1
+        known = rows >= 0
+        if not known.any():
+            return np.full(len(strikes), DEFAULT_VOLATILITY)
+
+        rows = np.where(known, rows, 0)
+        a, b, c = self.coefficients[rows].T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            k = np.clip(np.log(strikes / self.forwards[rows]), self.k_min[rows], self.k_max[rows])
+            sigma = a + b * k + c * k**2
+        return np.where(known & ~np.isnan(sigma), np.maximum(sigma, VOL_MIN), DEFAULT_VOLATILITY)
+
+    def for_frame(self, df):
+        """Volatilidade de cada linha de um DataFrame de opções (Contrato, Strike)."""
+        return self.vol(df['Contrato'], df['Strike'].to_numpy(dtype=float))
@@ -0,0 +1,296 @@
+"""
+Armazenamento binário de ticks e do book de ofertas por símbolo.
+Tipos: 'tick', 'book' (snapshots completos) e 'delta' (mudanças de nível entre
+snapshots, ver BookCapture.py).
+Registros de tamanho fixo (timestamp int64 em ns, preços como inteiros escalados por
+PRICE_SCALE, volume, lado) gravados em arquivos só de acréscimo, um por símbolo, tipo
+e dia (data local da máquina que grava), em blocos comprimidos:
+    cabeçalho (CHUNK_HEADER): marca, registros, bytes do conteúdo, primeiro e último timestamp
+    conteúdo (zlib): colunas uma após a outra; timestamps e preços como diferenças do
+    registro anterior e cada coluna no menor inteiro que comporta seus valores.
+A leitura mapeia o arquivo em memória (np.memmap), percorre só os cabeçalhos e
+descomprime apenas os blocos do intervalo pedido. Um bloco incompleto no fim do
+arquivo (gravação interrompida) é ignorado.
+"""
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+PRICE_SCALE = 10_000  # 4 casas: cobre os ticks de WDO, WSP, WIN e DI1
+CHUNK_RECORDS = 4096  # registros por bloco
+FLUSH_INTERVAL = 60   # segundos máximos de dados só em memória
+COMPRESS_LEVEL = 6
+
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'), ('time_msc', '<i8'), ('bid', '<i8'), ('ask', '<i8'), ('last', '<i8'),
+    ('volume', '<i8'), ('flags', '<u4')
+])
+# Uma linha por nível; os níveis de um snapshot têm o mesmo time. side = BOOK_TYPE_* do MT5
+BOOK_DTYPE = np.dtype([('time', '<i8'), ('price', '<i8'), ('volume', '<i8'), ('side', 'i1')])
+# Mudança de um nível do book entre dois snapshots; na remoção volume = 0
+DELTA_DTYPE = np.dtype([('time', '<i8'), ('price', '<i8'), ('volume', '<i8'), ('side', 'i1'), ('action', 'i1')])
+DELTA_ADD, DELTA_UPDATE, DELTA_REMOVE = 1, 2, 3
+DTYPES = {'tick': TICK_DTYPE, 'book': BOOK_DTYPE, 'delta': DELTA_DTYPE}
+DELTA_FIELDS = {'time', 'time_msc', 'bid', 'ask', 'last', 'price'}
+
+CHUNK_MAGIC = b'TKS1'
+CHUNK_HEADER = struct.Struct('<4sIIqq')
+_WIDTHS = (np.int8, np.int16, np.int32, np.int64)
+
+def to_price(values):
+    """Preço em ponto flutuante -> inteiro escalado."""
+    return np.rint(np.asarray(values, dtype=float) * PRICE_SCALE).astype(np.int64)
+
+def from_price(values):
+    return np.asarray(values) / PRICE_SCALE
+
+def to_ns(value):
+    """Timestamp em ns desde 1970: inteiros passam direto; datas (sem fuso = UTC) via np.datetime64."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(np.datetime64(value, 'ns').astype(np.int64))
+
+def tick_records(tick, time_ns=None):
+    """Registro de um Tick do MT5 (symbol_info_tick); time_ns é o momento da captura."""
+    record = np.zeros(1, dtype=TICK_DTYPE)
+    record['time'] = time.time_ns() if time_ns is None else time_ns
+    record['time_msc'] = tick.time_msc
+    record['bid'], record['ask'], record['last'] = to_price([tick.bid, tick.ask, tick.last])
+    record['volume'] = tick.volume
+    record['flags'] = tick.flags
+    return record
+
+def book_records(book, time_ns=None):
+    """Registros dos níveis de um market_book_get do MT5, todos com o mesmo time."""
+    records = np.zeros(len(book), dtype=BOOK_DTYPE)
+    records['time'] = time.time_ns() if time_ns is None else time_ns
+    if len(book):
+        side, price, volume = zip(*((level.type, level.price, level.volume) for level in book))
+        records['price'] = to_price(price)
+        records['volume'] = volume
+        records['side'] = side
+    return records
+
+def delta_records(previous, levels, time_ns=None):
+    """
+    Registros das mudanças entre dois books como dicts {(side, price): volume}:
+    remoções primeiro, depois inclusões e alterações de volume.
+    """
+    removed = [(key, 0, DELTA_REMOVE) for key in previous.keys() - levels.keys()]
+    changed = [(key, volume, DELTA_UPDATE if key in previous else DELTA_ADD)
+               for key, volume in levels.items() if previous.get(key) != volume]
+    records = np.zeros(len(removed) + len(changed), dtype=DELTA_DTYPE)
+    records['time'] = time.time_ns() if time_ns is None else time_ns
+    if len(records):
+        keys, volume, action = zip(*(removed + changed))
+        side, price = zip(*keys)
+        records['price'] = to_price(price)
+        records['volume'] = volume
+        records['side'] = side
+        records['action'] = action
+    return records
+
+def _encode(records):
+    parts = []
+    for name in records.dtype.names:
+        column = records[name].astype(np.int64)
+        if name in DELTA_FIELDS:
+            column = np.diff(column, prepend=0)
+        low, high = (column.min(), column.max()) if len(column) else (0, 0)
+        width = next(w for w in _WIDTHS if np.iinfo(w).min <= low and high <= np.iinfo(w).max)
+        parts.append(bytes([np.dtype(width).itemsize]))
+        parts.append(column.astype(width).tobytes())
+    return b''.join(parts)
+
+def _decode(payload, dtype, count):
+    records = np.empty(count, dtype=dtype)
+    position = 0
+    for name in dtype.names:
+        width = payload[position]
+        column = np.frombuffer(payload, dtype=f'<i{width}', count=count, offset=position + 1)
+        position += 1 + width * count
+        column = column.astype(np.int64)
+        records[name] = np.cumsum(column) if name in DELTA_FIELDS else column
+    return records
+
+class TickStore:
+    def __init__(self, path='./data/ticks/', chunk_records=CHUNK_RECORDS, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.chunk_records = chunk_records
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffers = {}  # (símbolo, tipo) -> [arrays, registros, momento do primeiro]
+        os.makedirs(path, exist_ok=True)
+
+    def _dir(self, symbol):
+        # '$' e outros caracteres de símbolos contínuos (ex.: WDO$) não vão para o nome do arquivo
+        return os.path.join(self.path, re.sub(r'[^A-Za-z0-9_-]', '_', symbol))
+
+    def _file(self, symbol, kind, time_ns):
+        """Arquivo do dia de time_ns, na data local (o _flush não deixa um bloco passar da meia-noite)."""
+        day = datetime.fromtimestamp(time_ns / 1e9).strftime('%Y%m%d')
+        return os.path.join(self._dir(symbol), f"{kind}_{day}.bin")
+
+    @staticmethod
+    def _next_day(time_ns):
+        """ns da próxima meia-noite local depois de time_ns."""
+        day = datetime.fromtimestamp(time_ns / 1e9).date() + timedelta(days=1)
+        return int(datetime(day.year, day.month, day.day).timestamp()) * 10 ** 9
+
+    def files(self, symbol, kind, start=None, end=None):
+        """
+        Arquivos de um símbolo e tipo, em ordem de data. Com start/end (ns) só os dias
+        do intervalo, com um dia de folga de cada lado (o dia do arquivo é a data local
+        de quem gravou, que pode estar em outro fuso).
+        """
+        folder = self._dir(symbol)
+        if not os.path.isdir(folder):
+            return []
+        first = '' if start is None else self._day(start, -1)
+        last = '99999999' if end is None else self._day(end, 1)
+        return sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                      if f.startswith(kind + '_') and f.endswith('.bin')
+                      and first <= f[len(kind) + 1:-4] <= last)
+
+    @staticmethod
+    def _day(time_ns, margin):
+        try:
+            day = datetime.fromtimestamp(time_ns / 1e9) + timedelta(days=margin)
+        except (OverflowError, OSError, ValueError):
+            return '' if margin < 0 else '99999999'
+        return day.strftime('%Y%m%d')
+
+    ######################################
+    # Gravação
+    def append(self, symbol, kind, records):
+        """
+        Acrescenta registros (em ordem de tempo) ao buffer do símbolo; grava um bloco a
+        cada chunk_records registros ou flush_interval segundos.
+        """
+        records = np.asarray(records).astype(DTYPES[kind], copy=False)
+        if len(records) == 0:
+            return
+        with self._lock:
+            buffer = self._buffers.setdefault((symbol, kind), [[], 0, time.time()])
+            buffer[0].append(records)
+            buffer[1] += len(records)
+            if buffer[1] >= self.chunk_records or time.time() - buffer[2] >= self.flush_interval:
+                self._flush(symbol, kind)
+
+    def _flush(self, symbol, kind):
+        arrays, count, _ = self._buffers.pop((symbol, kind), ([], 0, None))
+        if not count:
+            return
+        records = np.concatenate(arrays)
+        for start in range(0, len(records), self.chunk_records):
+            chunk = records[start:start + self.chunk_records]
+            # Um bloco não passa da meia-noite: o resto vai para o arquivo do dia seguinte
+            split = np.searchsorted(chunk['time'], self._next_day(int(chunk['time'][0])))
+            while split < len(chunk):
+                self._write(symbol, kind, chunk[:split])
+                chunk = chunk[split:]
+                split = np.searchsorted(chunk['time'], self._next_day(int(chunk['time'][0])))
+            self._write(symbol, kind, chunk)
+
+    def _write(self, symbol, kind, chunk):
+        payload = zlib.compress(_encode(chunk), COMPRESS_LEVEL)
+        first, last = int(chunk['time'][0]), int(chunk['time'][-1])
+        filename = self._file(symbol, kind, first)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'ab') as f:
+            f.write(CHUNK_HEADER.pack(CHUNK_MAGIC, len(chunk), len(payload), first, last) + payload)
+
+    def flush(self):
+        """Grava tudo o que está em memória."""
+        with self._lock:
+            for symbol, kind in list(self._buffers):
+                self._flush(symbol, kind)
+
+    close = flush
+
+    ######################################
+    # Leitura
+    @staticmethod
+    def _chunks(filename):
+        """(offset do conteúdo, registros, bytes, primeiro, último) de cada bloco completo do arquivo."""
+        size = os.path.getsize(filename)
+        if size < CHUNK_HEADER.size:
+            return None, []
+        mm = np.memmap(filename, dtype=np.uint8, mode='r')
+        chunks, offset = [], 0
+        while offset + CHUNK_HEADER.size <= size:
+            magic, count, length, first, last = CHUNK_HEADER.unpack_from(mm, offset)
+            start = offset + CHUNK_HEADER.size
+            if magic != CHUNK_MAGIC or start + length > size:
+                break
+            chunks.append((start, count, length, first, last))
+            offset = start + length
+        return mm, chunks
+
+    def read(self, symbol, kind, start=None, end=None):
+        """
+        Registros de um símbolo e tipo com start <= time <= end (ns desde 1970 ou datas),
+        como array estruturado com DTYPES[kind]. Inclui o que ainda está no buffer.
+        """
+        start = -2 ** 63 if start is None else to_ns(start)
+        end = 2 ** 63 - 1 if end is None else to_ns(end)
+        dtype = DTYPES[kind]
+        parts = []
+        for filename in self.files(symbol, kind, start, end):
+            mm, chunks = self._chunks(filename)
+            for offset, count, length, first, last in chunks:
+                if last < start or first > end:
+                    continue
+                parts.append(_decode(zlib.decompress(mm[offset:offset + length]), dtype, count))
+            del mm
+        with self._lock:
+            buffer = self._buffers.get((symbol, kind))
+            if buffer is not None:
+                parts.extend(buffer[0])
+        records = np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        return records[(records['time'] >= start) & (records['time'] <= end)]
+
+    def symbols(self):
+        return sorted(d for d in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, d)))
+
+    ######################################
+    # Conversão das capturas antigas em CSV
+    def import_csv(self, symbol, kind, filename):
+        """Grava um CSV de orderbook01.py (ver csv_records). Retorna a quantidade de registros."""
+        records = csv_records(kind, filename)
+        self.append(symbol, kind, records)
+        self.flush()
+        return len(records)
+
+def csv_records(kind, filename):
+    """
+    Registros de um CSV de orderbook01.py (tick: Timestamp,Last,Bid,Ask,Volume,Flags;
+    book: Timestamp,Type,Price,Volume). Os timestamps do CSV são datetime.now(), no
+    fuso local.
+    """
+    columns = np.loadtxt(filename, delimiter=',', skiprows=1, dtype=str, ndmin=2).T
+    records = np.zeros(columns.shape[1], dtype=DTYPES[kind])
+    if len(records) == 0:
+        return records
+    stamps = np.array(columns[0], dtype='datetime64[ns]').astype(np.int64)
+    first = datetime.fromisoformat(str(columns[0][0]))
+    stamps -= int(first.astimezone().utcoffset().total_seconds()) * 10 ** 9
+    records['time'] = stamps
+    if kind == 'tick':
+        _, last, bid, ask, volume, flags = columns
+        records['time_msc'] = stamps // 10 ** 6
+        records['last'], records['bid'], records['ask'] = to_price(last), to_price(bid), to_price(ask)
+        records['volume'] = volume.astype(float)
+        records['flags'] = flags.astype(np.int64)
+    else:
+        _, side, price, volume = columns
+        records['side'] = side.astype(np.int64)
+        records['price'] = to_price(price)
+        records['volume'] = volume.astype(float)
+    return records
@@ -0,0 +1,70 @@
+"""
+Índice de dias úteis (calendário nacional brasileiro, equivalente ao ANBIMA / ql.Brazil()).
+Pré-calcula uma vez o acumulado de dias úteis entre 2000 e 2060; a contagem de DU
+entre quaisquer pares de datas vira uma diferença de duas posições do array,
+feita de forma vetorizada para qualquer quantidade de pares.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+FIRST_DAY = np.datetime64('2000-01-01', 'D')
+LAST_DAY = np.datetime64('2060-12-31', 'D')
+
+@lru_cache(maxsize=1)
+def _index():
+    """
+    Monta o índice a partir dos feriados de ql.Brazil() (mercado Settlement).
+    cumulative[i] = dias úteis em [FIRST_DAY, FIRST_DAY + i)
+    following[i]  = posição do primeiro dia útil >= FIRST_DAY + i
+    """
+    import QuantLib as ql
+
+    days = np.arange(FIRST_DAY, LAST_DAY + 1)
+    holidays = ql.Brazil().holidayList(ql.Date(1, 1, 2000), ql.Date(31, 12, 2060))
+    holidays = np.array([np.datetime64(h.ISO(), 'D') for h in holidays])
+
+    # 1970-01-01 foi quinta-feira: (dias + 3) % 7 dá 0 para segunda
+    weekday = (days.astype(np.int64) + 3) % 7
+    is_business = (weekday < 5) & ~np.isin(days, holidays)
+
+    cumulative = np.zeros(len(days) + 1, dtype=np.int32)
+    np.cumsum(is_business, out=cumulative[1:])
+
+    # Próximo dia útil: varre de trás para frente propagando a última posição útil
+    positions = np.where(is_business, np.arange(len(days)), len(days))
+    following = np.minimum.accumulate(positions[::-1])[::-1]
+
+    return is_business, cumulative, following
+
+def _positions(dates):
+    """Converte data(s) (date, datetime, str ISO, datetime64, Series) em posições do índice."""
+    days = np.asarray(dates, dtype='datetime64[D]')
+    positions = (days - FIRST_DAY).astype(np.int64)
+    if np.any(positions < 0) or np.any(days > LAST_DAY):
+        raise ValueError(f"Datas fora do intervalo do índice de dias úteis ({FIRST_DAY} a {LAST_DAY})")
+    return positions
+
+def business_days_between(start, end):
+    """
+    Dias úteis entre start (inclusive) e end (exclusive), mesma convenção de
+    ql.Calendar.businessDaysBetween. Aceita escalares ou arrays (com broadcast).
+    Quando end < start o resultado é negativo e, como no QuantLib, conta (end, start].
+    """
+    _, cumulative, _ = _index()
+    start, end = _positions(start), _positions(end)
+    forward = cumulative[end] - cumulative[start]
+    backward = cumulative[np.minimum(end + 1, len(cumulative) - 1)] - cumulative[np.minimum(start + 1, len(cumulative) - 1)]
+    return np.where(end >= start, forward, backward)
+
+def is_business_day(dates):
+    is_business, _, _ = _index()
+    return is_business[_positions(dates)]
+
+def adjust_following(dates):
+    """Data(s) ajustadas para o próximo dia útil (a própria data se já for útil), como ql.Following."""
+    _, _, following = _index()
+    positions = following[_positions(dates)]
+    if np.any(positions >= len(following)):
+        raise ValueError(f"Sem dia útil seguinte dentro do índice (até {LAST_DAY})")
+    return FIRST_DAY + positions
@@ -1,6 +1,9 @@
 import QuantLib as ql
 from datetime import datetime
+from functools import lru_cache
+import numpy as np
 import pandas as pd
+import business_days
 #import ambima as ambima
 
 def create_brazil_calendar():
@@ -66,7 +69,7 @@ def set_manual_rates(schedule_df, manual_rates):
             schedule_df.loc[mask, 'manual'] = True
     return schedule_df
 
-def optimize_remaining_rates(schedule_df, initial_rate, target_rate, calendar):
+def optimize_remaining_rates(schedule_df, initial_rate, target_rate):
     """
     Otimiza as taxas não definidas manualmente para atingir a taxa média alvo.
     
@@ -74,11 +77,10 @@ def optimize_remaining_rates(schedule_df, initial_rate, target_rate, calendar):
         schedule_df: DataFrame com as reuniões e taxas manuais já definidas
         initial_rate: Taxa CDI inicial
         target_rate: Taxa alvo a ser atingida
-        calendar: Calendário brasileiro
     """
-    # Ajusta as datas para o próximo dia útil
-    schedule_df['data_efetiva'] = schedule_df['data_reuniao'].apply(
-        lambda x: get_next_business_day(x, calendar)
+    # Ajusta as datas para o próximo dia útil (todas de uma vez pelo índice de dias úteis)
+    schedule_df['data_efetiva'] = pd.to_datetime(
+        business_days.adjust_following(schedule_df['data_reuniao'])
     )
     
     # Identifica reuniões sem taxa definida
@@ -107,24 +109,18 @@ def optimize_remaining_rates(schedule_df, initial_rate, target_rate, calendar):
     
     return schedule_df
 
-def calculate_average_rate(schedule_df, start_date, end_date, calendar):
+def calculate_average_rate(schedule_df, start_date, end_date):
     """
     Calcula a taxa média ponderada pelo número de dias úteis.
+    Os dias úteis de todos os intervalos saem de uma única consulta vetorizada ao índice.
     """
-    weighted_sum = 0
-    total_days = 0
-    
     dates = [start_date] + list(schedule_df['data_efetiva']) + [end_date]
     rates = [schedule_df['taxa'].iloc[0]] + list(schedule_df['taxa']) + [schedule_df['taxa'].iloc[-1]]
-    
-    for i in range(len(dates) - 1):
-        ql_start = ql.Date(dates[i].day, dates[i].month, dates[i].year)
-        ql_end = ql.Date(dates[i+1].day, dates[i+1].month, dates[i+1].year)
-        
-        business_days = calendar.businessDaysBetween(ql_start, ql_end)
-        weighted_sum += rates[i] * business_days
-        total_days += business_days
-    
+
+    business_days_per_interval = business_days.business_days_between(dates[:-1], dates[1:])
+    weighted_sum = np.dot(np.array(rates[:-1], dtype=float), business_days_per_interval)
+    total_days = business_days_per_interval.sum()
+
     return weighted_sum / total_days if total_days > 0 else 0
 
 # Define a função que retorna as taxas manuais
@@ -137,6 +133,102 @@ def get_manual_rates():
         '2025-06-18': 15.50   # sendo um pouco mais agressivo considerando o din26 alto  
     }
 
+MONTH_CODES = {'F': 1, 'G': 2, 'H': 3, 'J': 4, 'K': 5, 'M': 6,
+               'N': 7, 'Q': 8, 'U': 9, 'V': 10, 'X': 11, 'Z': 12}
+
+def di1_expiry(ticker):
+    """
+    Vencimento de um contrato DI1 pelo código (ex.: DI1F27): primeiro dia útil do mês.
+    Retorna None se o código não for reconhecido ou se o vencimento ficar fora do
+    índice de dias úteis.
+    """
+    if len(ticker) != 6 or not ticker.startswith('DI1') or ticker[3] not in MONTH_CODES or not ticker[4:].isdigit():
+        return None
+    first_day = datetime(2000 + int(ticker[4:]), MONTH_CODES[ticker[3]], 1)
+    try:
+        return business_days.adjust_following(first_day).astype(datetime)
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=1)
+def get_copom_base():
+    """
+    Cronograma do COPOM com as taxas manuais já aplicadas e as datas efetivas ajustadas.
+    Montado uma vez e compartilhado entre os cálculos (não deve ser alterado por quem usa).
+    """
+    schedule_df = set_manual_rates(create_copom_schedule(), get_manual_rates())
+    effective = business_days.adjust_following(schedule_df['data_reuniao'])
+    manual = schedule_df['manual'].to_numpy(dtype=bool)
+    rates = schedule_df['taxa'].to_numpy(dtype=float, na_value=np.nan)
+    return schedule_df['data_reuniao'].to_numpy(dtype='datetime64[D]'), effective, manual, rates
+
+def EstimaCurvaDI(initial_rate, vertices, initial_date):
+    """
+    Resolve todos os vértices da curva DI1 de uma vez sobre o mesmo cronograma do COPOM.
+
+    Args:
+        initial_rate: Taxa CDI atual
+        vertices: Lista de (ticker, vencimento, taxa) com a taxa do DI1 em % a.a.
+        initial_date: Data de referência
+
+    Para cada vértice a trajetória das reuniões segue a mesma regra de
+    optimize_remaining_rates (taxas manuais + aumentos lineares até a taxa do vértice).
+    A taxa CDI média considera só os dias úteis entre initial_date e o vencimento,
+    com initial_rate valendo até a primeira reunião efetiva.
+    A taxa a termo de cada vértice é a do período desde o vértice anterior (base 252).
+
+    Returns:
+        (vertices_df, copom_df): um registro por vértice e um por reunião (uma coluna por ticker)
+    """
+    meeting_dates, effective, manual, manual_rates = get_copom_base()
+    vertices = sorted(vertices, key=lambda v: np.datetime64(v[1], 'D'))
+    tickers = [v[0] for v in vertices]
+    expiries = np.array([v[1] for v in vertices], dtype='datetime64[D]')
+    targets = np.array([v[2] for v in vertices], dtype=float)
+
+    # Trajetória implícita por vértice (linhas) e reunião (colunas)
+    last_manual_rate = manual_rates[manual][-1] if manual.any() else initial_rate
+    auto_step = np.cumsum(~manual)  # posição da reunião entre as não manuais (1, 2, ...)
+    increase_per_meeting = (targets - last_manual_rate) / max(int((~manual).sum()), 1)
+    paths = np.where(manual, manual_rates, last_manual_rate + np.outer(increase_per_meeting, auto_step))
+
+    # Intervalos de vigência: [início, reunião 1), [reunião 1, reunião 2), ..., [última, infinito)
+    start = np.datetime64(initial_date, 'D')
+    bounds = np.concatenate(([start], effective))
+    interval_start = np.maximum(bounds, start)
+    interval_end = np.concatenate((effective, [business_days.LAST_DAY]))
+    clipped_start = np.minimum(interval_start[None, :], expiries[:, None])
+    clipped_end = np.clip(interval_end[None, :], clipped_start, expiries[:, None])
+    days = business_days.business_days_between(clipped_start, clipped_end)
+    interval_rates = np.column_stack((np.full(len(vertices), initial_rate), paths))
+    total_days = days.sum(axis=1)
+    average = np.where(total_days > 0, (interval_rates * days).sum(axis=1) / np.maximum(total_days, 1), np.nan)
+
+    # Taxas a termo entre vértices consecutivos (capitalização 252)
+    factors = (1 + targets / 100) ** (total_days / 252)
+    previous_factors = np.concatenate(([1.0], factors[:-1]))
+    previous_days = np.concatenate(([0], total_days[:-1]))
+    period_days = total_days - previous_days
+    with np.errstate(divide='ignore', invalid='ignore'):
+        forward = np.where(period_days > 0, ((factors / previous_factors) ** (252 / period_days) - 1) * 100, np.nan)
+
+    vertices_df = pd.DataFrame({
+        'ticker': tickers,
+        'vencimento': pd.to_datetime(expiries),
+        'du': total_days,
+        'taxa': targets,
+        'taxa_termo': forward,
+        'cdi_medio': average
+    })
+    copom_df = pd.DataFrame({
+        'data_reuniao': pd.to_datetime(meeting_dates),
+        'data_efetiva': pd.to_datetime(effective),
+        'manual': manual
+    })
+    for i, ticker in enumerate(tickers):
+        copom_df[ticker] = paths[i]
+    return vertices_df, copom_df
+
 def main():
     # Parâmetros iniciais
     initial_date = datetime(2024, 12, 23)
@@ -147,9 +239,6 @@ def main():
     # Taxas definidas manualmente
     manual_rates = get_manual_rates()
     
-    # Criar calendário brasileiro
-    calendar = create_brazil_calendar()
-    
     ## Calcular a quantidade de dias úteis entre 01/01/2024 e 31/12/2024
     # Para testar diferença entre QuantLib e Ambima (no restuldo do teste com 2024 e 2025 não deu diferença)
     start_date = ql.Date(1, 1, 2024)
@@ -165,10 +254,10 @@ def main():
     schedule_df = set_manual_rates(schedule_df, manual_rates)
     
     # Otimizar taxas restantes
-    rates_df = optimize_remaining_rates(schedule_df, initial_rate, target_rate, calendar)
+    rates_df = optimize_remaining_rates(schedule_df, initial_rate, target_rate)
     
     # Calcular taxa média
-    average_rate = calculate_average_rate(rates_df, initial_date, final_date, calendar)
+    average_rate = calculate_average_rate(rates_df, initial_date, final_date)
     
     # Exibir resultados
     print("\nProjeção de taxas por reunião do COPOM:")
@@ -183,9 +272,6 @@ def main():
 def EstimaCDI(initial_rate, target_rate, initial_date, final_date):
     manual_rates = get_manual_rates()
 
-    # Criar calendário brasileiro
-    calendar = create_brazil_calendar()
-    
     # Criar cronograma de reuniões
     schedule_df = create_copom_schedule()
     
@@ -193,10 +279,10 @@ def EstimaCDI(initial_rate, target_rate, initial_date, final_date):
     schedule_df = set_manual_rates(schedule_df, manual_rates)
     
     # Otimizar taxas restantes
-    rates_df = optimize_remaining_rates(schedule_df, initial_rate, target_rate, calendar)
+    rates_df = optimize_remaining_rates(schedule_df, initial_rate, target_rate)
     
     # Calcular taxa média
-    average_rate = calculate_average_rate(rates_df, initial_date, final_date, calendar)
+    average_rate = calculate_average_rate(rates_df, initial_date, final_date)
     
     return rates_df
     
@@ -2,53 +2,99 @@
 from flask import Flask, send_from_directory, jsonify, request
 from flask_cors import CORS
 
-import pandas as pd
-import random
+import os
 import time
-from datetime import datetime
+import threading
 import sys
 sys.path.append('./lib')
 #import di as di
-from api import get_ticker_data, get_CDI_estimate, get_historical_ticker_data, get_dolar_options
-from lib.B3 import BoletimDiario
-
-app = Flask(__name__)
-CORS(app, resources={
-    r"/api/*": {
-        "origins": ["http://localhost:3000"],
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
-    }
-})
-
-# Load configuration settings if any
-# app.config.from_object('config.Config')
-
-print('Processando arquivos disponíveis em ./data/_para_processar/')
-BoletimDiario.GenerateCSVOptionsDolar()
-print('FIM: Processando arquivos disponíveis em ./data/_para_processar/')
-app.add_url_rule('/api/last-ticker-data', view_func=get_ticker_data, methods=['GET'])
-app.add_url_rule('/api/estimate-cdi', view_func=get_CDI_estimate, methods=['GET'])
-app.add_url_rule('/api/historical-ticker-data', view_func=get_historical_ticker_data, methods=['GET'])
-app.add_url_rule('/api/dolar-options', view_func=get_dolar_options, methods=['GET'])
+import MT5
+from api import get_ticker_data, get_CDI_estimate, get_historical_ticker_data, get_dolar_options, get_stream, get_di_curve, get_dolar_gamma_profile, get_dolar_vol_surface, get_dolar_exposure, get_dolar_exposure_stream, get_dolar_oi_history, get_mt5_status
+
+# Boletins em ./data/_para_processar/ são processados em segundo plano,
+# para o servidor já atender enquanto os PDFs são lidos. PyMuPDF (fitz) só é
+# importado nessa thread, fora da inicialização. BDI_INGESTION=0 desliga a ingestão.
+# A ingestão e a conexão com o MT5 só começam em create_app (flask --app server run
+# chama a fábrica): importar server.py não tem efeitos colaterais, então os processos
+# do pool de BoletimDiario podem ser criados por spawn (Windows) sem repetir nada disso.
+_started_at = time.time()
+_ingestion = {'state': 'running', 'error': None, 'finished_at': None}
+
+def processar_boletins():
+  print('Processando arquivos disponíveis em ./data/_para_processar/')
+  try:
+    from lib.B3 import BoletimDiario
+    BoletimDiario.GenerateCSVOptionsDolar()
+    _ingestion['state'] = 'done'
+  except Exception as e:
+    _ingestion.update(state='failed', error=str(e))
+    raise
+  finally:
+    _ingestion['finished_at'] = time.time()
+  print('FIM: Processando arquivos disponíveis em ./data/_para_processar/')
+
+# Prontidão: 200 com o MT5 conectado, 503 enquanto conecta. A ingestão dos boletins
+# é informada, mas não bloqueia (as opções já gravadas continuam sendo servidas).
+def get_ready():
+  mt5 = MT5.connection_status()
+  mt5.pop('calls')  # métricas por chamada ficam em /api/mt5-status
+  ready = mt5['connected']
+  return jsonify({
+    'ready': ready,
+    'uptime': round(time.time() - _started_at, 3),
+    'mt5': mt5,
+    'ingestion': _ingestion
+  }), 200 if ready else 503
 
 ######################################
 # homepage
-@app.route("/")
 def pagina_inicial():
   print('get_initial_data')
   return send_from_directory('./', 'index.html')
 # SnP
-@app.route("/WSPFUT")
 def wsp_fut():
   return send_from_directory('cli', 'graficoWSPFUT.html')
 # DI
-@app.route("/DI")
 def di_fut():
   return send_from_directory('cli', 'DI.html')
 
+def create_app():
+  app = Flask(__name__)
+  CORS(app, resources={
+      r"/api/*": {
+          "origins": ["http://localhost:3000"],
+          "methods": ["GET", "POST", "OPTIONS"],
+          "allow_headers": ["Content-Type"]
+      }
+  })
 
+  # Load configuration settings if any
+  # app.config.from_object('config.Config')
 
+  app.add_url_rule('/api/last-ticker-data', view_func=get_ticker_data, methods=['GET'])
+  app.add_url_rule('/api/estimate-cdi', view_func=get_CDI_estimate, methods=['GET'])
+  app.add_url_rule('/api/historical-ticker-data', view_func=get_historical_ticker_data, methods=['GET'])
+  app.add_url_rule('/api/dolar-options', view_func=get_dolar_options, methods=['GET'])
+  app.add_url_rule('/api/stream', view_func=get_stream, methods=['GET'])
+  app.add_url_rule('/api/dolar-gamma-profile', view_func=get_dolar_gamma_profile, methods=['GET'])
+  app.add_url_rule('/api/dolar-vol-surface', view_func=get_dolar_vol_surface, methods=['GET'])
+  app.add_url_rule('/api/dolar-exposure', view_func=get_dolar_exposure, methods=['GET'])
+  app.add_url_rule('/api/dolar-exposure-stream', view_func=get_dolar_exposure_stream, methods=['GET'])
+  app.add_url_rule('/api/dolar-oi-history', view_func=get_dolar_oi_history, methods=['GET'])
+  app.add_url_rule('/api/mt5-status', view_func=get_mt5_status, methods=['GET'])
+  app.add_url_rule('/api/di-curve', view_func=get_di_curve, methods=['GET', 'POST'])
+  app.add_url_rule('/api/ready', view_func=get_ready, methods=['GET'])
+  app.add_url_rule('/', view_func=pagina_inicial)
+  app.add_url_rule('/WSPFUT', view_func=wsp_fut)
+  app.add_url_rule('/DI', view_func=di_fut)
 
+  if os.environ.get('BDI_INGESTION', '1') != '0':
+    threading.Thread(target=processar_boletins, name='bdi-ingestion', daemon=True).start()
+  else:
+    _ingestion['state'] = 'disabled'
+  # Terminal MT5 conecta em segundo plano, com novas tentativas (ver MT5.connect)
+  MT5.connect()
+  return app
 
-
+if __name__ == "__main__":
+  create_app().run()
@@ -1,6 +1,14 @@
 import pandas as pd
 import pandas_ta as ta
-import MetaTrader5 as mt5
+import os
+import sys
+from pathlib import Path
+# MT5_FAKE=1 usa o feed simulado (lib/MT5Fake.py) no lugar do terminal
+if os.environ.get('MT5_FAKE'):
+    sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+    import MT5Fake as mt5
+else:
+    import MetaTrader5 as mt5
 from datetime import datetime, timedelta
 import numpy as np
 
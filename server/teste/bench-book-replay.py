@@ -0,0 +1,67 @@
+# Reprodução das gravações de book e ticks (BookReplay) o mais rápido possível.
+# Confere que a reconstrução por mudanças de nível (snapshot inicial + deltas, como
+# grava o BookCapture) chega no mesmo book que os snapshots completos, e mede quantas
+# vezes o topo do book reconstruído coincide com o bid/ask do tick gravado junto.
+#   cd server
+#   python teste/bench-book-replay.py
+#   python teste/bench-book-replay.py --csv ../anterior/orderbook --simbolo WSPZ24
+import argparse
+import glob
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from BookReplay import BookReplay
+from TickStore import delta_records, from_price
+
+def snapshots_para_deltas(book):
+    """Primeiro snapshot completo e o resto como mudanças de nível entre snapshots."""
+    inicio = np.flatnonzero(np.concatenate([[True], book['time'][1:] != book['time'][:-1]]))
+    grupos = np.split(book, inicio[1:])
+    anterior, deltas = {}, []
+    for grupo in grupos:
+        niveis = {(int(s), float(p)): int(v) for s, p, v in zip(grupo['side'], from_price(grupo['price']), grupo['volume'])}
+        if anterior:
+            deltas.append(delta_records(anterior, niveis, int(grupo['time'][0])))
+        anterior = niveis
+    return grupos[0], np.concatenate(deltas)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default=str(Path(__file__).parent.parent.parent / 'anterior' / 'orderbook'))
+    parser.add_argument('--simbolo', default='WSPZ24')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    replay = BookReplay.from_csv(glob.glob(os.path.join(args.csv, f'orderbook_{args.simbolo}_*.csv')),
+                                 glob.glob(os.path.join(args.csv, f'tick_{args.simbolo}_*.csv')))
+    carga = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    topo, iguais, ticks = {}, 0, 0
+    for evento in replay.events():
+        if evento.kind == 'book':
+            topo[evento.time] = replay.ladder.depth()
+        elif evento.kind == 'tick' and replay.ladder.best_bid() >= 0:
+            ticks += 1
+            bid = replay.ladder.prices[replay.ladder.best_bid()]
+            ask = replay.ladder.prices[replay.ladder.best_ask()]
+            iguais += bool(bid == evento.records['bid'][0] and ask == evento.records['ask'][0])
+    reproducao = time.perf_counter() - inicio
+    print(f"{len(replay)} eventos ({len(replay.records['book'])} níveis, {len(replay.records['tick'])} ticks) | "
+          f"carga {carga * 1000:.0f} ms | reprodução {reproducao * 1000:.0f} ms ({len(replay) / reproducao:,.0f} eventos/s) | "
+          f"topo do book = bid/ask do tick em {iguais}/{ticks}")
+
+    primeiro, deltas = snapshots_para_deltas(replay.records['book'])
+    por_deltas = BookReplay(primeiro, deltas)
+    conferidos = 0
+    for evento in por_deltas.events():
+        esperado = topo[evento.time]
+        obtido = por_deltas.ladder.depth()
+        assert all(np.array_equal(a, b) for a, b in zip(esperado, obtido)), evento.time
+        conferidos += 1
+    print(f"snapshot + {len(deltas)} deltas: book igual aos snapshots completos em {conferidos} eventos")
@@ -0,0 +1,39 @@
+# Benchmark da reprecificação da exposição a cada tick (LiveExposure.update)
+# contra o caminho anterior: recriar OptionsAnalysis a partir dos CSVs e rodar
+# calculate_gamma_exposure para cada novo spot. Confere que o GEX por strike é igual
+# ao de OptionsAnalysis.dealer_exposure no mesmo spot.
+#   cd server
+#   python teste/bench-live-exposure.py
+import glob
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from OptionsAnalysis.analysis import OptionsAnalysis
+from OptionsAnalysis.live import LiveExposure
+
+if __name__ == "__main__":
+    calls_file = max(glob.glob('data/opcoes_dolar/*_DOL_OP_Call.csv'))
+    puts_file = calls_file.replace('_Call.csv', '_Put.csv')
+    as_of = Path(calls_file).name.split('_')[0]
+    spots = 5.80 + np.random.default_rng(0).normal(0, 0.01, 200).cumsum() * 0.1
+
+    def reconstruir(spot):
+        analyzer = OptionsAnalysis(spot, None, calls_file, puts_file)
+        return analyzer.calculate_gamma_exposure(as_of=as_of)
+
+    analyzer = OptionsAnalysis(5.80, None, calls_file, puts_file)
+    live = LiveExposure(analyzer.df, 5.80, as_of, implied_vol=False)
+    esperado = analyzer.dealer_exposure(as_of=as_of)
+    esperado = esperado[esperado['Strike'].isin(live.strikes)]
+    assert np.allclose(live.update(5.80)['GEX'], esperado['GEX']), "GEX diferente de dealer_exposure"
+
+    anterior = min(timeit.repeat(lambda: [reconstruir(s) for s in spots[:20]], number=1, repeat=3)) / 20
+    carga = min(timeit.repeat(lambda: LiveExposure(analyzer.df, 5.80, as_of), number=1, repeat=3))
+    ticks = iter(np.tile(spots, 1000))
+    novo = min(timeit.repeat(lambda: live.update(next(ticks)), number=len(spots), repeat=5)) / len(spots)
+    print(f"{as_of}: {len(analyzer.df)} opções, {len(live.strikes)} strikes | reconstruir {anterior * 1000:.2f} ms/tick | "
+          f"carga do LiveExposure {carga * 1000:.2f} ms | update {novo * 1e6:.0f} us/tick | {anterior / novo:.0f}x")
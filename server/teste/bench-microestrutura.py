@@ -0,0 +1,47 @@
+# Tempo dos indicadores de microestrutura (BookFeatures.features) em um dia inteiro
+# de vários símbolos. O dia é montado repetindo as capturas de WSPZ24 com o horário
+# deslocado até cobrir o pregão (mantém os intervalos entre as capturas).
+#   cd server
+#   python teste/bench-microestrutura.py
+#   python teste/bench-microestrutura.py --simbolos 8 --horas 9
+import argparse
+import glob
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+import BookFeatures
+from TickStore import csv_records
+
+def dia(book, ticks, segundos):
+    """Repete book e ticks, cada cópia deslocada para depois da anterior, até cobrir 'segundos'."""
+    duracao = int(max(book['time'][-1], ticks['time'][-1]) - min(book['time'][0], ticks['time'][0])) + 10 ** 9
+    copias = int(np.ceil(segundos * 1e9 / duracao))
+    def repetir(registros):
+        saida = np.tile(registros, copias)
+        saida['time'] += np.repeat(np.arange(copias, dtype=np.int64) * duracao, len(registros))
+        return saida
+    return repetir(book), repetir(ticks)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default=str(Path(__file__).parent.parent.parent / 'anterior' / 'orderbook'))
+    parser.add_argument('--simbolos', type=int, default=4)
+    parser.add_argument('--horas', type=float, default=9)
+    args = parser.parse_args()
+
+    book = np.concatenate([csv_records('book', f) for f in sorted(glob.glob(os.path.join(args.csv, 'orderbook_WSPZ24_*.csv')))])
+    ticks = np.concatenate([csv_records('tick', f) for f in sorted(glob.glob(os.path.join(args.csv, 'tick_WSPZ24_*.csv')))])
+    book_dia, ticks_dia = dia(book, ticks, args.horas * 3600)
+    snapshots = len(np.unique(book_dia['time']))
+
+    inicio = time.perf_counter()
+    for _ in range(args.simbolos):
+        colunas = BookFeatures.features(book_dia, ticks_dia)
+    total = time.perf_counter() - inicio
+    print(f"{args.simbolos} símbolos x ({snapshots} snapshots, {len(book_dia)} níveis, {len(ticks_dia)} ticks) | "
+          f"{total:.2f} s ({total / args.simbolos * 1000:.0f} ms por símbolo) | {len(colunas)} colunas")
@@ -0,0 +1,65 @@
+# Benchmark do OptionsDataLoader.prepare_data sobre os CSVs em data/opcoes_dolar
+# Compara a versão vetorizada com a implementação anterior (apply por linha),
+# guardada aqui só como referência, e confere que os resultados são iguais.
+#   cd server
+#   python teste/bench-prepare-data.py
+import glob
+import io
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from OptionsAnalysis.data_loader import OptionsDataLoader
+
+def prepare_data_anterior(calls_csv, puts_csv, contract_filter="H25"):
+    df_calls = pd.read_csv(io.StringIO(calls_csv), sep=';', decimal=',')
+    df_puts = pd.read_csv(io.StringIO(puts_csv), sep=';', decimal=',')
+    if contract_filter is not None:
+        df_calls = df_calls[df_calls['Código'].str.startswith(f"{contract_filter}C")].copy()
+        df_puts = df_puts[df_puts['Código'].str.startswith(f"{contract_filter}P")].copy()
+    for df in [df_calls, df_puts]:
+        df['Contrato'] = df['Código'].str[:3]
+        df['Strike'] = df['Código'].apply(lambda x: OptionsDataLoader.extract_strike(x))
+        df['OI'] = pd.to_numeric(df['Contratos em Aberto'], errors='coerce').fillna(0)
+        df['Volume'] = pd.to_numeric(df['Contratos Negociados'], errors='coerce').fillna(0)
+        df['Último'] = pd.to_numeric(df['Último Preço'], errors='coerce')
+        df['Compra'] = pd.to_numeric(df['Última Oferta de Compra'], errors='coerce')
+        df['Venda'] = pd.to_numeric(df['Última Oferta de Venda'], errors='coerce')
+    df_calls['Tipo'] = 'Call'
+    df_puts['Tipo'] = 'Put'
+    return pd.concat([df_calls, df_puts], ignore_index=True)
+
+def mesmo_resultado(anterior, novo):
+    if len(anterior) != len(novo):
+        return False
+    # Strike é chave de agrupamento: precisa ser o mesmo float, não só próximo
+    if not np.array_equal(anterior['Strike'].astype(float), novo['Strike'], equal_nan=True):
+        return False
+    for col in ['OI', 'Volume', 'Último', 'Compra', 'Venda']:
+        if not np.allclose(anterior[col].astype(float), novo[col], equal_nan=True):
+            return False
+    return all((anterior[col].astype(str) == novo[col].astype(str)).all() for col in ['Código', 'Contrato', 'Tipo'])
+
+if __name__ == "__main__":
+    loader = OptionsDataLoader()
+    pares = []
+    for calls_file in sorted(glob.glob('data/opcoes_dolar/*_DOL_OP_Call.csv')):
+        with open(calls_file, encoding='utf-8') as f:
+            calls_csv = f.read()
+        with open(calls_file.replace('_Call.csv', '_Put.csv'), encoding='utf-8') as f:
+            puts_csv = f.read()
+        pares.append((calls_file, calls_csv, puts_csv))
+
+    for contract_filter in [None, 'H25']:
+        total_anterior = total_novo = 0
+        for calls_file, calls_csv, puts_csv in pares:
+            assert mesmo_resultado(prepare_data_anterior(calls_csv, puts_csv, contract_filter),
+                                   loader.prepare_data(calls_csv, puts_csv, contract_filter)), calls_file
+            total_anterior += min(timeit.repeat(lambda: prepare_data_anterior(calls_csv, puts_csv, contract_filter), number=20, repeat=5)) / 20
+            total_novo += min(timeit.repeat(lambda: loader.prepare_data(calls_csv, puts_csv, contract_filter), number=20, repeat=5)) / 20
+        print(f"contract_filter={contract_filter}: {len(pares)} dias | anterior {total_anterior / len(pares) * 1000:.2f} ms/dia | "
+              f"vetorizado {total_novo / len(pares) * 1000:.2f} ms/dia | {total_anterior / total_novo:.1f}x")
@@ -0,0 +1,51 @@
+# Compara as capturas em CSV de orderbook01.py com o TickStore binário:
+# espaço em disco e tempo para carregar (pandas.read_csv contra TickStore.read).
+# Confere que os registros lidos do TickStore são iguais aos do CSV.
+#   cd server
+#   python teste/bench-tickstore.py
+#   python teste/bench-tickstore.py --csv ../anterior/orderbook --repetir 20
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from TickStore import TickStore, from_price
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default=str(Path(__file__).parent.parent.parent / 'anterior' / 'orderbook'))
+    parser.add_argument('--simbolo', default='WSPZ24')
+    parser.add_argument('--repetir', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        store = TickStore(pasta)
+        for kind, prefixo in (('tick', 'tick'), ('book', 'orderbook')):
+            arquivos = sorted(glob.glob(os.path.join(args.csv, f'{prefixo}_{args.simbolo}_*.csv')))
+            linhas = sum(store.import_csv(args.simbolo, kind, f) for f in arquivos)
+            tamanho_csv = sum(os.path.getsize(f) for f in arquivos)
+            tamanho_bin = sum(os.path.getsize(f) for f in store.files(args.simbolo, kind))
+
+            def csv():
+                return pd.concat([pd.read_csv(f, parse_dates=['Timestamp']) for f in arquivos])
+            registros = store.read(args.simbolo, kind)
+            df = csv()
+            preco = ['Last', 'Bid', 'Ask'] if kind == 'tick' else ['Price']
+            campos = ['last', 'bid', 'ask'] if kind == 'tick' else ['price']
+            assert len(registros) == len(df) == linhas
+            for c, p in zip(campos, preco):
+                assert np.array_equal(from_price(registros[c]), df[p].to_numpy()), c
+            assert np.array_equal(registros['volume'], df['Volume'].to_numpy())
+
+            t_csv = min(timeit.repeat(csv, number=1, repeat=args.repetir))
+            t_bin = min(timeit.repeat(lambda: store.read(args.simbolo, kind), number=1, repeat=args.repetir))
+            print(f"{kind:5} {linhas:6} registros | disco: CSV {tamanho_csv / 1024:7.1f} KiB, binário {tamanho_bin / 1024:6.1f} KiB "
+                  f"({tamanho_csv / tamanho_bin:.0f}x) | carga: CSV {t_csv * 1000:6.2f} ms, binário {t_bin * 1000:5.2f} ms "
+                  f"({t_csv / t_bin:.0f}x)")
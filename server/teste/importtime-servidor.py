@@ -0,0 +1,54 @@
+# Relatório do tempo de importação do servidor (python -X importtime)
+# Importa server.py em um processo novo, resume o tempo acumulado por módulo e
+# confere que os módulos pesados (pandas, QuantLib, PyMuPDF, scikit-learn, ...) ficam
+# fora da inicialização. Sai com código 1 se o total passar do alvo.
+#   cd server
+#   python teste/importtime-servidor.py --alvo 400
+#   python teste/importtime-servidor.py --real      (MetaTrader5 de verdade, sem MT5_FAKE)
+import argparse
+import os
+import subprocess
+import sys
+
+PESADOS = ['pandas', 'scipy', 'sklearn', 'matplotlib', 'seaborn', 'QuantLib', 'fitz', 'pyarrow']
+
+def medir(real=False):
+    env = dict(os.environ, BDI_INGESTION='0')  # a thread de ingestão importaria fitz em paralelo
+    if not real:
+        env['MT5_FAKE'] = '1'
+    codigo = f"import server, sys; print('PESADOS:' + ','.join(m for m in {PESADOS!r} if m in sys.modules))"
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo],
+                               capture_output=True, text=True, env=env)
+    if resultado.returncode != 0:
+        raise SystemExit(resultado.stderr)
+    carregados = next(l for l in resultado.stdout.splitlines() if l.startswith('PESADOS:'))[len('PESADOS:'):]
+    modulos = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, acumulado, nome = linha.split(':', 1)[1].split('|')
+        modulos.append((int(acumulado) / 1000, len(nome) - len(nome.lstrip()), nome.strip()))
+    return modulos, [m for m in carregados.split(',') if m]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--alvo', type=float, default=None, help='tempo máximo de import server, em ms')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--real', action='store_true')
+    args = parser.parse_args()
+
+    modulos, pesados = medir(args.real)
+    # -X importtime lista os filhos antes do pai: os de server vêm logo antes dele, um nível abaixo
+    fim = max(i for i, m in enumerate(modulos) if m[2] == 'server')
+    total, nivel_server, _ = modulos[fim]
+    inicio = max([i for i in range(fim) if modulos[i][1] <= nivel_server] + [-1]) + 1
+    print(f"import server: {total:.0f} ms")
+    print("Importados diretamente por server.py (acumulado):")
+    diretos = sorted(m for m in modulos[inicio:fim] if m[1] == nivel_server + 2)
+    for ms, _, nome in diretos[::-1][:args.top]:
+        print(f"  {ms:8.1f} ms  {nome}")
+    print(f"Módulos pesados carregados na inicialização: {', '.join(pesados) or 'nenhum'}")
+
+    if args.alvo is not None and total > args.alvo:
+        print(f"ACIMA DO ALVO: {total:.0f} ms > {args.alvo:.0f} ms")
+        sys.exit(1)
@@ -0,0 +1,70 @@
+# Confere o índice de seções do BoletimDiario (build_section_index) e a leitura completa
+# de reserva de extract_dolar_options:
+#   - nos boletins reais em teste/, as páginas do índice dão as mesmas linhas de calls e
+#     puts que ler todas as páginas;
+#   - em um boletim gerado aqui, com os títulos em fonte 9 (abaixo de SECTION_FONT_SIZE),
+#     o índice não acha a seção e a extração lê todas as páginas.
+# Sai com código 1 se algum caso falhar.
+#   cd server
+#   python teste/indice-secoes.py
+import glob
+import sys
+import tempfile
+from pathlib import Path
+
+import fitz
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from B3 import BoletimDiario
+
+LINHA_CALL = 'FV83 F26C007500 3000 - - - - - - - - - 77,64 - -'
+LINHA_PUT = 'FV84 F26P005800 150 - - - - - - - - - 69,36 - -'
+
+def boletim_sem_indice(caminho):
+    """PDF com a seção DOL em fonte 9: nenhum título entra no índice."""
+    doc = fitz.open()
+    linhas = [
+        ['BOLETIM DIÁRIO REFERENTE A SEXTA-FEIRA - 31 DE JANEIRO DE 2025'],
+        [BoletimDiario.DOL_TITLE, BoletimDiario.CALL_HEADER, LINHA_CALL],
+        [BoletimDiario.DOL_TITLE, BoletimDiario.PUT_HEADER, LINHA_PUT],
+        [BoletimDiario.WDO_TITLE],
+    ]
+    for textos in linhas:
+        page = doc.new_page()
+        for i, texto in enumerate(textos):
+            page.insert_text((40, 60 + 40 * i), texto, fontsize=9)
+    doc.save(caminho)
+    doc.close()
+
+def main():
+    falhas = 0
+    for pdf in sorted(glob.glob(str(Path(__file__).parent / 'BDI_03-1_*.pdf'))):
+        doc = fitz.open(pdf)
+        paginas = BoletimDiario._dolar_pages(BoletimDiario.build_section_index(doc, BoletimDiario.WDO_TITLE), len(doc))
+        indice = BoletimDiario._read_dolar_tables(doc, paginas)
+        completo = BoletimDiario._read_dolar_tables(doc, range(len(doc)))
+        ok = indice == completo and indice[2]
+        falhas += not ok
+        print(f"{Path(pdf).name}: {len(paginas)} de {len(doc)} páginas, {len(indice[0])} calls, "
+              f"{len(indice[1])} puts | {'ok' if ok else 'DIFERENTE da leitura completa'}")
+        doc.close()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        pdf = str(Path(pasta) / 'BDI_03-1_sem_indice.pdf')
+        boletim_sem_indice(pdf)
+        doc = fitz.open(pdf)
+        indice = BoletimDiario.build_section_index(doc, BoletimDiario.WDO_TITLE)
+        doc.close()
+        data, calls, puts = BoletimDiario.extract_dolar_options(pdf, pasta + '/')
+        calls, puts = pd.read_csv(calls, sep=';'), pd.read_csv(puts, sep=';')
+        ok = (not indice and data == '2025-01-31'
+              and calls['Código'].tolist() == ['F26C007500'] and puts['Código'].tolist() == ['F26P005800'])
+        falhas += not ok
+        print(f"boletim sem títulos no índice: índice {indice or 'vazio'}, {len(calls)} calls, "
+              f"{len(puts)} puts | {'ok' if ok else 'FALHOU'}")
+
+    sys.exit(1 if falhas else 0)
+
+if __name__ == "__main__":
+    main()
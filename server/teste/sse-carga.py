@@ -0,0 +1,50 @@
+# Teste de carga do /api/stream (SSE)
+# Abre N conexões simultâneas e conta os eventos recebidos por cada uma.
+# Para rodar sem o terminal, suba o servidor com o feed simulado:
+#   set MT5_FAKE=1
+#   flask --app server run --with-threads
+# e depois:
+#   python sse-carga.py --clientes 50 --segundos 30 --ticker WDO$ --ticker DI1F26
+import argparse
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+def cliente(url, segundos, contagem, idx):
+    fim = time.time() + segundos
+    eventos = {'tick': 0, 'bar': 0}
+    with urllib.request.urlopen(url, timeout=segundos + 30) as resposta:
+        for linha in resposta:
+            linha = linha.decode('utf-8').strip()
+            if linha.startswith('event: '):
+                tipo = linha[len('event: '):]
+                eventos[tipo] = eventos.get(tipo, 0) + 1
+            if time.time() > fim:
+                break
+    contagem[idx] = eventos
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:5000/api/stream')
+    parser.add_argument('--ticker', action='append', default=None)
+    parser.add_argument('--clientes', type=int, default=20)
+    parser.add_argument('--segundos', type=int, default=20)
+    args = parser.parse_args()
+
+    tickers = args.ticker or ['WDO$']
+    url = f"{args.url}?{urllib.parse.urlencode([('tickerName', t) for t in tickers])}"
+    contagem = [None] * args.clientes
+    threads = [threading.Thread(target=cliente, args=(url, args.segundos, contagem, i)) for i in range(args.clientes)]
+    inicio = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.time() - inicio
+
+    ticks = [c['tick'] for c in contagem if c]
+    barras = [c['bar'] for c in contagem if c]
+    print(f"Clientes: {len(ticks)}/{args.clientes} em {duracao:.1f}s")
+    print(f"Ticks por cliente: min {min(ticks)} max {max(ticks)} ({sum(ticks) / len(ticks) / duracao:.2f}/s em média)")
+    print(f"Barras por cliente: min {min(barras)} max {max(barras)}")